@@ -0,0 +1,437 @@
+import base64
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib import parse
+import urllib3
+from selenium.webdriver.remote import webelement
+from drivers.async_driver import ELEMENT_KEY
+from pages import scripts
+
+VOID_TAGS = ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr")
+INVISIBLE_TAGS = ("head", "title", "script", "style", "meta", "link")
+# 1x1 transparent PNG returned for screenshots
+PIXEL = base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082")).decode()
+CSS_TOKEN = re.compile(r"#([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:=['\"]?([^'\"\]]*)['\"]?)?\]")
+XPATH = re.compile(r"^//([\w*]+)(?:\[(?:contains\(text\(\),\s*'([^']*)'\)|@([\w-]+)='([^']*)')\])?$")
+
+
+class WebDriverError(Exception):
+    """W3C error answered to the client."""
+
+    def __init__(self, status: int, error: str, message: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+
+
+class Node:
+    """Element of a parsed page."""
+
+    def __init__(self, tag: str, attrs: dict, parent: Optional["Node"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+        self.text = ""
+        self.value = attrs.get("value", "")
+
+    def ancestors(self):
+        node = self.parent
+        while node:
+            yield node
+            node = node.parent
+
+    def text_content(self) -> str:
+        return self.text + "".join(child.text_content() for child in self.children)
+
+
+class _Parser(HTMLParser):
+
+    def __init__(self):
+        super().__init__()
+        self.root = Node("#document", {}, None)
+        self.nodes = []
+        self._stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value if value is not None else "" for name, value in attrs}, self._stack[-1])
+        self._stack[-1].children.append(node)
+        self.nodes.append(node)
+        if tag not in VOID_TAGS:
+            self._stack.append(node)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self._stack) - 1, 0, -1):
+            if self._stack[index].tag == tag:
+                del self._stack[index:]
+                break
+
+    def handle_data(self, data):
+        self._stack[-1].text += data
+
+
+def _matches_compound(node: Node, compound: str) -> bool:
+    """Matches a compound CSS selector like button[type='submit'] or .flash.error."""
+    tag = re.match(r"^[a-zA-Z][\w-]*|^\*", compound)
+    if tag and tag.group() not in ("*", node.tag):
+        return False
+    rest = compound[tag.end():] if tag else compound
+    position = 0
+    for token in CSS_TOKEN.finditer(rest):
+        if token.start() != position:
+            raise WebDriverError(400, "invalid selector", compound)
+        position = token.end()
+        element_id, class_name, attribute, value = token.groups()
+        if element_id and node.attrs.get("id") != element_id:
+            return False
+        if class_name and class_name not in node.attrs.get("class", "").split():
+            return False
+        if attribute and (attribute not in node.attrs or (value is not None and node.attrs[attribute] != value)):
+            return False
+    if position != len(rest):
+        raise WebDriverError(400, "invalid selector", compound)
+    return True
+
+
+def _matches_css(node: Node, selector: str) -> bool:
+    """Matches compound selectors joined by descendant combinators."""
+    *ancestors, last = selector.split()
+    if not _matches_compound(node, last):
+        return False
+    candidates = node.ancestors()
+    for compound in reversed(ancestors):
+        if not any(_matches_compound(ancestor, compound) for ancestor in candidates):
+            return False
+    return True
+
+
+class Session:
+    """Browser state of a fake session: the parsed page, cookies and the
+    values typed into inputs. Elements with data-reveal show the element
+    with that id `reveal_delay` seconds after being clicked, standing in for
+    the page scripts the fake does not run."""
+
+    def __init__(self, http: urllib3.PoolManager, reveal_delay: float):
+        self.http = http
+        self.reveal_delay = reveal_delay
+        self.url = "about:blank"
+        self.nodes = []
+        self.cookies = {}
+        self.generation = 0
+        self.revealed = {}
+        self.script_timeout = 30
+        self.load_ms = 0.0
+
+    def load(self, url: str, method: str = "GET", fields: Optional[dict] = None) -> None:
+        """Loads a page, following redirects and keeping cookies."""
+        start = time.perf_counter()
+        if not url.startswith("http"):
+            self.url, self.nodes, self.revealed = url, [], {}
+            self.generation += 1
+            return
+        for _ in range(10):
+            headers = {"Cookie": "; ".join(f"{name}={value}" for name, value in self.cookies.items())}
+            body = None
+            if fields is not None:
+                body = parse.urlencode(fields)
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+            response = self.http.request(method, url, body=body, headers=headers, redirect=False)
+            for cookie in response.headers.getlist("Set-Cookie"):
+                pair, _, attributes = cookie.partition(";")
+                name, _, value = pair.strip().partition("=")
+                if "max-age=0" in attributes.lower().replace(" ", ""):
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = value
+            if response.status in (301, 302, 303, 307, 308):
+                url = parse.urljoin(url, response.headers["Location"])
+                method, fields = "GET", None
+                continue
+            break
+        parser = _Parser()
+        parser.feed(response.data.decode("utf-8", "replace"))
+        self.url, self.nodes = url, parser.nodes
+        self.load_ms = (time.perf_counter() - start) * 1000
+        self.generation += 1
+        self.revealed = {}
+
+    def reference(self, node: Node) -> dict:
+        return {ELEMENT_KEY: f"{self.generation}.{self.nodes.index(node)}"}
+
+    def node(self, element_id: str) -> Node:
+        generation, _, index = element_id.partition(".")
+        if int(generation) != self.generation:
+            raise WebDriverError(404, "stale element reference", element_id)
+        return self.nodes[int(index)]
+
+    def find(self, using: str, value: str) -> list[Node]:
+        if using == "css selector":
+            return [node for node in self.nodes if _matches_css(node, value)]
+        if using == "id":
+            return [node for node in self.nodes if node.attrs.get("id") == value]
+        if using == "name":
+            return [node for node in self.nodes if node.attrs.get("name") == value]
+        if using == "class name":
+            return [node for node in self.nodes if value in node.attrs.get("class", "").split()]
+        if using == "tag name":
+            return [node for node in self.nodes if node.tag == value]
+        if using in ("link text", "partial link text"):
+            return [node for node in self.nodes if node.tag == "a" and (
+                node.text_content().strip() == value if using == "link text" else value in node.text_content())]
+        if using == "xpath":
+            match = XPATH.match(value)
+            if not match:
+                raise WebDriverError(400, "invalid selector", f"Unsupported xpath {value}")
+            tag, text, attribute, attribute_value = match.groups()
+            return [node for node in self.nodes if tag in ("*", node.tag)
+                    and (text is None or text in node.text)
+                    and (attribute is None or node.attrs.get(attribute) == attribute_value)]
+        raise WebDriverError(400, "invalid argument", f"Unknown locator strategy {using}")
+
+    def displayed(self, node: Node) -> bool:
+        now = time.monotonic()
+        for current in (node, *node.ancestors()):
+            if current.tag in INVISIBLE_TAGS:
+                return False
+            if "hidden" in current.attrs and not now >= self.revealed.get(current.attrs.get("id"), float("inf")):
+                return False
+            if "display:none" in current.attrs.get("style", "").replace(" ", ""):
+                return False
+        return True
+
+    def click(self, node: Node) -> None:
+        if node.attrs.get("data-reveal"):
+            self.revealed[node.attrs["data-reveal"]] = time.monotonic() + self.reveal_delay
+            return
+        form = next((ancestor for ancestor in node.ancestors() if ancestor.tag == "form"), None)
+        if form and node.tag in ("button", "input") and node.attrs.get("type", "submit") == "submit":
+            fields = {field.attrs["name"]: field.value for field in self.nodes
+                      if field.tag in ("input", "textarea", "select") and "name" in field.attrs
+                      and form in field.ancestors()}
+            self.load(parse.urljoin(self.url, form.attrs.get("action", "")),
+                      form.attrs.get("method", "get").upper(), fields)
+            return
+        link = next((current for current in (node, *node.ancestors()) if current.tag == "a"), None)
+        if link and link.attrs.get("href", "#") != "#":
+            self.load(parse.urljoin(self.url, link.attrs["href"]))
+
+
+class FakeWebDriver:
+    """In-process W3C WebDriver endpoint that runner sessions (e.g. DockerRunner
+    pointed at `url`) can target. Pages are fetched over HTTP and parsed, the
+    page objects' scripts are answered by dispatching on the constants in
+    pages.scripts, so the framework runs end to end without a browser.
+    Every command waits `latency` seconds, emulating the hop to a remote hub,
+    and is counted in `commands`; `connections` and `peak_sessions` count
+    the connections opened and the most sessions alive at once. With `slots`,
+    a list of (browserName, busy), /status answers like a Grid 4 hub."""
+
+    def __init__(self, latency: float = 0, reveal_delay: float = 0.1, port: int = 0, slots: list = None):
+        webelement._load_js()
+        self.latency = latency
+        self.reveal_delay = reveal_delay
+        self.slots = slots
+        self.commands = Counter()
+        self.sessions = {}
+        self.connections = 0
+        self.peak_sessions = 0
+        self._http = urllib3.PoolManager(maxsize=16, block=False)
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def _answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                try:
+                    status, value = 200, fake.handle(self.command, self.path, payload)
+                except WebDriverError as error:
+                    status, value = error.status, {"error": error.error, "message": str(error), "stacktrace": ""}
+                body = json.dumps({"value": value}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_DELETE = _answer  # pylint: disable=invalid-name
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/wd/hub"
+
+    def start(self) -> "FakeWebDriver":
+        """Serves in a daemon thread."""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Shuts the endpoint down."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def status(self) -> dict:
+        """/status payload, with one Grid 4 node per slot when `slots` is set."""
+        if self.slots is None:
+            return {"ready": True, "message": "fake"}
+        return {
+            "ready": True,
+            "nodes": [{
+                "availability": "UP",
+                "slots": [{
+                    "stereotype": {"browserName": browser},
+                    "session": {"sessionId": "busy"} if busy else None,
+                }],
+            } for browser, busy in self.slots],
+        }
+
+    def handle(self, method: str, path: str, payload: dict):
+        """Answers a command with its value or raises WebDriverError."""
+        if self.latency:
+            time.sleep(self.latency)
+        parts = parse.urlparse(path).path.split("/")
+        parts = parts[parts.index("hub") + 1:] if "hub" in parts else parts[1:]
+        if parts == ["status"]:
+            return self.status()
+        if parts == ["session"]:
+            session_id = uuid.uuid4().hex
+            with self._lock:
+                self.sessions[session_id] = Session(self._http, self.reveal_delay)
+                self.peak_sessions = max(self.peak_sessions, len(self.sessions))
+                self.commands["newSession"] += 1
+            capabilities = payload.get("capabilities", {}).get("alwaysMatch", {})
+            return {"sessionId": session_id, "capabilities": {"browserName": "fake", **capabilities}}
+        session = self.sessions.get(parts[1])
+        if session is None:
+            raise WebDriverError(404, "invalid session id", parts[1])
+        command = parts[2:]
+        name = "/".join(part if not re.match(r"^\d+\.\d+$", part) else "{id}" for part in command)
+        with self._lock:
+            self.commands[f"{method} {name or 'session'}"] += 1
+        return self._dispatch(session, method, command, payload, parts[1])
+
+    def _dispatch(self, session: Session, method: str, command: list, payload: dict, session_id: str):
+        if not command and method == "DELETE":
+            self.sessions.pop(session_id, None)
+            return None
+        if command == ["url"]:
+            if method == "POST":
+                session.load(payload["url"])
+                return None
+            return session.url
+        if command == ["title"]:
+            return next((node.text for node in session.nodes if node.tag == "title"), "")
+        if command in (["element"], ["elements"]):
+            nodes = session.find(payload["using"], payload["value"])
+            if command == ["elements"]:
+                return [session.reference(node) for node in nodes]
+            if not nodes:
+                raise WebDriverError(404, "no such element", f"{payload['using']}={payload['value']}")
+            return session.reference(nodes[0])
+        if command[:1] == ["element"] and len(command) >= 3:
+            node = session.node(command[1])
+            action = command[2]
+            if action == "click":
+                session.click(node)
+            elif action == "clear":
+                node.value = ""
+            elif action == "value":
+                node.value += payload.get("text", "")
+            elif action == "displayed":
+                return session.displayed(node)
+            elif action == "text":
+                return node.text_content().strip() if session.displayed(node) else ""
+            elif action == "name":
+                return node.tag
+            elif action in ("attribute", "property"):
+                return node.value if command[3] == "value" else node.attrs.get(command[3])
+            return None
+        if command in (["execute", "sync"], ["execute", "async"]):
+            return self._script(session, payload["script"], payload.get("args", []), command[1] == "async")
+        if command == ["timeouts"]:
+            if method == "POST" and "script" in payload:
+                session.script_timeout = payload["script"] / 1000
+            return None if method == "POST" else {"script": int(session.script_timeout * 1000)}
+        if command[:1] == ["window"]:
+            return {"x": 0, "y": 0, "width": 1280, "height": 800}
+        if command == ["screenshot"]:
+            return PIXEL
+        if command[:1] == ["cookie"]:
+            if method == "POST":
+                cookie = payload["cookie"]
+                session.cookies[cookie["name"]] = cookie["value"]
+            elif method == "DELETE":
+                if len(command) > 1:
+                    session.cookies.pop(command[1], None)
+                else:
+                    session.cookies.clear()
+            else:
+                return [{"name": name, "value": value, "path": "/"} for name, value in session.cookies.items()]
+            return None
+        if command == ["refresh"]:
+            session.load(session.url)
+            return None
+        raise WebDriverError(404, "unknown command", "/".join(command))
+
+    def _script(self, session: Session, script: str, args: list, is_async: bool):
+        """Answers the scripts the framework sends, by identity."""
+        def element(value):
+            return session.node(value[ELEMENT_KEY]) if isinstance(value, dict) and ELEMENT_KEY in value else None
+
+        def locate(by, value):
+            nodes = session.find(by, value)
+            return nodes[0] if nodes else None
+
+        if script == f"return ({webelement.isDisplayed_js}).apply(null, arguments);":
+            return session.displayed(element(args[0]))
+        if script == scripts.LOCATE_MANY:
+            found = [locate(by, value) for by, value in args[0]]
+            return [[session.reference(node), session.displayed(node)] if node else [None, False]
+                    for node in found]
+        if script == scripts.FILL_FORM:
+            fields = [(locate(by, value), text) for by, value, text in args[0]]
+            submit = args[1] and locate(*args[1])
+            if any(node is None for node, _ in fields) or (args[1] and submit is None):
+                return False
+            for node, text in fields:
+                node.value = text
+            if submit:
+                session.click(submit)
+            return True
+        if script == scripts.WAIT_FOR and is_async:
+            by, value, visible, timeout = args[:4]
+            deadline = time.monotonic() + min(timeout / 1000, session.script_timeout)
+            while True:
+                node = locate(by, value)
+                if node and (not visible or session.displayed(node)):
+                    return session.reference(node)
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(0.01)
+        if script == scripts.PAGE_METRICS and is_async:
+            return {"ttfb_ms": session.load_ms, "dom_content_loaded_ms": session.load_ms,
+                    "load_ms": session.load_ms, "resources": 0, "resource_bytes": 0,
+                    "slowest_resources": [], "lcp_ms": None, "cls": None}
+        if script == scripts.SNAPSHOT_STORAGE:
+            return [{}, {}]
+        return None
@@ -0,0 +1,221 @@
+"""Offline benchmarks of the framework against a local copy of the site and
+a fake WebDriver endpoint, so timings and round trips only measure our code.
+
+    python -m benchmarks.run                 # run and store results of HEAD
+    python -m benchmarks.run --compare main  # also diff against the results of main
+
+Results are written to benchmarks/results/<commit>.json (``-dirty`` when the
+tree has local changes).
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+from benchmarks.fake_webdriver import FakeWebDriver
+from benchmarks.site import PASSWORD, USERNAME, LocalSite
+from config import RunConfig
+from drivers.remote_driver import DockerRunner
+from pages.dynamic_loading_pages import DynamicLoadingPage
+from pages.login_page import LoginPage
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS = Path(__file__).resolve().parent / "results"
+WAIT_STRATEGIES = ("webdriverwait", "poll", "observer")
+TEST_FILES = ("tests/test_login.py", "tests/test_dynamic_loading.py")
+# modules a new xdist worker imports; "eager_runners" adds every runner, as
+# conftest did before runners were imported through drivers.registry
+IMPORTS = {
+    "conftest": ("conftest",),
+    "eager_runners": ("conftest", "drivers.localrunner", "drivers.remote_driver"),
+}
+REPORT_MODES = {
+    "no_report": [],
+    "html_inline": ["--html={dir}/report.html", "--self-contained-html", "--report-assets=inline"],
+    "html_external": ["--html={dir}/report.html", "--report-assets=external"],
+}
+
+
+def _git(*args: str) -> str:
+    return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def commit_id(ref: str = "HEAD") -> str:
+    """Short hash of `ref`, with -dirty for a HEAD with local changes."""
+    commit = _git("rev-parse", "--short", ref)
+    if ref == "HEAD" and _git("status", "--porcelain", "--untracked-files=no"):
+        commit += "-dirty"
+    return commit
+
+
+def page_object_benchmarks(site: LocalSite, fake: FakeWebDriver, rounds: int) -> dict:
+    """Round trips and seconds per page-object method, for every wait strategy."""
+    results = {}
+    for strategy in WAIT_STRATEGIES:
+        config = RunConfig(host="docker", browser="chrome", hub_url=fake.url,
+                           base_url=site.url, wait_strategy=strategy)
+        driver = DockerRunner(config, "benchmark").start_driver()
+        samples = {}
+
+        def measure(name, action):
+            fake.commands.clear()
+            start = time.perf_counter()
+            action()
+            seconds = time.perf_counter() - start
+            samples.setdefault(name, []).append((sum(fake.commands.values()), seconds))
+
+        try:
+            for _ in range(rounds):
+                driver.get(site.url)
+                login = LoginPage(driver, config)
+                measure("LoginPage.with_ (first interaction)", lambda: login.with_("nobody", PASSWORD))
+                measure("LoginPage.failure_message_present", login.failure_message_present)
+                login = LoginPage(driver, config)
+                measure("LoginPage.with_ (page already open)", lambda: login.with_(USERNAME, PASSWORD))
+                measure("LoginPage.success_message_present", login.success_message_present)
+                login = LoginPage(driver, config)
+                measure("LoginPage.with_script (setup login)", lambda: login.with_script(USERNAME, PASSWORD))
+                dynamic_loading = DynamicLoadingPage(driver, config)
+                measure("DynamicLoadingPage.click_start_button (first interaction)",
+                        dynamic_loading.click_start_button)
+                measure("DynamicLoadingPage.is_hello_world_text_present",
+                        dynamic_loading.is_hello_world_text_present)
+        finally:
+            driver.quit()
+        results[strategy] = {
+            name: {"round_trips": max(trips for trips, _ in runs),
+                   "seconds": statistics.median(seconds for _, seconds in runs)}
+            for name, runs in samples.items()
+        }
+    return results
+
+
+def pytest_benchmarks(site: LocalSite, fake: FakeWebDriver, rounds: int) -> dict:
+    """Wall time per test of the real suite and the cost of each report mode.
+    Every run works in a temporary directory, with its own cache and reports
+    and without duration scheduling or login caching, so fake timings never
+    reach the history of real runs."""
+    results = {}
+    for mode, report_args in REPORT_MODES.items():
+        walls, tests, failures = [], 0, 0
+        for _ in range(rounds):
+            with tempfile.TemporaryDirectory() as directory:
+                command = [
+                    sys.executable, "-m", "pytest", "-q", "-c", str(ROOT / "pytest.ini"), f"--rootdir={ROOT}",
+                    "-o", "addopts=", "-o", f"cache_dir={directory}/.pytest_cache", "-p", "no:randomly",
+                    "--schedule=collection", "--auth-cache=False",
+                    "--host=docker", f"--hub-url={fake.url}", f"--baseurl={site.url}", "--browser=chrome",
+                    f"--junitxml={directory}/junit.xml",
+                    *[arg.format(dir=directory) for arg in report_args], *[str(ROOT / path) for path in TEST_FILES],
+                ]
+                start = time.perf_counter()
+                # relative outputs (reports/, .pytest_cache/ state) land in the temporary directory
+                subprocess.run(command, cwd=directory, capture_output=True, check=False)
+                walls.append(time.perf_counter() - start)
+                suites = list(ElementTree.parse(Path(directory) / "junit.xml").getroot().iter("testsuite"))
+                tests = sum(int(suite.get("tests")) for suite in suites)
+                failures = sum(int(suite.get("failures")) + int(suite.get("errors")) for suite in suites)
+        results[mode] = {"tests": tests, "failures": failures, "seconds": statistics.median(walls),
+                         "seconds_per_test": statistics.median(walls) / max(tests, 1)}
+    baseline = results["no_report"]["seconds"]
+    for mode in REPORT_MODES:
+        results[mode]["report_cost_seconds"] = results[mode]["seconds"] - baseline
+    return results
+
+
+def import_benchmarks(rounds: int) -> dict:
+    """Seconds a fresh interpreter, like a new xdist worker, spends importing
+    conftest, and what importing every runner up front would add to it."""
+    results = {}
+    for name, modules in IMPORTS.items():
+        script = (f"import time; start = time.perf_counter(); import {', '.join(modules)}; "
+                  "print(time.perf_counter() - start)")
+        samples = [
+            float(subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True,
+                                 text=True, check=True).stdout)
+            for _ in range(rounds)
+        ]
+        results[name] = {"seconds": statistics.median(samples)}
+    results["eager_runners"]["import_cost_seconds"] = (
+        results["eager_runners"]["seconds"] - results["conftest"]["seconds"])
+    return results
+
+
+def _leaves(data: dict, prefix: str = "") -> dict:
+    leaves = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            leaves.update(_leaves(value, f"{prefix}{key} / "))
+        elif isinstance(value, (int, float)):
+            leaves[f"{prefix}{key}"] = value
+    return leaves
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Prints the metrics of both runs and returns the regressions: any extra
+    round trip or failure, or a time more than `threshold` (relative) slower."""
+    regressions = []
+    old, new = _leaves(baseline["results"]), _leaves(current["results"])
+    print(f"\n{baseline['commit']} -> {current['commit']}")
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        change = (after - before) / before if before else 0.0
+        regressed = (name.endswith(("round_trips", "failures")) and after > before) or (
+            "seconds" in name and not name.endswith("cost_seconds") and change > threshold)
+        if regressed:
+            regressions.append(name)
+        print(f"{'!' if regressed else ' '} {name}: {before:.4g} -> {after:.4g} ({change:+.0%})")
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3, help="Repetitions, the median is kept")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds the fake WebDriver waits per command, emulating a remote hub")
+    parser.add_argument("--skip-pytest", action="store_true", help="Only run the page-object benchmarks")
+    parser.add_argument("--compare", metavar="REF", help="Commit whose stored results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    site = LocalSite().start()
+    fake = FakeWebDriver(latency=args.latency).start()
+    try:
+        results = {"page_objects": page_object_benchmarks(site, fake, args.rounds),
+                   "imports": import_benchmarks(args.rounds)}
+        if not args.skip_pytest:
+            results["pytest"] = pytest_benchmarks(site, fake, args.rounds)
+    finally:
+        fake.stop()
+        site.stop()
+
+    current = {
+        "commit": commit_id(), "created": time.time(), "python": platform.python_version(),
+        "rounds": args.rounds, "latency": args.latency, "results": results,
+    }
+    RESULTS.mkdir(exist_ok=True)
+    path = RESULTS / f"{current['commit']}.json"
+    path.write_text(json.dumps(current, indent=2), encoding="utf-8")
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {path}")
+
+    if args.compare:
+        baseline_path = RESULTS / f"{commit_id(args.compare)}.json"
+        if not baseline_path.exists():
+            print(f"No stored results for {args.compare} ({baseline_path})")
+            return 2
+        regressions = compare(json.loads(baseline_path.read_text(encoding="utf-8")), current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
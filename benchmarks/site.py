@@ -0,0 +1,128 @@
+import threading
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse
+
+USERNAME = "tomsmith"
+PASSWORD = "SuperSecretPassword!"
+
+LAYOUT = """<!DOCTYPE html>
+<html><head><title>The Internet</title></head>
+<body><div id="content">{flash}{content}</div></body></html>"""
+
+FLASH = '<div id="flash" class="flash {kind}">{message}<a href="#" class="close">x</a></div>'
+
+LOGIN = """<h2>Login Page</h2>
+<form name="login" id="login" action="/authenticate" method="post">
+  <input type="text" name="username" id="username">
+  <input type="password" name="password" id="password">
+  <button class="radius" type="submit"><i class="fa fa-sign-in">Login</i></button>
+</form>"""
+
+SECURE = """<h2>Secure Area</h2>
+<a class="button secondary radius" href="/logout"><i class="icon-2x icon-signout">Logout</i></a>"""
+
+# data-reveal lets the fake WebDriver emulate the script without running it
+DYNAMIC_LOADING = """<h3>Dynamically Loaded Page Elements</h3>
+<div id="start"><button data-reveal="finish">Start</button></div>
+<div id="loading" hidden>Loading...</div>
+<div id="finish" hidden><h4>Hello World!</h4></div>
+<script>
+document.querySelector("#start button").addEventListener("click", () => {
+  document.getElementById("start").hidden = true;
+  document.getElementById("loading").hidden = false;
+  setTimeout(() => {
+    document.getElementById("loading").hidden = true;
+    document.getElementById("finish").hidden = false;
+  }, 100);
+});
+</script>"""
+
+
+class LocalSite:
+    """Local stand-in for the-internet.herokuapp.com serving /login,
+    /authenticate, /secure, /logout and /dynamic_loading/1 with the same
+    element ids and classes. The session and flash messages live in cookies."""
+
+    def __init__(self, port: int = 0):
+        self.requests = 0
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                site.requests += 1
+                cookies = SimpleCookie(self.headers.get("Cookie", ""))
+                flash = parse.unquote(cookies["flash"].value) if "flash" in cookies else ""
+                logged_in = "session" in cookies and cookies["session"].value == USERNAME
+                path = parse.urlparse(self.path).path
+                if path == "/login":
+                    self._page(LOGIN, flash)
+                elif path == "/secure" and logged_in:
+                    self._page(SECURE, flash)
+                elif path == "/secure":
+                    self._redirect("/login", "flash=error:You must login to view the secure area!")
+                elif path == "/logout":
+                    self._redirect("/login", "flash=success:You logged out of the secure area!",
+                                   "session=; Max-Age=0")
+                elif path == "/dynamic_loading/1":
+                    self._page(DYNAMIC_LOADING, flash)
+                elif path == "/":
+                    self._page('<a href="/login">Form Authentication</a>', flash)
+                else:
+                    self._send(404, b"Not Found", "text/plain")
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                site.requests += 1
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse.parse_qs(self.rfile.read(length).decode())
+                username = form.get("username", [""])[0]
+                password = form.get("password", [""])[0]
+                if username == USERNAME and password == PASSWORD:
+                    self._redirect("/secure", "flash=success:You logged into a secure area!",
+                                   f"session={USERNAME}")
+                elif username != USERNAME:
+                    self._redirect("/login", "flash=error:Your username is invalid!")
+                else:
+                    self._redirect("/login", "flash=error:Your password is invalid!")
+
+            def _page(self, content: str, flash: str) -> None:
+                kind, _, message = flash.partition(":")
+                banner = FLASH.format(kind=kind, message=message) if flash else ""
+                body = LAYOUT.format(flash=banner, content=content).encode()
+                self._send(200, body, "text/html", ["flash=; Max-Age=0"] if flash else [])
+
+            def _redirect(self, location: str, *cookies: str) -> None:
+                self._send(302, b"", "text/html", list(cookies), location)
+
+            def _send(self, status, body, content_type, cookies=(), location=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for cookie in cookies:
+                    pair, _, attributes = cookie.partition("; ")
+                    name, _, value = pair.partition("=")
+                    self.send_header("Set-Cookie", "; ".join(
+                        filter(None, [f"{name}={parse.quote(value)}", "Path=/", attributes])))
+                if location:
+                    self.send_header("Location", location)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> "LocalSite":
+        """Serves in a daemon thread."""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Shuts the site down."""
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,7 +1,70 @@
+from dataclasses import dataclass
+
 BASE_URL = ""
 BROWSER = ""
 HOST = ""
 BROWSER_VERSION = ""
 PLATFORM = "macOS"
 OS_VERSION = "11"
+DRIVER_CACHE_TTL = 24
+DRIVER_OFFLINE = False
+WAIT_STRATEGY = "webdriverwait"
+COMMAND_TIMINGS = False
+HUB_POOL_SIZE = 4
+HUB_RETRIES = 3
+HUB_COMPRESSION = False
+HUB_URL = "http://localhost:4444/wd/hub"
+GRID_THROTTLE = False
+GRID_WAIT = 300
+FAST_MODE = False
+PERF_METRICS = False
+PERF_BUDGETS = "warn"
+ADMISSION_CONTROL = False
+ADMISSION_TIMEOUT = 600
+# resources the fast profile blocks: images, fonts, media and third-party trackers
+BLOCKED_URLS = (
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+)
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """Immutable configuration of a browser session. Built once from the CLI
+    options (falling back to the values above) and passed explicitly to
+    runners and pages, so sessions with different browsers or platforms can
+    run side by side in one process."""
+
+    base_url: str = BASE_URL
+    browser: str = BROWSER
+    host: str = HOST
+    browser_version: str = BROWSER_VERSION
+    platform: str = PLATFORM
+    os_version: str = OS_VERSION
+    headless: bool = False
+    wait_strategy: str = WAIT_STRATEGY
+    command_timings: bool = COMMAND_TIMINGS
+    driver_cache_ttl: float = DRIVER_CACHE_TTL
+    driver_offline: bool = DRIVER_OFFLINE
+    hub_url: str = HUB_URL
+    hub_pool_size: int = HUB_POOL_SIZE
+    hub_retries: int = HUB_RETRIES
+    hub_compression: bool = HUB_COMPRESSION
+    grid_throttle: bool = GRID_THROTTLE
+    grid_wait: float = GRID_WAIT
+    fast_mode: bool = FAST_MODE
+    blocked_urls: tuple = BLOCKED_URLS
+    perf_metrics: bool = PERF_METRICS
+    # what a page exceeding its performance budgets does: "warn" or "fail"
+    perf_budgets: str = PERF_BUDGETS
+    # hold back new sessions while the machine running the browsers is saturated
+    admission_control: bool = ADMISSION_CONTROL
+    admission_timeout: float = ADMISSION_TIMEOUT
+    # host:port of the record/replay proxy as seen by the browser, empty for direct connections
+    proxy: str = ""
 
+    @property
+    def id(self) -> str:  # pylint: disable=invalid-name
+        """Short name of the browser/platform combination, used in test ids."""
+        return "-".join(part for part in (self.browser, self.platform) if part)
@@ -1,111 +1,381 @@
+import base64
+import json
 import logging
 import os
+import time
 import pytest
 import config as setting
+from config import RunConfig
+from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
+from urllib import parse
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.remote.webdriver import WebDriver
 from _pytest.fixtures import FixtureRequest
 from _pytest.config.argparsing import Parser
 from pages.login_page import LoginPage
+from pages.secure_page import SecurePage
+from reporting.external import ExternalReport
+from reporting.log_buffer import BufferedLogging
+from reporting.page_loads import PageLoadReport
+from reporting.screenshots import MIME_TYPES, ScreenshotPipeline
+from reporting.web_vitals import BUDGET_MODES, PageMetricsReport
+from scheduling.durations import DurationScheduler
+from scheduling.impact import ImpactSelector
 from pages.dynamic_loading_pages import DynamicLoadingPage
-from drivers.localrunner import ChromeRunner, FirefoxRunner
-from drivers.remote_driver import BSRunner, DockerRunner, SauceRunner
+from drivers.async_driver import AsyncSessionRunner
+from drivers.auth_cache import AuthStateCache, inject, snapshot
+from drivers import registry
+from drivers.grid import worker_count
+from drivers import resources
+from drivers.instrumentation import (
+    RECORDER, CommandRecord, CommandStats, serialize, take_page_loads, take_page_metrics, timing_table)
+from drivers.prefetch import SessionPrefetcher
+from drivers.proxy import CachingProxy, ResponseStore
+from drivers.session_pool import SessionPool
+from drivers.transport import close_pools, transport_stats
 
 LOGGER = logging.getLogger(__name__)
+DEFAULT_CREDENTIALS = ("tomsmith", "SuperSecretPassword!")
+REMOTE_HOSTS = ("saucelabs", "saucelabs-tunnel", "browserstack", "docker")
+# hosts whose runners route the browser through --proxy-mode's local proxy
+PROXY_HOSTS = ("localhost", "docker")
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+COMMAND_STATS = CommandStats()
+
+
+BROWSERS = ("chrome", "firefox", "edge")
+PLATFORMS = ("Windows", "OS X", "Linux")
+
+
+def _option_list(config: pytest.Config, name: str) -> list[str]:
+    """Values of a comma separated CLI option, empty if it is not set."""
+    value = config.getoption(name) or ""
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def _run_matrix(config: pytest.Config) -> list[RunConfig]:
+    """Builds the run configurations from CLI commands else uses pre-set values
+    from config.py. --browser and --platform take comma separated lists, every
+    combination becomes its own configuration."""
+    base = RunConfig(
+        base_url=config.getoption("--baseurl") or setting.BASE_URL,
+        host=config.getoption("--host").lower() or setting.HOST,
+        browser_version=config.getoption("--browserversion") or setting.BROWSER_VERSION,
+        os_version=config.getoption("--os-version") or setting.OS_VERSION,
+        headless=str(config.getoption("--headless")).capitalize() == "True",
+        wait_strategy=config.getoption("--wait-strategy") or setting.WAIT_STRATEGY,
+        command_timings=config.getoption(
+            "--command-timings").capitalize() == "True" or setting.COMMAND_TIMINGS,
+        driver_cache_ttl=config.getoption("--driver-cache-ttl") or setting.DRIVER_CACHE_TTL,
+        driver_offline=config.getoption(
+            "--driver-offline").capitalize() == "True" or setting.DRIVER_OFFLINE,
+        hub_url=config.getoption("--hub-url") or setting.HUB_URL,
+        hub_pool_size=config.getoption("--hub-pool-size") or setting.HUB_POOL_SIZE,
+        hub_retries=config.getoption("--hub-retries")
+        if config.getoption("--hub-retries") is not None else setting.HUB_RETRIES,
+        hub_compression=config.getoption(
+            "--hub-compression").capitalize() == "True" or setting.HUB_COMPRESSION,
+        grid_throttle=config.getoption(
+            "--grid-throttle").capitalize() == "True" or setting.GRID_THROTTLE,
+        grid_wait=config.getoption("--grid-wait") or setting.GRID_WAIT,
+        fast_mode=config.getoption("--fast-mode").capitalize() == "True" or setting.FAST_MODE,
+        blocked_urls=tuple(_option_list(config, "--block-urls")) or setting.BLOCKED_URLS,
+        perf_metrics=config.getoption("--perf-metrics").capitalize() == "True" or setting.PERF_METRICS,
+        perf_budgets=config.getoption("--perf-budgets") or setting.PERF_BUDGETS,
+        admission_control=config.getoption(
+            "--admission-control").capitalize() == "True" or setting.ADMISSION_CONTROL,
+        admission_timeout=config.getoption("--admission-timeout") or setting.ADMISSION_TIMEOUT,
+    )
+    if base.host and not registry.supports(base.host):
+        raise pytest.UsageError(f"--host: no runner registered for {base.host!r}")
+    browsers = [browser.lower() for browser in _option_list(config, "--browser")] or [setting.BROWSER]
+    platforms = _option_list(config, "--platform") or [setting.PLATFORM]
+
+    for browser in browsers:
+        if browser not in BROWSERS:
+            raise pytest.UsageError(f"--browser: unknown browser {browser!r}, choose from {BROWSERS}")
+    for platform in platforms:
+        if config.getoption("--platform") and platform not in PLATFORMS:
+            raise pytest.UsageError(f"--platform: unknown platform {platform!r}, choose from {PLATFORMS}")
+    for browser in browsers:
+        try:
+            # imports only the runners of the selected host and browsers
+            registry.runner_class(base.host, browser)
+        except LookupError as exception:
+            raise pytest.UsageError(f"--browser: {browser} is not supported on {base.host}") from exception
+
+    return [replace(base, browser=browser, platform=platform)
+            for browser in browsers for platform in platforms]
+
+
+def _start_proxy(config: pytest.Config) -> None:
+    """Starts the record/replay proxy of this process and points the run
+    configurations at it. The xdist controller runs no browsers and no proxy."""
+    mode = config.getoption("--proxy-mode")
+    if mode == "off" or (not hasattr(config, "workerinput") and getattr(config.option, "numprocesses", None)):
+        return
+    unsupported = sorted({run_config.host for run_config in config._run_matrix} - set(PROXY_HOSTS))
+    if unsupported:
+        raise pytest.UsageError(f"--proxy-mode: browsers on {', '.join(unsupported)} cannot use the local proxy, "
+                                f"only {', '.join(PROXY_HOSTS)}")
+    hosts = {parse.urlparse(run_config.base_url).hostname for run_config in config._run_matrix}
+    upgrade_hosts = tuple({parse.urlparse(run_config.base_url).hostname for run_config in config._run_matrix
+                           if run_config.base_url.startswith("https://")})
+    proxy_host = config.getoption("--proxy-host")
+    # browsers in docker reach the proxy over the network, local ones over loopback
+    bind = "127.0.0.1" if proxy_host in LOOPBACK_HOSTS else "0.0.0.0"
+    proxy = CachingProxy(ResponseStore(Path(config.getoption("--proxy-dir"))), mode=mode,
+                         upgrade_hosts=upgrade_hosts, tunnel_hosts=tuple(hosts - {None}), bind=bind).start()
+    address = f"{proxy_host}:{proxy.port}"
+    config._app_proxy = proxy
+    config._run_matrix = [replace(run_config, base_url=proxy.browser_url(run_config.base_url), proxy=address)
+                          for run_config in config._run_matrix]
+
+
+def _item_run_config(item: pytest.Item) -> RunConfig:
+    """Run configuration a collected test runs with."""
+    callspec = getattr(item, "callspec", None)
+    if callspec and "run_config" in callspec.params:
+        return callspec.params["run_config"]
+    return item.config._run_matrix[0]
+
+
+def _duration_key(item: pytest.Item) -> str:
+    """Host and browser a test's duration history is kept under."""
+    run_config = _item_run_config(item)
+    return f"{run_config.host or 'localhost'}-{run_config.browser}"
+
+
+def _start_driver(run_config: RunConfig, test_name: str, record: bool = True) -> WebDriver:
+    """Starts a new browser session on the configured host. Its newSession
+    command is recorded for the running test unless `record` is False, as for
+    sessions prefetched while another test runs."""
+    start = time.perf_counter()
+    try:
+        runner = registry.runner_class(run_config.host, run_config.browser)
+    except LookupError as exception:
+        raise pytest.UsageError(f"{run_config.browser} is not supported on {run_config.host}") from exception
+    LOGGER.info(">> Running tests on %s with %s", run_config.host, runner.__name__)
+    LOGGER.info("... browser: %s", run_config.browser)
+    driver_ = runner(config=run_config, testname=test_name).start_driver()
+    driver_._startup_ms = (time.perf_counter() - start) * 1000
+
+    if run_config.command_timings:
+        RECORDER.instrument(driver_)
+        if record:
+            _record_startup(driver_)
+    return driver_
+
+
+def _record_startup(driver_: WebDriver) -> None:
+    """Adds the newSession command of a driver to the running test's timings."""
+    RECORDER.record(CommandRecord(
+        command="newSession", action="driver", locator="",
+        duration_ms=driver_._startup_ms, request_bytes=0, response_bytes=0))
+
+
+def _report_session_result(driver_: WebDriver, host: str, test_result: str) -> None:
+    """Reports the result of a whole session to the host if pass or failed."""
+    if host == "saucelabs":
+        driver_.execute_script(f"sauce:job-result={test_result}")
+
+    if host == "browserstack":
+        LOGGER.info(">> Browserstack result: %s", test_result)
+
+        if test_result == "passed":
+            driver_.execute_script(
+                'browserstack_executor: {"action": "setSessionStatus", "arguments": {"status":"passed", "reason": "Assertions have been validated!"}}')
+
+        elif test_result == "failed":
+            driver_.execute_script(
+                'browserstack_executor: {"action": "setSessionStatus", "arguments": {"status":"failed", "reason": "An assertion has failed!"}}')
+
+
+def _report_test_result(driver_: WebDriver, host: str, test_name: str, test_result: str) -> None:
+    """Annotates the result of a single test on a session shared by several tests."""
+    if host == "saucelabs":
+        driver_.execute_script(f"sauce:context={test_name} {test_result}")
+
+    if host == "browserstack":
+        level = "info" if test_result == "passed" else "error"
+        driver_.execute_script(
+            'browserstack_executor: {"action": "annotate", "arguments": '
+            f'{{"data": "{test_name} {test_result}", "level": "{level}"}}}}')
+
+
+@pytest.fixture(scope="session")
+def session_pool(request: FixtureRequest) -> SessionPool:
+    """Pool of warm browser sessions. Session scoped, so under xdist
+    every worker holds its own pool."""
+    host = request.config._run_matrix[0].host
+    pool = SessionPool(
+        max_uses=request.config.getoption("--max-session-uses"),
+        retire=lambda driver_, failed: _report_session_result(
+            driver_, host, "failed" if failed else "passed"),
+    )
+    request.addfinalizer(pool.close)
+    return pool
+
+
+@pytest.fixture(scope="session")
+def session_prefetcher(request: FixtureRequest) -> SessionPrefetcher:
+    """Provisions remote sessions for upcoming tests in the background."""
+    prefetcher = SessionPrefetcher(
+        # started during another test, recorded once the test it is for takes it
+        factory=lambda spec: _start_driver(*spec, record=False),
+        depth=request.config.getoption("--prefetch-depth"),
+    )
+    request.addfinalizer(prefetcher.close)
+    return prefetcher
+
+
+def _upcoming_tests(item: pytest.Item) -> list[tuple[str, tuple]]:
+    """Lists the node id and (run config, name) of the browser tests expected to
+    run after `item`, starting at the next item pytest handed to the runtest protocol.
+    Under xdist the tests after it are spread across the workers, so only the
+    next item is known to run here."""
+    nextitem = getattr(item, "_nextitem", None)
+    if nextitem is None:
+        return []
+    if hasattr(item.config, "workerinput"):
+        upcoming = [nextitem]
+    else:
+        items = item.session.items
+        upcoming = items[items.index(nextitem):]
+    return [(test.nodeid, (_item_run_config(test), test.name))
+            for test in upcoming if "driver" in test.fixturenames]
 
 
 @pytest.fixture
-def driver(request: FixtureRequest, headless: bool) -> WebDriver:
-    """Webdriver that initiates the browser and sets up the test environment.
-    Utilizes request pytest fixture and headless option."""
-
-    # uses values from CLI commands else uses pre-set values from config.py
-    setting.BASE_URL = request.config.getoption(
-        "--baseurl") or setting.BASE_URL
-    setting.BROWSER = request.config.getoption(
-        "--browser").lower() or setting.BROWSER
-    setting.HOST = request.config.getoption("--host").lower() or setting.HOST
-    setting.OS_VERSION = request.config.getoption(
-        "--os-version") or setting.OS_VERSION
-    setting.PLATFORM = request.config.getoption(
-        "--platform") or setting.PLATFORM
+def run_config(request: FixtureRequest) -> RunConfig:
+    """Run configuration of the test. In matrix mode (several browsers or
+    platforms) tests are parametrized with every combination."""
+    return getattr(request, "param", None) or request.config._run_matrix[0]
 
-    test_name = request.node.name
 
-    def set_host():
-        """Sets the host for the test."""
-        if setting.HOST in ("saucelabs", "saucelabs-tunnel"):
-            LOGGER.info(">> Running tests on Saucelabs")
-            sauce_driver = SauceRunner(testname=test_name)
-            driver_ = sauce_driver.start_driver()
-
-        elif setting.HOST == "browserstack":
-            LOGGER.info(">> Running tests on Browserstack")
-            bs_runner = BSRunner(testname=test_name)
-            driver_ = bs_runner.start_driver()
-
-        elif setting.HOST == "localhost":
-            LOGGER.info(">> Running tests on localhost")
-
-            if setting.BROWSER == "chrome":
-                LOGGER.info(f"... browser: {setting.BROWSER}")
-                chrome_runner = ChromeRunner(headless=headless, testname=test_name)
-                driver_ = chrome_runner.start_driver()
-
-            elif setting.BROWSER == "firefox":
-                LOGGER.info(f"... browser: {setting.BROWSER}")
-                ff_runner = FirefoxRunner(headless=headless, testname=test_name)
-                driver_ = ff_runner.start_driver()
-
-        elif setting.HOST == "docker":
-            LOGGER.info(">> Running tests on docker")
-            docker_runner = DockerRunner(headless=headless, testname=test_name)
-            driver_ = docker_runner.start_driver()
-        return driver_
-
-    driver_ = set_host()
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    """Fans browser tests out across the browser/platform matrix. Each
+    combination is a separate test item: they run serially in one process and
+    concurrently only across xdist workers (-n)."""
+    matrix = metafunc.config._run_matrix
+    if "run_config" in metafunc.fixturenames and len(matrix) > 1:
+        metafunc.parametrize("run_config", matrix, indirect=True,
+                             ids=[run_config.id for run_config in matrix])
+
+
+@pytest.fixture
+def driver(request: FixtureRequest, run_config: RunConfig) -> WebDriver:
+    """Webdriver that initiates the browser and sets up the test environment.
+    Utilizes request pytest fixture and the run configuration. With --reuse-sessions
+    the browser is borrowed from the worker's session pool. With --prefetch-depth
+    the sessions of remote hosts are provisioned while the previous test runs."""
+    test_name = request.node.name
+    reuse = request.config.getoption("--reuse-sessions").capitalize() == "True"
+    prefetch = request.config.getoption("--prefetch-depth") > 0 and run_config.host in REMOTE_HOSTS
+
+    if reuse:
+        pool = request.getfixturevalue("session_pool")
+        driver_ = pool.acquire(run_config, lambda: _start_driver(run_config, test_name))
+        if run_config.host == "saucelabs":
+            driver_.execute_script(f"sauce:context=Starting {test_name}")
+    elif prefetch:
+        prefetcher = request.getfixturevalue("session_prefetcher")
+        driver_ = prefetcher.take(request.node.nodeid, (run_config, test_name))
+        if run_config.command_timings:
+            _record_startup(driver_)
+        prefetcher.schedule(_upcoming_tests(request.node))
+    else:
+        driver_ = _start_driver(run_config, test_name)
     yield driver_
 
     def quit() -> None:
-        """Allows for the driver to be quit after the test 
-        has finished. Also reports to host if pass or failed 
+        """Allows for the driver to be quit (or handed back to the pool)
+        after the test has finished. Also reports to host if pass or failed
         test."""
         # TODO: explore using capsys here to capture stdout and stderr
-        test_result = "passed" if (request.node.rep_call.passed) else "failed"
-
-        if setting.HOST == "saucelabs":
-            driver_.execute_script(f"sauce:job-result={test_result}")
-
-        if setting.HOST == "browserstack":
-            LOGGER.info(f">> Browserstack result: {test_result}")
+        rep_call = getattr(request.node, "rep_call", None)
+        test_result = "passed" if (rep_call and rep_call.passed) else "failed"
+        if run_config.admission_control:
+            resources.sample_footprint(driver_, run_config.browser)
 
-            if test_result == "passed":
-                driver_.execute_script(
-                    'browserstack_executor: {"action": "setSessionStatus", "arguments": {"status":"passed", "reason": "Assertions have been validated!"}}')
-
-            elif test_result == "failed":
-                driver_.execute_script(
-                    'browserstack_executor: {"action": "setSessionStatus", "arguments": {"status":"failed", "reason": "An assertion has failed!"}}')
+        if reuse:
+            _report_test_result(driver_, run_config.host, test_name, test_result)
+            pool.release(driver_, failed=test_result == "failed")
+            return
 
+        _report_session_result(driver_, run_config.host, test_result)
         driver_.quit()
 
     request.addfinalizer(quit)
 
 
 @pytest.fixture
-def login(driver: WebDriver):
-    login_page = LoginPage(driver)
+def login(driver: WebDriver, run_config: RunConfig):
+    login_page = LoginPage(driver, run_config)
     return login_page
 
 
 @pytest.fixture
-def dynamic_loading(driver: WebDriver) -> DynamicLoadingPage:
+def dynamic_loading(driver: WebDriver, run_config: RunConfig) -> DynamicLoadingPage:
     """Page fixture for the dynamic loading page. Returns a DynamicLoadingPage object."""
-    dynamic_loading_page = DynamicLoadingPage(driver)
+    dynamic_loading_page = DynamicLoadingPage(driver, run_config)
     return dynamic_loading_page
 
 
+@pytest.fixture(scope="session")
+def auth_cache(request: FixtureRequest) -> AuthStateCache:
+    """Logged in session state shared by the xdist workers."""
+    return AuthStateCache(ttl=request.config.getoption("--auth-cache-ttl") * 60)
+
+
+@pytest.fixture
+def logged_in(request: FixtureRequest, driver: WebDriver, run_config: RunConfig) -> SecurePage:
+    """Secure page of a logged in session for tests that do not exercise the
+    login UI. Credentials can be given with indirect parametrization. With
+    --auth-cache the cookies and storage of the first UI login are injected
+    into later sessions; a snapshot the site rejects is dropped and the UI
+    login done again."""
+    username, password = getattr(request, "param", DEFAULT_CREDENTIALS)
+    use_cache = request.config.getoption("--auth-cache").capitalize() == "True"
+    if use_cache:
+        cache = request.getfixturevalue("auth_cache")
+        key = cache.key(run_config.base_url, username, password)
+        state = cache.get(key)
+        if state:
+            try:
+                inject(driver, run_config.base_url, state)
+                secure_page = SecurePage(driver, run_config)
+                if secure_page.is_logged_in():
+                    LOGGER.info("... reusing cached login of %s", username)
+                    return secure_page
+            except WebDriverException as exception:
+                LOGGER.warning("Could not inject cached login: %s", exception)
+            cache.invalidate(key)
+
+    login_page = LoginPage(driver, run_config)
+    login_page.with_script(username, password)
+    # the form is submitted by a script, which drivers do not wait for: opening
+    # the secure page before the login response arrived would cancel the login
+    login_page.success_message_present()
+    secure_page = SecurePage(driver, run_config)
+    assert secure_page.is_logged_in(), f"Could not log in as {username}"
+    if use_cache:
+        cache.put(key, snapshot(driver))
+    return secure_page
+
+
+@pytest.fixture
+def async_sessions(request: FixtureRequest, run_config: RunConfig) -> AsyncSessionRunner:
+    """Runs async page-object flows concurrently in remote sessions, bounded by
+    --async-concurrency. Local browsers are not supported in async mode."""
+    if run_config.host not in REMOTE_HOSTS:
+        pytest.skip("async mode drives remote sessions only")
+    return AsyncSessionRunner(run_config, concurrency=request.config.getoption("--async-concurrency"))
+
+
 def pytest_addoption(parser: Parser) -> None:
     """Adds CLI options to pytest."""
     parser.addoption("--headless",
@@ -121,9 +391,9 @@ def pytest_addoption(parser: Parser) -> None:
     parser.addoption("--browser",
                      action="store",
                      default="chrome",
-                     help="browser for the test",
-                     choices=("chrome", "firefox")
-                     )
+                     help="browser for the test: chrome, firefox, edge. A comma separated "
+                          "list runs every test on each browser; the combinations run one "
+                          "after another unless spread over xdist workers with -n")
     parser.addoption("--browserversion",
                      action="store",
                      default="latest",
@@ -131,23 +401,244 @@ def pytest_addoption(parser: Parser) -> None:
     parser.addoption("--host",
                      action="store",
                      default="localhost",
-                     help="host for the test: localhost, saucelabs, browserstack",
-                     choices=("localhost", "saucelabs", "saucelabs-tunnel", "browserstack", "docker"))
+                     help="host for the test: localhost, saucelabs, saucelabs-tunnel, browserstack, docker "
+                          "or the host of a registered runner")
     parser.addoption("--platform",
                      action="store",
-                     help="OS platform for the test",
-                     choices=("Windows", "OS X", "Linux"))
+                     help="OS platform for the test: Windows, OS X, Linux. A comma separated "
+                          "list runs every test on each platform; the combinations run one "
+                          "after another unless spread over xdist workers with -n")
     parser.addoption("--os-version",
                      action="store",
                      help="OS version for the test",
                      choices=("10", "11", "Monterey", "Big Sur"))
+    parser.addoption("--reuse-sessions",
+                     action="store",
+                     default="False",
+                     help="Whether or not to reuse warm browser sessions between tests",
+                     choices=("True", "False")
+                     )
+    parser.addoption("--max-session-uses",
+                     action="store",
+                     default=10,
+                     type=int,
+                     help="Number of tests a pooled browser session serves before it is recycled")
+    parser.addoption("--prefetch-depth",
+                     action="store",
+                     default=0,
+                     type=int,
+                     help="Number of upcoming tests to provision remote sessions for in the "
+                          "background (0 disables prefetching, ignored with --reuse-sessions)")
+    parser.addoption("--async-concurrency",
+                     action="store",
+                     default=10,
+                     type=int,
+                     help="Maximum number of remote sessions the async_sessions fixture drives "
+                          "at the same time from one event loop")
+    parser.addoption("--wait-strategy",
+                     action="store",
+                     help="How page objects wait for elements: webdriverwait (fixed 0.5 s polling), "
+                          "observer (MutationObserver, falls back to poll) or poll (exponential back-off)",
+                     choices=("webdriverwait", "observer", "poll"))
+    parser.addoption("--command-timings",
+                     action="store",
+                     default="False",
+                     help="Record every WebDriver command, attach per-test timings to the HTML "
+                          "report and write run-wide p50/p95 per command next to it",
+                     choices=("True", "False")
+                     )
+    parser.addoption("--screenshot-format",
+                     action="store",
+                     default="png",
+                     help="Image format of failure screenshots (jpeg and webp need Pillow)",
+                     choices=("png", "jpeg", "webp"))
+    parser.addoption("--screenshot-max-width",
+                     action="store",
+                     type=int,
+                     help="Downscale failure screenshots to at most this many pixels wide")
+    parser.addoption("--screenshot-max-kb",
+                     action="store",
+                     type=int,
+                     help="Size budget for a failure screenshot, in KB")
+    parser.addoption("--report-assets",
+                     action="store",
+                     default="inline",
+                     help="inline: embed screenshots and logs in the HTML report; external: write them "
+                          "as content-addressed files next to it and stream results to results.jsonl",
+                     choices=("inline", "external"))
+    parser.addoption("--fast-mode",
+                     action="store",
+                     default="False",
+                     help="Fast browser profile for chrome, firefox and edge: eager page loads, blocked "
+                          "images, fonts and trackers, no background networking, GPU or animations. "
+                          "Page load savings are reported against the last run without it",
+                     choices=("True", "False"))
+    parser.addoption("--block-urls",
+                     action="store",
+                     help="Comma separated url patterns the fast profile blocks instead of the "
+                          "defaults from config.py. Blocked through CDP, so on chrome and edge only")
+    parser.addoption("--proxy-mode",
+                     action="store",
+                     default="off",
+                     help="Route the browser through a local proxy for the application under test. "
+                          "record: fetch and record every response; replay: serve recordings only, "
+                          "no network; passthrough: live, with static assets cached",
+                     choices=("off", "record", "replay", "passthrough"))
+    parser.addoption("--proxy-dir",
+                     action="store",
+                     default="recordings",
+                     help="Directory of the proxy recordings, shared by all xdist workers")
+    parser.addoption("--proxy-host",
+                     action="store",
+                     default="127.0.0.1",
+                     help="Address under which the browser reaches the proxy, "
+                          "e.g. host.docker.internal for --host=docker. The proxy only listens "
+                          "on all interfaces for addresses other than loopback")
+    parser.addoption("--auth-cache",
+                     action="store",
+                     default="True",
+                     help="Reuse the cookies and storage of a UI login in later sessions of the "
+                          "logged_in fixture",
+                     choices=("True", "False"))
+    parser.addoption("--auth-cache-ttl",
+                     action="store",
+                     default=30,
+                     type=float,
+                     help="Minutes a cached login is reused for")
+    parser.addoption("--perf-metrics",
+                     action="store",
+                     default="False",
+                     help="Collect Navigation Timing, resource timing and web vitals (LCP, CLS, TTFB) "
+                          "after every page load, check the page budgets and append the metrics to "
+                          "the --perf-history time series",
+                     choices=("True", "False"))
+    parser.addoption("--perf-budgets",
+                     action="store",
+                     help="What a page exceeding its performance budgets does: warn or fail the test",
+                     choices=BUDGET_MODES)
+    parser.addoption("--perf-history",
+                     action="store",
+                     default="reports/page_metrics.jsonl",
+                     help="JSON lines file the page metrics of every run are appended to")
+    parser.addoption("--log-mode",
+                     action="store",
+                     default="live",
+                     help="live: project logs go through pytest's live and captured logging; "
+                          "buffered: each test's logs are kept in a ring buffer and only written, "
+                          "to the report and buffered_logs.jsonl, for failed and xfailed tests",
+                     choices=("live", "buffered"))
+    parser.addoption("--log-buffer-size",
+                     action="store",
+                     default=500,
+                     type=int,
+                     help="With --log-mode=buffered, records kept per test (the oldest are dropped)")
+    parser.addoption("--log-buffer-level",
+                     action="store",
+                     default="INFO",
+                     help="With --log-mode=buffered, lowest level of the buffered records",
+                     choices=("DEBUG", "INFO", "WARNING"))
+    parser.addoption("--schedule",
+                     action="store",
+                     default="collection",
+                     help="collection: keep the collection order (durations are still recorded); "
+                          "lpt: run the tests with the longest recorded duration (per host and "
+                          "browser) first to shorten the makespan across xdist workers",
+                     choices=("collection", "lpt"))
+    parser.addoption("--impact-base",
+                     action="store",
+                     help="Only run the tests affected by the changes since this git ref (e.g. "
+                          "origin/main), found through the cached dependency index of fixtures, "
+                          "page objects, locators and driver modules; changes to conftest.py or "
+                          "pages/base_page.py run everything")
+    parser.addoption("--lpt-failed-first",
+                     action="store",
+                     default="False",
+                     help="With --schedule=lpt, run the tests that failed last time first",
+                     choices=("True", "False"))
+    parser.addoption("--hub-url",
+                     action="store",
+                     help="Selenium grid hub used with --host=docker (default from config.py)")
+    parser.addoption("--grid-throttle",
+                     action="store",
+                     default="False",
+                     help="Only request docker sessions when the grid reports a free slot",
+                     choices=("True", "False")
+                     )
+    parser.addoption("--grid-wait",
+                     action="store",
+                     type=float,
+                     help="Seconds to wait for a free grid slot before failing")
+    parser.addoption("--admission-control",
+                     action="store",
+                     default="False",
+                     help="Hold back new local or local-grid sessions while memory, "
+                          "/dev/shm or CPU of this machine is saturated",
+                     choices=("True", "False")
+                     )
+    parser.addoption("--admission-timeout",
+                     action="store",
+                     type=float,
+                     help="Seconds a session waits for admission before failing")
+    parser.addoption("--hub-pool-size",
+                     action="store",
+                     type=int,
+                     help="Keep-alive connections per remote hub and xdist worker")
+    parser.addoption("--hub-retries",
+                     action="store",
+                     type=int,
+                     help="Retries with back-off when a remote hub answers 502/503/504")
+    parser.addoption("--hub-compression",
+                     action="store",
+                     default="False",
+                     help="Ask remote hubs for gzip compressed responses",
+                     choices=("True", "False")
+                     )
+    parser.addoption("--driver-cache-ttl",
+                     action="store",
+                     type=float,
+                     help="Hours a resolved chromedriver/geckodriver stays valid in the shared index")
+    parser.addoption("--driver-offline",
+                     action="store",
+                     default="False",
+                     help="Never re-resolve drivers over the network once the index is populated",
+                     choices=("True", "False")
+                     )
 
 
-@pytest.fixture
-def headless(request: FixtureRequest) -> bool:
-    """CLI option to run tests in headless mode"""
-    is_headless = request.config.getoption("--headless").capitalize()
-    return True if is_headless == "True" else False
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_auto_num_workers(config: pytest.Config) -> Optional[int]:
+    """With -n auto, sizes the xdist workers from the cores, memory and
+    /dev/shm this machine has for the selected browser (using its measured
+    footprint), on the docker host at most one per grid slot. None leaves
+    the count to xdist (one per CPU)."""
+    run_config = _run_matrix(config)[0]
+    if run_config.host not in ("localhost", "docker"):
+        return None
+    workers = resources.worker_count(run_config) if resources.is_local(run_config) else None
+    if workers:
+        LOGGER.info(">> Machine has room for %s %s sessions", workers, run_config.browser)
+    if run_config.host == "docker":
+        try:
+            slots = worker_count(run_config.hub_url, run_config.browser)
+        except OSError as exception:
+            LOGGER.warning("Could not read grid capacity from %s: %s", run_config.hub_url, exception)
+            return workers
+        LOGGER.info(">> Grid has %s slots", slots)
+        workers = min(slots, workers or slots)
+    if workers is not None:
+        LOGGER.info(">> Starting %s workers", workers)
+    return workers
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item: pytest.Item, nextitem: pytest.Item) -> None:
+    """Remembers which test runs next, used to prefetch its session, and
+    attributes recorded WebDriver commands and proxied responses to the running test."""
+    item._nextitem = nextitem
+    RECORDER.current_test = item.nodeid
+    if hasattr(item.config, "_app_proxy"):
+        item.config._app_proxy.scope(item.nodeid)
+    yield
 
 
 @pytest.hookimpl(hookwrapper=True, tryfirst=True)
@@ -162,21 +653,95 @@ def pytest_runtest_makereport(item: pytest.Item, call: pytest.CallInfo) -> None:
     setattr(item, "rep_" + report.when, report)
     extra = getattr(report, "extra", [])
 
-    if report.when == "call":
-        feature_request = item.funcargs["request"]
-        driver = feature_request.getfixturevalue("driver")
+    if report.when == "call" and "driver" in item.fixturenames:
+        driver = item.funcargs["driver"]
         nodeid = item.nodeid
+        report.page_load = take_page_loads(driver)
+        report.page_load_key = _duration_key(item)
+        run_config = _item_run_config(item)
+        if run_config.perf_metrics:
+            report.page_metrics = take_page_metrics(driver)
+            report.page_metrics_tags = {
+                "host": run_config.host or "localhost", "browser": run_config.browser,
+                "platform": run_config.platform}
         xfail = hasattr(report, "wasxfail")
 
         if (report.skipped and xfail) or (report.failed and not xfail):
-            file_name = f"{nodeid}_{datetime.today().strftime('%Y-%m-%d_%H_%M')}.png".replace(
+            file_name = f"{nodeid}_{datetime.today().strftime('%Y-%m-%d_%H_%M')}".replace(
                 "/", "_").replace("::", "_").replace(".py", "")
-            img_path = os.path.join(report_path, "screenshots", file_name)
-            driver.save_screenshot(img_path)
-            screenshot = driver.get_screenshot_as_base64()  # the hero
-            extra.append(pytest_html.extras.image(screenshot, ""))
+            # a single capture, encoding and writing happen off the test thread
+            png = driver.get_screenshot_as_png()
+            pipeline = _screenshot_pipeline(item.config, report_path)
+            path = pipeline.submit(png, file_name)
+            if pytest_html:
+                if pipeline.transforms or pipeline.content_addressed:
+                    # link the file the pipeline is still encoding instead of waiting for it
+                    href = Path(os.path.relpath(path, _report_dir(item.config))).as_posix()
+                else:
+                    href = None
+                    extra.append(pytest_html.extras.image(
+                        base64.b64encode(png).decode(), "", mime_type=MIME_TYPES["png"], extension="png"))
+                if href:
+                    extra.append(pytest_html.extras.html(
+                        f'<div class="image"><a href="{href}" target="_blank"><img src="{href}"/></a></div>'))
         report.extra = extra
 
+    if report.when == "teardown" and _item_run_config(item).command_timings:
+        records = RECORDER.take(item.nodeid)
+        if records:
+            if pytest_html:
+                report.extra = extra + [pytest_html.extras.html(timing_table(records))]
+            report.command_timings = serialize(records)
+
+
+def _screenshot_pipeline(config: pytest.Config, report_path: str) -> ScreenshotPipeline:
+    """Screenshot pipeline of this process, created on the first failure."""
+    if not hasattr(config, "_screenshot_pipeline"):
+        # external reports keep screenshots with their other assets, written once
+        external = config.getoption("--report-assets") == "external"
+        config._screenshot_pipeline = ScreenshotPipeline(
+            directory=_report_dir(config) / "assets" if external else Path(report_path, "screenshots"),
+            image_format=config.getoption("--screenshot-format"),
+            max_width=config.getoption("--screenshot-max-width"),
+            max_kb=config.getoption("--screenshot-max-kb"),
+            content_addressed=external,
+        )
+    return config._screenshot_pipeline
+
+
+def _report_dir(config: pytest.Config) -> Path:
+    """Folder holding the HTML report."""
+    return Path(config.option.htmlpath or "reports/report.html").parent
+
+
+def pytest_runtest_logreport(report: pytest.TestReport) -> None:
+    """Collects the recorded command timings, also those sent by xdist workers."""
+    if hasattr(report, "command_timings"):
+        COMMAND_STATS.add(report.command_timings)
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    """Flushes pending screenshots and writes the run-wide command timings
+    once, from the controller."""
+    if hasattr(session.config, "_screenshot_pipeline"):
+        session.config._screenshot_pipeline.close()
+
+    stats = transport_stats()
+    # connections of unit tests to fake hubs are not worth keeping
+    remote = any(run_config.host in REMOTE_HOSTS for run_config in getattr(session.config, "_run_matrix", ()))
+    if stats and remote:
+        worker = getattr(session.config, "workerinput", {}).get("workerid", "main")
+        LOGGER.info(">> Remote transport (%s): %s", worker, stats)
+        report_dir = _report_dir(session.config)
+        report_dir.mkdir(parents=True, exist_ok=True)
+        with open(report_dir / "transport_stats.jsonl", "a", encoding="utf-8") as stats_file:
+            stats_file.write(json.dumps({"worker": worker, "hubs": stats}) + "\n")
+    close_pools()
+
+    timings = session.config.getoption("--command-timings").capitalize() == "True"
+    if timings and not hasattr(session.config, "workerinput"):
+        COMMAND_STATS.write(_report_dir(session.config))
+
 
 @pytest.hookimpl(tryfirst=True)
 def pytest_configure(config):
@@ -197,7 +762,11 @@ def pytest_configure(config):
 
 
 def pytest_configure(config):  # pylint: disable=unused-argument
-    """Adds metadata to the HTML report."""
+    """Adds metadata to the HTML report and builds the run configurations.
+    With --report-assets=external, screenshots and logs are linked from the
+    report instead of inlined."""
+    config._run_matrix = _run_matrix(config)
+    _start_proxy(config)
     config._metadata["project"] = "Demo"
     config._metadata["tags"] = ["pytest", "selenium", "python"]
     config._metadata["browser"] = config.getoption("--browser")
@@ -214,3 +783,43 @@ def pytest_configure(config):  # pylint: disable=unused-argument
             "--platform")
         config._metadata["browser version"] = config.getoption(
             "--browserversion")
+
+    if config.getoption("--report-assets") == "external":
+        config.option.self_contained_html = False
+        config.pluginmanager.register(
+            ExternalReport(config, _report_dir(config)), "external_report")
+
+    if config.getoption("--log-mode") == "buffered":
+        config.pluginmanager.register(BufferedLogging(
+            config, _report_dir(config) / "buffered_logs.jsonl",
+            capacity=config.getoption("--log-buffer-size"),
+            level=config.getoption("--log-buffer-level"),
+        ), "buffered_logging")
+
+    if config._run_matrix[0].perf_metrics:
+        config.pluginmanager.register(PageMetricsReport(
+            config, Path(config.getoption("--perf-history"))), "page_metrics_report")
+
+    if getattr(config, "cache", None):
+        config.pluginmanager.register(PageLoadReport(
+            config, _report_dir(config),
+            fast_mode=config._run_matrix[0].fast_mode,
+        ), "page_load_report")
+
+    if config.getoption("--impact-base"):
+        config.pluginmanager.register(
+            ImpactSelector(config, config.getoption("--impact-base")), "impact_selector")
+
+    if getattr(config, "cache", None):
+        config.pluginmanager.register(DurationScheduler(
+            config,
+            key=_duration_key,
+            failed_first=config.getoption("--lpt-failed-first").capitalize() == "True",
+            reorder=config.getoption("--schedule") == "lpt",
+        ), "duration_scheduler")
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    """Stops the record/replay proxy."""
+    if hasattr(config, "_app_proxy"):
+        config._app_proxy.stop()
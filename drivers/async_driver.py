@@ -0,0 +1,290 @@
+import asyncio
+import base64
+import json
+import logging
+import ssl
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+from urllib import parse
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.errorhandler import ErrorHandler
+from config import RunConfig
+from drivers.registry import runner_class
+
+
+LOGGER = logging.getLogger(__name__)
+# W3C web element identifier
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+
+@dataclass
+class AsyncTransport:
+    """Minimal HTTP/1.1 client for one hub on asyncio streams. Keeps up to
+    `pool_size` keep-alive connections open and shares them between every
+    session of the event loop, so waiting on the network never blocks a thread."""
+
+    url: str
+    pool_size: int = 10
+    timeout: float = 300
+    connections: int = field(default=0, init=False)
+    _idle: list = field(default_factory=list, init=False)
+    _slots: asyncio.Semaphore = field(init=False)
+
+    def __post_init__(self):
+        parsed = parse.urlparse(self.url)
+        secure = parsed.scheme == "https"
+        self._host = parsed.hostname
+        self._port = parsed.port or (443 if secure else 80)
+        self._ssl = ssl.create_default_context() if secure else None
+        self._path = parsed.path.rstrip("/")
+        self._auth = None
+        if parsed.username:
+            credentials = f"{parse.unquote(parsed.username)}:{parse.unquote(parsed.password or '')}"
+            self._auth = base64.b64encode(credentials.encode()).decode()
+        self._slots = asyncio.Semaphore(self.pool_size)
+
+    async def request(self, method: str, path: str, payload: Optional[dict] = None) -> tuple[int, str]:
+        """Sends a command, returns the status code and the response body. A
+        kept-alive connection the hub closed in the meantime is retried once
+        on a new connection."""
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        async with self._slots:
+            for attempt in range(2):
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused else await self._connect()
+                try:
+                    status, keep_alive, data = await asyncio.wait_for(
+                        self._exchange(reader, writer, method, path, body), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, data
+
+    async def close(self) -> None:
+        """Closes every idle connection."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def _connect(self) -> tuple:
+        """Opens a new connection to the hub."""
+        self.connections += 1
+        return await asyncio.open_connection(self._host, self._port, ssl=self._ssl)
+
+    async def _exchange(self, reader, writer, method: str, path: str, body: bytes) -> tuple:
+        """Writes one request and reads its response."""
+        headers = [
+            f"{method} {self._path}{path} HTTP/1.1",
+            f"Host: {self._host}:{self._port}",
+            "Accept: application/json",
+            "Content-Type: application/json;charset=UTF-8",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive",
+        ]
+        if self._auth:
+            headers.append(f"Authorization: Basic {self._auth}")
+        writer.write("\r\n".join(headers).encode("latin-1") + b"\r\n\r\n" + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the hub")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = response_headers.get("connection", "").lower() != "close"
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b"".join(chunks)
+        elif "content-length" in response_headers:
+            data = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return status, keep_alive, data.decode("utf-8")
+
+
+async def _command(transport: AsyncTransport, method: str, path: str, payload: Optional[dict] = None):
+    """Sends a command and returns the "value" of the response. Errors are
+    raised as the same selenium exceptions the synchronous driver raises."""
+    status, data = await transport.request(method, path, payload)
+    if status >= 400:
+        ErrorHandler().check_response({"status": status, "value": data})
+        raise WebDriverException(f"{method} {path} failed with status {status}: {data}")
+    return json.loads(data).get("value") if data else None
+
+
+class AsyncWebElement:
+    """Element of an AsyncWebDriver session."""
+
+    def __init__(self, driver: "AsyncWebDriver", element_id: str):
+        self.driver = driver
+        self.id = element_id  # pylint: disable=invalid-name
+
+    async def click(self) -> None:
+        await self.driver.execute("POST", f"/element/{self.id}/click")
+
+    async def clear(self) -> None:
+        await self.driver.execute("POST", f"/element/{self.id}/clear")
+
+    async def send_keys(self, text: str) -> None:
+        await self.driver.execute("POST", f"/element/{self.id}/value", {"text": text, "value": list(text)})
+
+    async def is_displayed(self) -> bool:
+        return await self.driver.execute("GET", f"/element/{self.id}/displayed")
+
+    async def text(self) -> str:
+        return await self.driver.execute("GET", f"/element/{self.id}/text")
+
+
+class AsyncWebDriver:
+    """W3C WebDriver client for one remote session, driven from an event loop.
+    Covers the commands the page objects use."""
+
+    def __init__(self, transport: AsyncTransport, session_id: str, capabilities: dict):
+        self.transport = transport
+        self.session_id = session_id
+        self.capabilities = capabilities
+        # script timeout last set, False once async scripts proved unsupported
+        self.async_script_state = None
+
+    @classmethod
+    async def start(cls, transport: AsyncTransport, capabilities: dict) -> "AsyncWebDriver":
+        """Requests a new session from the hub."""
+        value = await _command(transport, "POST", "/session", {
+            "capabilities": {"alwaysMatch": capabilities, "firstMatch": [{}]}})
+        return cls(transport, value["sessionId"], value.get("capabilities", {}))
+
+    async def execute(self, method: str, path: str, payload: Optional[dict] = None):
+        """Sends a session command, returns its value with elements wrapped."""
+        if payload is None and method == "POST":
+            payload = {}
+        value = await _command(self.transport, method, f"/session/{self.session_id}{path}", payload)
+        return self._unwrap(value)
+
+    async def get(self, url: str) -> None:
+        await self.execute("POST", "/url", {"url": url})
+
+    async def current_url(self) -> str:
+        return await self.execute("GET", "/url")
+
+    async def find_element(self, by: str, value: str) -> AsyncWebElement:
+        return await self.execute("POST", "/element", _w3c_locator(by, value))
+
+    async def find_elements(self, by: str, value: str) -> list[AsyncWebElement]:
+        return await self.execute("POST", "/elements", _w3c_locator(by, value))
+
+    async def execute_script(self, script: str, *args):
+        return await self.execute("POST", "/execute/sync", {"script": script, "args": self._wrap(list(args))})
+
+    async def execute_async_script(self, script: str, *args):
+        return await self.execute("POST", "/execute/async", {"script": script, "args": self._wrap(list(args))})
+
+    async def set_script_timeout(self, seconds: float) -> None:
+        await self.execute("POST", "/timeouts", {"script": int(seconds * 1000)})
+
+    async def maximize_window(self) -> None:
+        await self.execute("POST", "/window/maximize")
+
+    async def quit(self) -> None:
+        """Ends the session; the transport stays open for other sessions."""
+        await _command(self.transport, "DELETE", f"/session/{self.session_id}")
+
+    def _wrap(self, value):
+        """Replaces elements in script arguments by their W3C reference."""
+        if isinstance(value, AsyncWebElement):
+            return {ELEMENT_KEY: value.id}
+        if isinstance(value, (list, tuple)):
+            return [self._wrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._wrap(item) for key, item in value.items()}
+        return value
+
+    def _unwrap(self, value):
+        """Replaces W3C element references in a response by elements."""
+        if isinstance(value, list):
+            return [self._unwrap(item) for item in value]
+        if isinstance(value, dict):
+            if ELEMENT_KEY in value:
+                return AsyncWebElement(self, value[ELEMENT_KEY])
+            return {key: self._unwrap(item) for key, item in value.items()}
+        return value
+
+
+def _w3c_locator(by: str, value: str) -> dict:
+    """Translates legacy locator strategies to CSS like selenium does."""
+    if by == By.ID:
+        by, value = By.CSS_SELECTOR, f'[id="{value}"]'
+    elif by == By.CLASS_NAME:
+        by, value = By.CSS_SELECTOR, f".{value}"
+    elif by == By.NAME:
+        by, value = By.CSS_SELECTOR, f'[name="{value}"]'
+    return {"using": by, "value": value}
+
+
+@dataclass
+class AsyncSessionRunner:
+    """Runs page-object flows concurrently from a single event loop, each in
+    its own remote session. At most `concurrency` sessions exist at a time
+    and all of them share one keep-alive transport per hub."""
+
+    config: RunConfig
+    concurrency: int = 10
+
+    def run(self, flows: dict[str, Callable[[AsyncWebDriver], Awaitable]]) -> dict:
+        """Runs the flows on a new event loop. Returns the result of every
+        flow by name, or the exception it raised."""
+        return asyncio.run(self.arun(flows))
+
+    async def arun(self, flows: dict[str, Callable[[AsyncWebDriver], Awaitable]]) -> dict:
+        """Runs the flows on the running event loop."""
+        gate = asyncio.Semaphore(self.concurrency)
+        transports = {}
+
+        async def run_flow(name: str, flow: Callable[[AsyncWebDriver], Awaitable]):
+            async with gate:
+                runner = runner_class(self.config.host, self.config.browser)(config=self.config, testname=name)
+                capabilities = runner.capabilities
+                if not isinstance(capabilities, dict):
+                    capabilities = capabilities.to_capabilities()
+                url = runner.url
+                if url not in transports:
+                    transports[url] = AsyncTransport(url, pool_size=self.concurrency)
+                driver_ = await AsyncWebDriver.start(transports[url], capabilities)
+                LOGGER.info("... testing (async): %s", name)
+                try:
+                    return await flow(driver_)
+                finally:
+                    await driver_.quit()
+
+        try:
+            results = await asyncio.gather(
+                *(run_flow(name, flow) for name, flow in flows.items()), return_exceptions=True)
+        finally:
+            for transport in transports.values():
+                await transport.close()
+        return dict(zip(flows, results))
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+from drivers.filelock import file_lock, write_atomic
+from pages import scripts
+
+
+LOGGER = logging.getLogger(__name__)
+# cookie fields WebDriver accepts in add_cookie; the domain is left to the
+# browser so a cookie recorded on one host name is accepted on the same site
+COOKIE_FIELDS = ("name", "value", "path", "secure", "httpOnly", "expiry", "sameSite")
+
+
+@dataclass
+class AuthStateCache:
+    """Cookies and web storage of logged in sessions, shared by all xdist
+    workers through a file-locked store. Entries expire `ttl` seconds after
+    the login that produced them; beyond `max_entries` the least recently
+    used entry is evicted. Credentials are only stored as a hash."""
+
+    path: Path = Path(".pytest_cache", "auth", "state.json")
+    ttl: float = 30 * 60
+    max_entries: int = 32
+
+    @staticmethod
+    def key(base_url: str, username: str, password: str) -> str:
+        """Cache key of a set of credentials on a site."""
+        return hashlib.sha256(f"{base_url}\0{username}\0{password}".encode("utf-8")).hexdigest()[:24]
+
+    def get(self, key: str) -> Optional[dict]:
+        """Snapshot stored under `key`, None if missing or expired."""
+        now = time.time()
+
+        def lookup(entries: dict) -> Optional[dict]:
+            entry = entries.get(key)
+            if entry:
+                entry["used_at"] = now
+            return entry and entry["state"]
+
+        return self._update(lookup)
+
+    def put(self, key: str, state: dict) -> None:
+        """Stores a snapshot, evicting the least recently used entries."""
+        now = time.time()
+
+        def store(entries: dict) -> None:
+            entries[key] = {"state": state, "created_at": now, "used_at": now}
+            for stale in sorted(entries, key=lambda name: entries[name]["used_at"])[:-self.max_entries]:
+                del entries[stale]
+
+        self._update(store)
+
+    def invalidate(self, key: str) -> None:
+        """Drops a snapshot the site no longer accepts."""
+        LOGGER.info("... invalidating cached login %s", key)
+        self._update(lambda entries: entries.pop(key, None))
+
+    def _update(self, change):
+        """Applies `change` to the unexpired entries under the cross-process lock."""
+        with file_lock(self.path.with_suffix(".lock")):
+            try:
+                entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                entries = {}
+            now = time.time()
+            entries = {key: entry for key, entry in entries.items()
+                       if now - entry["created_at"] < self.ttl}
+            result = change(entries)
+            write_atomic(self.path, json.dumps(entries))
+            os.chmod(self.path, 0o600)
+        return result
+
+
+def snapshot(driver: WebDriver) -> dict:
+    """Cookies and web storage of the page the driver is on."""
+    local_storage, session_storage = driver.execute_script(scripts.SNAPSHOT_STORAGE)
+    return {
+        "cookies": driver.get_cookies(),
+        "local_storage": local_storage,
+        "session_storage": session_storage,
+    }
+
+
+def inject(driver: WebDriver, base_url: str, state: dict) -> None:
+    """Restores a snapshot into a session. Cookies can only be set for the
+    origin the browser is on, so the site root is opened first."""
+    driver.get(f"{base_url}/")
+    driver.delete_all_cookies()
+    for cookie in state["cookies"]:
+        driver.add_cookie({name: value for name, value in cookie.items() if name in COOKIE_FIELDS})
+    driver.execute_script(scripts.RESTORE_STORAGE, state["local_storage"], state["session_storage"])
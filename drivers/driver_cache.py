@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import platform
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+from config import RunConfig
+from drivers.filelock import file_lock, write_atomic
+
+try:
+    from webdriver_manager.core.utils import ChromeType, get_browser_version_from_os
+except ImportError:
+    # webdriver-manager 4.x moved both into its OS manager
+    from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+    get_browser_version_from_os = OperationSystemManager().get_browser_version_from_os
+
+
+LOGGER = logging.getLogger(__name__)
+INDEX_PATH = Path.home() / ".wdm" / "driver_index.json"
+BROWSER_TYPES = {"chrome": ChromeType.GOOGLE, "firefox": "firefox"}
+
+
+@lru_cache(maxsize=None)
+def local_browser_version(browser: str) -> str:
+    """Version of the locally installed browser, probed once per process."""
+    browser_type = BROWSER_TYPES.get(browser, browser)
+    return get_browser_version_from_os(browser_type) or "unknown"
+
+
+@dataclass
+class DriverResolver:
+    """Resolves driver binaries through a file-locked on-disk index shared
+    by all xdist workers, so webdriver-manager runs at most once per
+    browser, browser version and platform within `ttl` seconds.
+
+    In `offline` mode a cached entry is used regardless of its age and the
+    installer is only called when nothing usable is cached yet.
+    """
+
+    index_path: Path = INDEX_PATH
+    ttl: float = 24 * 60 * 60
+    offline: bool = False
+    _resolved: dict = field(default_factory=dict, init=False)
+
+    def resolve(self, browser: str, install: Callable[[], str],
+                browser_version: Optional[str] = None) -> str:
+        """Returns the driver path for `browser`, calling `install` only on
+        a cache miss."""
+        version = browser_version or local_browser_version(browser)
+        key = f"{browser}|{version}|{platform.system().lower()}-{platform.machine().lower()}"
+        if key in self._resolved:
+            return self._resolved[key]
+
+        with file_lock(self.index_path.with_suffix(".lock")):
+            index = self._read_index()
+            entry = index.get(key)
+            if entry and os.path.exists(entry["path"]) and (
+                    self.offline or time.time() - entry["resolved_at"] < self.ttl):
+                LOGGER.info("... using cached driver for %s", key)
+                path = entry["path"]
+            else:
+                if self.offline:
+                    LOGGER.warning("No cached driver for %s, installing despite offline mode", key)
+                path = install()
+                index[key] = {"path": path, "resolved_at": time.time()}
+                write_atomic(self.index_path, json.dumps(index, indent=2))
+
+        self._resolved[key] = path
+        return path
+
+    def _read_index(self) -> dict:
+        """Reads the index, treating a missing or corrupt file as empty."""
+        try:
+            return json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+
+_RESOLVERS: dict = {}
+
+
+def resolve_driver(browser: str, install: Callable[[], str], config: RunConfig) -> str:
+    """Resolves a driver binary with the process-wide resolver for the TTL and
+    offline mode of `config`."""
+    key = (config.driver_cache_ttl, config.driver_offline)
+    if key not in _RESOLVERS:
+        _RESOLVERS[key] = DriverResolver(
+            ttl=float(config.driver_cache_ttl) * 60 * 60,
+            offline=config.driver_offline,
+        )
+    return _RESOLVERS[key].resolve(browser, install)
@@ -0,0 +1,94 @@
+import logging
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+from config import RunConfig
+
+
+LOGGER = logging.getLogger(__name__)
+# CDP endpoints of chromium based browsers behind a remote (grid) connection
+CDP_VENDORS = {"chrome": "goog", "edge": "ms"}
+
+CHROME_ARGUMENTS = (
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-gpu",
+    "--disable-renderer-backgrounding",
+    "--force-prefers-reduced-motion",
+    "--blink-settings=imagesEnabled=false",
+)
+
+FIREFOX_PREFERENCES = {
+    "permissions.default.image": 2,
+    "gfx.downloadable_fonts.enabled": False,
+    "media.autoplay.default": 5,
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.http.speculative-parallel-limit": 0,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "app.update.auto": False,
+    "layers.acceleration.disabled": True,
+    "ui.prefersReducedMotion": 1,
+    "toolkit.cosmeticAnimations.enabled": False,
+}
+
+# turns off CSS animations and transitions before any page script runs: the
+# style goes on the root element right away, as there is no <head> yet
+NO_ANIMATIONS = """
+(() => {
+    const style = document.createElement("style");
+    style.textContent = "*, *::before, *::after { animation: none !important; transition: none !important; }";
+    if (document.documentElement) {
+        document.documentElement.appendChild(style);
+    } else {
+        document.addEventListener("readystatechange", () => document.documentElement.appendChild(style),
+                                  {once: true});
+    }
+})();
+"""
+
+
+def chrome_options(options: webdriver.ChromeOptions) -> webdriver.ChromeOptions:
+    """Fast profile for Chrome and Edge: eager page loads, no images, no
+    background networking, GPU or animations."""
+    options.page_load_strategy = "eager"
+    for argument in CHROME_ARGUMENTS:
+        options.add_argument(argument)
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+def firefox_options(options: webdriver.FirefoxOptions) -> webdriver.FirefoxOptions:
+    """Fast profile for Firefox. Firefox has no CDP, so blocking is limited
+    to the resource types its preferences can turn off: the url patterns of
+    --block-urls (fonts by extension, trackers) apply to Chrome and Edge only."""
+    options.page_load_strategy = "eager"
+    for name, value in FIREFOX_PREFERENCES.items():
+        options.set_preference(name, value)
+    return options
+
+
+def block_resources(driver: WebDriver, config: RunConfig) -> None:
+    """Blocks the url patterns of the run configuration and disables
+    animations through CDP. Remote chromium sessions reach CDP through the
+    grid's vendor endpoint; browsers without CDP keep the option-level profile."""
+    vendor = CDP_VENDORS.get(config.browser)
+    if vendor is None:
+        return
+    if not hasattr(driver, "execute_cdp_cmd"):
+        driver.command_executor._commands.setdefault(
+            "executeCdpCommand", ("POST", f"/session/$sessionId/{vendor}/cdp/execute"))
+
+    def cdp(cmd: str, params: dict) -> None:
+        driver.execute("executeCdpCommand", {"cmd": cmd, "params": params})
+
+    try:
+        cdp("Network.enable", {})
+        cdp("Network.setBlockedURLs", {"urls": list(config.blocked_urls)})
+        cdp("Page.addScriptToEvaluateOnNewDocument", {"source": NO_ANIMATIONS})
+        LOGGER.info("...Fast mode: blocking %s url patterns", len(config.blocked_urls))
+    except WebDriverException as exception:
+        LOGGER.warning("Could not block resources through CDP: %s", exception)
@@ -0,0 +1,123 @@
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+from urllib import parse, request
+from drivers.filelock import file_lock, write_atomic
+
+
+LOGGER = logging.getLogger(__name__)
+# browserName used by the grid node stereotypes
+GRID_BROWSER_NAMES = {"chrome": "chrome", "firefox": "firefox", "edge": "MicrosoftEdge"}
+RESERVATION_TTL = 120
+
+
+@dataclass
+class GridStatus:
+    """Slots of a Selenium 4 grid, as reported by its /status endpoint."""
+
+    slots: list[tuple[str, bool]]
+
+    @classmethod
+    def fetch(cls, hub_url: str, timeout: float = 5) -> "GridStatus":
+        """Reads /status of the hub. Only nodes that are UP are counted."""
+        with request.urlopen(f"{hub_url.rstrip('/')}/status", timeout=timeout) as response:
+            status = json.load(response)["value"]
+        slots = []
+        for node in status.get("nodes", []):
+            if node.get("availability", "UP") != "UP":
+                continue
+            for slot in node.get("slots", []):
+                browser = slot.get("stereotype", {}).get("browserName", "")
+                slots.append((browser, slot.get("session") is None))
+        return cls(slots=slots)
+
+    def total(self, browser: str) -> int:
+        """Number of slots for a browser."""
+        name = GRID_BROWSER_NAMES.get(browser, browser)
+        return sum(1 for slot_browser, _ in self.slots if slot_browser == name)
+
+    def free(self, browser: str) -> int:
+        """Number of idle slots for a browser."""
+        name = GRID_BROWSER_NAMES.get(browser, browser)
+        return sum(1 for slot_browser, idle in self.slots if slot_browser == name and idle)
+
+
+@dataclass
+class CapacityGate:
+    """Throttles session creation to the free capacity of the grid.
+
+    Before a session is requested, a slot is reserved in a file shared by
+    all xdist workers, so two workers never race for the same idle slot.
+    Reservations are dropped once the session exists (the grid then reports
+    the slot as busy itself) or after RESERVATION_TTL seconds.
+    """
+
+    hub_url: str
+    browser: str
+    timeout: float = 300
+    poll_interval: float = 0.5
+    state_dir: Path = Path(".pytest_cache", "grid")
+
+    @property
+    def _reservations_path(self) -> Path:
+        """Reservation file of this hub."""
+        hub = parse.urlparse(self.hub_url)
+        return self.state_dir / f"{hub.hostname}_{hub.port}.json"
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Waits for a free slot, holds it while the session is being created."""
+        reservation = self._reserve()
+        try:
+            yield
+        finally:
+            self._update(lambda reservations: reservations.pop(reservation, None))
+
+    def _reserve(self) -> str:
+        """Blocks until the grid has an unreserved slot and reserves it."""
+        reservation = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        interval = self.poll_interval
+        while True:
+            free = GridStatus.fetch(self.hub_url).free(self.browser)
+
+            def reserve(reservations: dict) -> bool:
+                pending = sum(1 for browser, _ in reservations.values() if browser == self.browser)
+                if free - pending > 0:
+                    reservations[reservation] = (self.browser, time.time())
+                    return True
+                return False
+
+            if self._update(reserve):
+                return reservation
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"No free {self.browser} slot on {self.hub_url} after {self.timeout}s")
+            LOGGER.info("... waiting for a free %s slot on the grid", self.browser)
+            time.sleep(interval)
+            interval = min(interval * 2, 5)
+
+    def _update(self, change):
+        """Applies `change` to the reservations under the cross-process lock."""
+        path = self._reservations_path
+        with file_lock(path.with_suffix(".lock")):
+            try:
+                reservations = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                reservations = {}
+            now = time.time()
+            reservations = {key: value for key, value in reservations.items()
+                            if now - value[1] < RESERVATION_TTL}
+            result = change(reservations)
+            write_atomic(path, json.dumps(reservations))
+        return result
+
+
+def worker_count(hub_url: str, browser: str) -> int:
+    """Number of xdist workers matching the grid's slots for a browser."""
+    return max(GridStatus.fetch(hub_url).total(browser), 1)
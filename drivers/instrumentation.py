@@ -0,0 +1,228 @@
+import csv
+import functools
+import html
+import json
+import logging
+import math
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+
+
+LOGGER = logging.getLogger(__name__)
+_ACTIONS = threading.local()
+
+
+@contextmanager
+def page_action(name: str) -> Iterator[None]:
+    """Attributes the WebDriver commands issued inside the block to `name`."""
+    stack = _ACTIONS.__dict__.setdefault("stack", [])
+    stack.append(name)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def current_action() -> str:
+    """Innermost page action of the calling thread, "-" outside any action."""
+    stack = getattr(_ACTIONS, "stack", None)
+    return stack[-1] if stack else "-"
+
+
+def track_action(method: Callable) -> Callable:
+    """Decorator attributing commands issued by a page method to its name."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with page_action(method.__name__):
+            return method(*args, **kwargs)
+    return wrapper
+
+
+def _payload_size(payload) -> int:
+    """Approximate size in bytes of a command payload or response."""
+    if payload is None:
+        return 0
+    if isinstance(payload, (str, bytes)):
+        return len(payload)
+    return len(json.dumps(payload, default=str))
+
+
+def _locator(params: Optional[dict]) -> str:
+    """Locator of find commands, empty for every other command."""
+    if params and "using" in params and "value" in params:
+        return f"{params['using']}={params['value']}"
+    return ""
+
+
+@dataclass
+class CommandRecord:
+    """A single WebDriver command as seen by the command executor."""
+
+    command: str
+    action: str
+    locator: str
+    duration_ms: float
+    request_bytes: int
+    response_bytes: int
+
+
+@dataclass
+class CommandRecorder:
+    """Records every command sent through instrumented drivers, grouped by
+    the test that was running at the time."""
+
+    current_test: str = ""
+    _records: dict = field(default_factory=lambda: defaultdict(list), init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    def instrument(self, driver: WebDriver) -> WebDriver:
+        """Wraps the command executor of `driver`. Safe to call more than once."""
+        executor = driver.command_executor
+        if getattr(executor, "_recorder", None) is self:
+            return driver
+        execute = executor.execute
+
+        def timed_execute(command: str, params: dict = None):
+            start = time.perf_counter()
+            response = execute(command, params)
+            self.record(CommandRecord(
+                command=command,
+                action=current_action(),
+                locator=_locator(params),
+                duration_ms=(time.perf_counter() - start) * 1000,
+                request_bytes=_payload_size(params),
+                response_bytes=_payload_size(response and response.get("value")),
+            ))
+            return response
+
+        executor.execute = timed_execute
+        executor._recorder = self
+        return driver
+
+    def record(self, record: CommandRecord) -> None:
+        """Adds a record to the running test."""
+        with self._lock:
+            self._records[self.current_test].append(record)
+
+    def take(self, test: str) -> list[CommandRecord]:
+        """Returns and forgets the records of a test."""
+        with self._lock:
+            return self._records.pop(test, [])
+
+
+RECORDER = CommandRecorder()
+
+# seconds spent in page loads per driver since they were last taken
+_PAGE_LOADS = weakref.WeakKeyDictionary()
+_PAGE_LOADS_LOCK = threading.Lock()
+
+
+def record_page_load(driver: WebDriver, seconds: float) -> None:
+    """Adds the duration of a page load to the driver's total."""
+    with _PAGE_LOADS_LOCK:
+        _PAGE_LOADS[driver] = _PAGE_LOADS.get(driver, 0) + seconds
+
+
+def take_page_loads(driver: WebDriver) -> float:
+    """Returns and resets the page load time of a driver."""
+    with _PAGE_LOADS_LOCK:
+        return _PAGE_LOADS.pop(driver, 0)
+
+
+# performance metrics of the pages a driver loaded since they were last taken
+_PAGE_METRICS = weakref.WeakKeyDictionary()
+
+
+def record_page_metrics(driver: WebDriver, entry: dict) -> None:
+    """Adds the metrics of a measured page load to the driver's list."""
+    with _PAGE_LOADS_LOCK:
+        _PAGE_METRICS.setdefault(driver, []).append(entry)
+
+
+def take_page_metrics(driver: WebDriver) -> list[dict]:
+    """Returns and resets the page metrics of a driver."""
+    with _PAGE_LOADS_LOCK:
+        return _PAGE_METRICS.pop(driver, [])
+
+
+def timing_table(records: list[CommandRecord]) -> str:
+    """Per-test HTML table of commands grouped by page action and locator."""
+    groups = defaultdict(list)
+    for record in records:
+        groups[(record.action, record.command, record.locator)].append(record)
+    rows = sorted(groups.items(), key=lambda group: -sum(r.duration_ms for r in group[1]))
+
+    cells = "".join(
+        f"<tr><td>{action}</td><td>{command}</td><td>{html.escape(locator)}</td><td>{len(group)}</td>"
+        f"<td>{sum(r.duration_ms for r in group):.1f}</td>"
+        f"<td>{max(r.duration_ms for r in group):.1f}</td>"
+        f"<td>{sum(r.request_bytes + r.response_bytes for r in group)}</td></tr>"
+        for (action, command, locator), group in rows
+    )
+    total = sum(record.duration_ms for record in records)
+    return (
+        f"<p>{len(records)} WebDriver commands, {total:.1f} ms</p>"
+        "<table><tr><th>page action</th><th>command</th><th>locator</th><th>count</th>"
+        "<th>total ms</th><th>max ms</th><th>bytes</th></tr>"
+        f"{cells}</table>"
+    )
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+@dataclass
+class CommandStats:
+    """Run-wide command durations, aggregated per command type."""
+
+    _durations: dict = field(default_factory=lambda: defaultdict(list), init=False)
+    _bytes: dict = field(default_factory=lambda: defaultdict(int), init=False)
+
+    def add(self, records: list[dict]) -> None:
+        """Adds the records of one test, as serialized on the test report."""
+        for record in records:
+            self._durations[record["command"]].append(record["duration_ms"])
+            self._bytes[record["command"]] += record["request_bytes"] + record["response_bytes"]
+
+    def summary(self) -> list[dict]:
+        """One row per command type, slowest total first."""
+        rows = []
+        for command, durations in self._durations.items():
+            durations = sorted(durations)
+            rows.append({
+                "command": command,
+                "count": len(durations),
+                "p50_ms": round(_percentile(durations, 50), 2),
+                "p95_ms": round(_percentile(durations, 95), 2),
+                "max_ms": round(durations[-1], 2),
+                "total_ms": round(sum(durations), 2),
+                "bytes": self._bytes[command],
+            })
+        return sorted(rows, key=lambda row: -row["total_ms"])
+
+    def write(self, directory: Path) -> None:
+        """Writes the summary as command_timings.json and command_timings.csv."""
+        rows = self.summary()
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "command_timings.json").write_text(json.dumps(rows, indent=2), encoding="utf-8")
+        with open(directory / "command_timings.csv", "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=[
+                "command", "count", "p50_ms", "p95_ms", "max_ms", "total_ms", "bytes"])
+            writer.writeheader()
+            writer.writerows(rows)
+        LOGGER.info(">> Command timings written to %s", directory)
+
+
+def serialize(records: list[CommandRecord]) -> list[dict]:
+    """Records as plain dicts, so they survive the trip from xdist workers."""
+    return [asdict(record) for record in records]
@@ -1,6 +1,6 @@
 import logging
 import os
-import config as setting
+from config import RunConfig
 from dataclasses import dataclass
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
@@ -8,7 +8,11 @@ from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.firefox import GeckoDriverManager
+from drivers import fast_profile
 from drivers.base_driver import BaseRunner
+from drivers.driver_cache import resolve_driver
+from drivers.proxy import browser_proxy
+from drivers.resources import admission
 
 
 LOGGER = logging.getLogger(__name__)
@@ -18,7 +22,7 @@ LOGGER = logging.getLogger(__name__)
 class ChromeRunner(BaseRunner):
     """Chrome driver"""
 
-    headless: bool
+    config: RunConfig
     testname: str
 
     @property
@@ -27,29 +31,38 @@ class ChromeRunner(BaseRunner):
         LOGGER.info(">> Browser: Chrome")
 
         options = webdriver.ChromeOptions()
-        if self.headless is True:
+        if self.config.headless is True:
             LOGGER.info(
                 "...Headless mode enabled (chrome)")
             options.add_argument("--headless")
         options.add_argument("start-maximized")
         options.add_argument("--disable-extensions")
         options.add_argument("--log-level=3")
+        if self.config.fast_mode:
+            LOGGER.info("...Fast mode enabled (chrome)")
+            fast_profile.chrome_options(options)
+        if self.config.proxy:
+            options.proxy = browser_proxy(self.config)
         return options
 
     def start_driver(self) -> webdriver:
-        """Starts Chrome Driver and returns driver instance."""
-        driver_ = webdriver.Chrome(
-            service=ChromeService(
-                ChromeDriverManager().install(),), options=self.capabilities
-            )
-        LOGGER.info(f"... testing> {self.testname}")
+        """Starts Chrome Driver and returns driver instance. With admission
+        control, waits until the machine has room for another browser."""
+        with admission(self.config):
+            driver_ = webdriver.Chrome(
+                service=ChromeService(
+                    resolve_driver("chrome", ChromeDriverManager().install, self.config),), options=self.capabilities
+                )
+        if self.config.fast_mode:
+            fast_profile.block_resources(driver_, self.config)
+        LOGGER.info("... testing> %s", self.testname)
         return driver_
 
 
 @dataclass
 class FirefoxRunner(BaseRunner):
 
-    headless: bool
+    config: RunConfig
     testname: str
 
     @property
@@ -57,20 +70,27 @@ class FirefoxRunner(BaseRunner):
         """Returns FireFox capabilities"""
         options = FirefoxOptions()
 
-        if self.headless:
+        if self.config.headless:
             LOGGER.info("...Headless mode enabled (firefox)")
             options.headless = True
+        if self.config.fast_mode:
+            LOGGER.info("...Fast mode enabled (firefox)")
+            fast_profile.firefox_options(options)
+        if self.config.proxy:
+            options.proxy = browser_proxy(self.config)
         return options
 
     def start_driver(self) -> webdriver:
-        """Starts Firefox Driver and returns driver instance."""
-        driver_ = webdriver.Firefox(
-            service=FirefoxService(
-                GeckoDriverManager().install(),
-                log_path=os.devnull
-            ),
-            options=self.capabilities
-        )
+        """Starts Firefox Driver and returns driver instance. With admission
+        control, waits until the machine has room for another browser."""
+        with admission(self.config):
+            driver_ = webdriver.Firefox(
+                service=FirefoxService(
+                    resolve_driver("firefox", GeckoDriverManager().install, self.config),
+                    log_path=os.devnull
+                ),
+                options=self.capabilities
+            )
         driver_.maximize_window()
-        LOGGER.info(f"... testing> {self.testname}")
+        LOGGER.info("... testing> %s", self.testname)
         return driver_
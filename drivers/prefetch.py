@@ -0,0 +1,82 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from selenium.webdriver.remote.webdriver import WebDriver
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _quit_unused(future: Future) -> None:
+    """Quits a speculative session once its provisioning has finished."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        future.result().quit()
+    except Exception as exception:  # pylint: disable=broad-except
+        LOGGER.warning("Could not quit unused prefetched session: %s", exception)
+
+
+@dataclass
+class SessionPrefetcher:
+    """Provisions browser sessions for upcoming tests in background threads,
+    so the 10-30 s remote session startup overlaps with the running test.
+
+    `factory` receives the spec of a test, e.g. its (run config, test name),
+    and returns a new driver. Sessions are keyed by test node id; `depth` is
+    how many tests ahead are provisioned. The factory runs on a background
+    thread while another test is running.
+    """
+
+    factory: Callable[[Any], WebDriver]
+    depth: int = 1
+    _pending: dict = field(default_factory=dict, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _executor: ThreadPoolExecutor = field(init=False)
+
+    def __post_init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(self.depth, 1), thread_name_prefix="prefetch")
+
+    def take(self, nodeid: str, spec: Any) -> WebDriver:
+        """Returns the prefetched session for a test, or starts one now."""
+        with self._lock:
+            future = self._pending.pop(nodeid, None)
+        if future is None:
+            return self.factory(spec)
+        try:
+            driver_ = future.result()
+            LOGGER.info(">> Using prefetched session for %s", nodeid)
+            return driver_
+        except Exception as exception:  # pylint: disable=broad-except
+            LOGGER.warning("Prefetching session failed, starting a new one: %s", exception)
+            return self.factory(spec)
+
+    def schedule(self, upcoming: list[tuple[str, Any]]) -> None:
+        """Starts provisioning for the next `depth` tests, given as
+        (node id, spec) pairs. Sessions for tests that dropped out of the
+        look-ahead window are cancelled."""
+        wanted = dict(upcoming[:self.depth])
+        with self._lock:
+            for nodeid in list(self._pending):
+                if nodeid not in wanted:
+                    self._discard(self._pending.pop(nodeid))
+            for nodeid, spec in wanted.items():
+                if nodeid not in self._pending:
+                    self._pending[nodeid] = self._executor.submit(self.factory, spec)
+
+    def close(self) -> None:
+        """Cancels every speculative session that was never used."""
+        with self._lock:
+            for future in self._pending.values():
+                self._discard(future)
+            self._pending.clear()
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _discard(future: Future) -> None:
+        """Cancels a queued provisioning or quits the session once it is up."""
+        if not future.cancel():
+            future.add_done_callback(_quit_unused)
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import logging
+import select
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib import parse
+import urllib3
+from selenium.webdriver.common.proxy import Proxy
+from config import RunConfig
+from drivers.filelock import write_atomic
+
+
+LOGGER = logging.getLogger(__name__)
+MODES = ("record", "replay", "passthrough")
+STATIC_EXTENSIONS = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico",
+                     ".woff", ".woff2", ".ttf", ".otf")
+HOP_BY_HOP = ("connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "proxy-connection",
+              "te", "trailers", "transfer-encoding", "upgrade", "content-length", "content-encoding")
+
+
+def is_static(url: str) -> bool:
+    """Whether a url is a static asset that is the same for every test."""
+    return parse.urlparse(url).path.lower().endswith(STATIC_EXTENSIONS)
+
+
+@dataclass
+class ResponseStore:
+    """Recorded responses on disk. Every entry is a small HAR-like JSON file
+    named after its request key; bodies are stored once per content hash.
+    Files are written atomically, so all xdist workers share one store."""
+
+    directory: Path
+
+    def get(self, key: str) -> Optional[tuple[dict, bytes]]:
+        """Entry and body recorded under `key`, None if there is none."""
+        try:
+            entry = json.loads((self.directory / "entries" / f"{key}.json").read_text(encoding="utf-8"))
+            body = (self.directory / "bodies" / entry["response"]["content"]["hash"]).read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+        return entry, body
+
+    def put(self, key: str, method: str, url: str, status: int, headers: list, body: bytes) -> None:
+        """Records a response."""
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = self.directory / "bodies" / digest
+        if not body_path.exists():
+            write_atomic(body_path, body)
+        entry = {
+            "request": {"method": method, "url": url},
+            "response": {"status": status, "headers": headers,
+                         "content": {"hash": digest, "size": len(body)}},
+            "recorded_at": time.time(),
+        }
+        write_atomic(self.directory / "entries" / f"{key}.json", json.dumps(entry, indent=1))
+
+
+@dataclass
+class CachingProxy:
+    """HTTP proxy for the application under test, running in a background
+    thread of the test process.
+
+    record: every response is fetched and recorded. replay: responses are
+    served from the store only, misses answer 504. passthrough: responses are
+    fetched live and only static assets are cached (and served from the
+    cache once recorded).
+
+    Page responses are recorded per test (see `scope`) and per occurrence, so
+    stateful flows like a login replay in the order they were recorded.
+    Static assets are shared between tests. Requests to `upgrade_hosts` reach
+    the browser as plain http and are fetched upstream over https, which keeps
+    them cacheable without intercepting TLS; other https traffic to
+    `tunnel_hosts` is tunneled uncached (and refused in replay mode), tunnels
+    to any other host are refused. The proxy listens on loopback unless
+    `bind` says otherwise, e.g. 0.0.0.0 for browsers in docker."""
+
+    store: ResponseStore
+    mode: str = "passthrough"
+    upgrade_hosts: tuple = ()
+    tunnel_hosts: tuple = ()
+    bind: str = "127.0.0.1"
+    timeout: float = 30
+    stats: Counter = field(default_factory=Counter, init=False)
+    _scope: str = field(default="", init=False)
+    _occurrences: Counter = field(default_factory=Counter, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    def __post_init__(self):
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown proxy mode {self.mode!r}, choose from {MODES}")
+        self._upstream = urllib3.PoolManager(maxsize=8, block=False, retries=False)
+        self.server = ThreadingHTTPServer((self.bind, 0), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_port
+
+    def start(self) -> "CachingProxy":
+        """Serves requests in a daemon thread."""
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="proxy").start()
+        LOGGER.info(">> Proxy (%s) listening on port %s, store %s", self.mode, self.port, self.store.directory)
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the upstream connections."""
+        self.server.shutdown()
+        self.server.server_close()
+        self._upstream.clear()
+        LOGGER.info(">> Proxy stats: %s", dict(self.stats))
+
+    def scope(self, name: str) -> None:
+        """Starts recording or replaying the page responses of a test."""
+        with self._lock:
+            self._scope = name
+            self._occurrences.clear()
+
+    def browser_url(self, url: str) -> str:
+        """The url the browser should use for `url`, http for upgraded hosts."""
+        parsed = parse.urlparse(url)
+        if parsed.scheme == "https" and parsed.hostname in self.upgrade_hosts:
+            return parse.urlunparse(parsed._replace(scheme="http"))
+        return url
+
+    def _key(self, method: str, url: str, body: bytes) -> str:
+        """Request key: static assets by url, pages by test and occurrence."""
+        if method == "GET" and is_static(url):
+            parts = ("static", url)
+        else:
+            request = (method, url, hashlib.sha256(body).hexdigest())
+            with self._lock:
+                self._occurrences[request] += 1
+                parts = (self._scope, *request, str(self._occurrences[request]))
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+    def respond(self, method: str, url: str, headers: dict, body: bytes) -> tuple[int, list, bytes]:
+        """Answers a proxied request from the store or upstream."""
+        key = self._key(method, url, body)
+        cacheable = self.mode != "passthrough" or (method == "GET" and is_static(url))
+        if self.mode == "replay" or (cacheable and self.mode == "passthrough"):
+            recorded = self.store.get(key)
+            if recorded:
+                self.stats["hits"] += 1
+                entry, recorded_body = recorded
+                return entry["response"]["status"], entry["response"]["headers"], recorded_body
+            if self.mode == "replay":
+                self.stats["misses"] += 1
+                LOGGER.warning("Proxy replay: no recording for %s %s", method, url)
+                return 504, [["Content-Type", "text/plain"]], f"Not recorded: {method} {url}".encode()
+
+        self.stats["upstream"] += 1
+        status, response_headers, response_body = self._fetch(method, url, headers, body)
+        if cacheable and status < 500:
+            self.store.put(key, method, url, status, response_headers, response_body)
+        return status, response_headers, response_body
+
+    def _fetch(self, method: str, url: str, headers: dict, body: bytes) -> tuple[int, list, bytes]:
+        """Sends a request upstream, over https for upgraded hosts."""
+        parsed = parse.urlparse(url)
+        if parsed.hostname in self.upgrade_hosts:
+            url = parse.urlunparse(parsed._replace(scheme="https"))
+        request_headers = {name: value for name, value in headers.items()
+                           if name.lower() not in HOP_BY_HOP and name.lower() != "accept-encoding"}
+        response = self._upstream.request(
+            method, url, body=body or None, headers=request_headers,
+            redirect=False, timeout=self.timeout, decode_content=True)
+        # redirects of upgraded hosts stay on plain http
+        response_headers = [[name, self.browser_url(value) if name.lower() == "location" else value]
+                            for name, value in response.headers.iteritems() if name.lower() not in HOP_BY_HOP]
+        return response.status, response_headers, response.data
+
+    def _tunnel(self, handler: BaseHTTPRequestHandler) -> None:
+        """Relays a CONNECT tunnel to one of `tunnel_hosts` without looking at the traffic."""
+        if self.mode == "replay":
+            handler.send_error(403, "No network in replay mode")
+            return
+        host, _, port = handler.path.rpartition(":")
+        if host.strip("[]") not in self.tunnel_hosts:
+            self.stats["refused"] += 1
+            handler.send_error(403, f"Tunnel to {host} not allowed")
+            return
+        try:
+            upstream = socket.create_connection((host, int(port)), timeout=self.timeout)
+        except OSError as exception:
+            handler.send_error(502, str(exception))
+            return
+        self.stats["tunnels"] += 1
+        handler.send_response(200, "Connection established")
+        handler.end_headers()
+        sockets = [handler.connection, upstream]
+        try:
+            while True:
+                readable, _, _ = select.select(sockets, [], [], self.timeout)
+                if not readable:
+                    break
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is handler.connection else handler.connection).sendall(data)
+        finally:
+            upstream.close()
+            handler.close_connection = True
+
+    def _handler(self) -> type:
+        """Request handler class bound to this proxy."""
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _read_body(self) -> bytes:
+                """Request body, decoded when it is sent with Transfer-Encoding: chunked,
+                so the request key is the same as for a Content-Length body."""
+                if "chunked" not in self.headers.get("Transfer-Encoding", "").lower():
+                    length = int(self.headers.get("Content-Length") or 0)
+                    return self.rfile.read(length) if length else b""
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                    if not size:
+                        break
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+                # optional trailer fields up to the closing empty line
+                while self.rfile.readline().strip():
+                    pass
+                return b"".join(chunks)
+
+            def _proxy(self):
+                try:
+                    body = self._read_body()
+                except ValueError:
+                    self.send_error(400, "Malformed request body")
+                    return
+                try:
+                    status, headers, data = proxy.respond(self.command, self.path, dict(self.headers), body)
+                except (urllib3.exceptions.HTTPError, OSError) as exception:
+                    proxy.stats["errors"] += 1
+                    status, headers, data = 502, [["Content-Type", "text/plain"]], str(exception).encode()
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _proxy  # pylint: disable=invalid-name
+
+            def do_CONNECT(self):  # pylint: disable=invalid-name
+                proxy._tunnel(self)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def browser_proxy(config: RunConfig) -> Proxy:
+    """Proxy capability pointing the browser at the proxy of the run."""
+    return Proxy({
+        "proxyType": "manual",
+        "httpProxy": config.proxy,
+        "sslProxy": config.proxy,
+        "noProxy": "",
+    })
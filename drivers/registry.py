@@ -0,0 +1,94 @@
+"""Runners by host and browser, imported only once a session asks for them.
+
+Built-in runners are referenced by import strings, so loading the framework
+(conftest, every xdist worker) does not import webdriver_manager or the
+runner modules of hosts the run does not use. Other packages add runners
+with an entry point in the ``selenium4_pytest.runners`` group, named
+``<host>`` or ``<host>.<browser>``::
+
+    [project.entry-points."selenium4_pytest.runners"]
+    "localhost.safari" = "my_runners.safari:SafariRunner"
+
+or by calling :func:`register` (e.g. from a conftest). Registered runners win
+over the built-in runners, which win over entry points; the package metadata
+is only read for a host and browser without a registered or built-in runner.
+"""
+import importlib
+import logging
+from functools import cache
+from importlib.metadata import entry_points
+from typing import Union
+from drivers.base_driver import BaseRunner
+
+
+LOGGER = logging.getLogger(__name__)
+ENTRY_POINT_GROUP = "selenium4_pytest.runners"
+# any browser of a host
+ANY = "*"
+BUILTIN_RUNNERS = {
+    ("saucelabs", ANY): "drivers.remote_driver:SauceRunner",
+    ("saucelabs-tunnel", ANY): "drivers.remote_driver:SauceRunner",
+    ("browserstack", ANY): "drivers.remote_driver:BSRunner",
+    ("docker", ANY): "drivers.remote_driver:DockerRunner",
+    ("localhost", "chrome"): "drivers.localrunner:ChromeRunner",
+    ("localhost", "firefox"): "drivers.localrunner:FirefoxRunner",
+}
+_REGISTERED: dict[tuple[str, str], Union[str, type]] = {}
+
+
+def register(host: str, runner: Union[str, type[BaseRunner]], browser: str = ANY) -> None:
+    """Registers a runner class, or its "module:Class" import string, for a
+    host and browser (every browser of the host by default)."""
+    _REGISTERED[host, browser] = runner
+    _load.cache_clear()
+
+
+@cache
+def _entry_points() -> dict[tuple[str, str], str]:
+    """Runners other packages declare, read from their metadata on first use."""
+    declared = {}
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        host, _, browser = entry_point.name.partition(".")
+        declared[host, browser or ANY] = entry_point.value
+    return declared
+
+
+def _sources():
+    """Runner tables in lookup order, entry points read only when reached."""
+    yield _REGISTERED
+    yield BUILTIN_RUNNERS
+    yield _entry_points()
+
+
+def _target(host: str, browser: str) -> Union[str, type, None]:
+    for runners in _sources():
+        for key in ((host, browser), (host, ANY)):
+            if key in runners:
+                return runners[key]
+    return None
+
+
+@cache
+def _load(host: str, browser: str) -> type[BaseRunner]:
+    target = _target(host, browser)
+    if target is None:
+        raise LookupError(f"No runner for {browser or 'any browser'} on {host}")
+    if isinstance(target, type):
+        return target
+    module, _, name = target.partition(":")
+    LOGGER.debug("... importing runner %s for %s/%s", target, host, browser)
+    return getattr(importlib.import_module(module), name)
+
+
+def runner_class(host: str, browser: str) -> type[BaseRunner]:
+    """Runner class of a host and browser, imported on first use. Raises
+    LookupError when no runner supports the combination."""
+    return _load(host, browser)
+
+
+def supports(host: str, browser: str = None) -> bool:
+    """Whether a runner is known for the host, or the host and browser,
+    without importing it."""
+    if browser is not None:
+        return _target(host, browser) is not None
+    return any(runner_host == host for runners in _sources() for runner_host, _ in runners)
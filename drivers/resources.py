@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ContextManager, Iterator, Optional
+from urllib import parse
+from selenium.webdriver.remote.webdriver import WebDriver
+from config import RunConfig
+from drivers.filelock import file_lock, write_atomic
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+LOGGER = logging.getLogger(__name__)
+MB = 1024 * 1024
+# footprint of one session until real ones are measured
+DEFAULT_FOOTPRINTS = {
+    "chrome": {"memory_mb": 600.0, "shm_mb": 128.0, "cpu": 1.0},
+    "edge": {"memory_mb": 600.0, "shm_mb": 128.0, "cpu": 1.0},
+    "firefox": {"memory_mb": 500.0, "shm_mb": 64.0, "cpu": 1.0},
+}
+# memory left to the OS, the pytest processes and the grid itself
+MEMORY_RESERVE_MB = 1024
+# sessions measured per browser and xdist worker, the footprint is learned from these
+FOOTPRINT_SAMPLES = 3
+# weight of a new measurement in the stored footprint
+SMOOTHING = 0.5
+# the machine counts as saturated above this 1 minute load per core
+LOAD_LIMIT = 1.5
+LOCAL_HUBS = ("localhost", "127.0.0.1", "::1")
+STATE_DIR = Path(".pytest_cache", "resources")
+RESERVATION_TTL = 120
+
+
+@dataclass
+class SystemResources:
+    """Cores, available memory and /dev/shm of the machine. Memory honours a
+    cgroup limit, so it is right inside containers too. psutil is used when
+    installed, /proc otherwise."""
+
+    cores: int
+    memory_mb: float
+    shm_mb: Optional[float]
+    load: float
+
+    @classmethod
+    def read(cls) -> "SystemResources":
+        """Current resources of the machine."""
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+        if psutil is not None:
+            memory_mb = psutil.virtual_memory().available / MB
+        else:
+            memory_mb = _meminfo().get("MemAvailable", 0) / MB
+        cgroup_mb = _cgroup_available_mb()
+        if cgroup_mb is not None:
+            memory_mb = min(memory_mb, cgroup_mb) if memory_mb else cgroup_mb
+        try:
+            shm = os.statvfs("/dev/shm")
+            shm_mb = shm.f_bavail * shm.f_frsize / MB
+        except (OSError, AttributeError):
+            shm_mb = None
+        load = os.getloadavg()[0] if hasattr(os, "getloadavg") else 0.0
+        return cls(cores=cores, memory_mb=memory_mb, shm_mb=shm_mb, load=load)
+
+
+def _meminfo() -> dict:
+    """/proc/meminfo in bytes."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as meminfo:
+            return {line.split(":")[0]: int(line.split()[1]) * 1024 for line in meminfo if line.split()[1:]}
+    except OSError:
+        return {}
+
+
+def _cgroup_available_mb() -> Optional[float]:
+    """Memory left under the cgroup (v2, then v1) limit, None without a limit."""
+    for limit_file, usage_file in (("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+                                   ("/sys/fs/cgroup/memory/memory.limit_in_bytes",
+                                    "/sys/fs/cgroup/memory/memory.usage_in_bytes")):
+        try:
+            limit = Path(limit_file).read_text(encoding="ascii").strip()
+            usage = int(Path(usage_file).read_text(encoding="ascii"))
+        except (OSError, ValueError):
+            continue
+        # v1 reports "no limit" as a huge number
+        if limit == "max" or int(limit) >= 1 << 60:
+            return None
+        return (int(limit) - usage) / MB
+    return None
+
+
+def _children() -> dict:
+    """Child pids of every process, from /proc."""
+    children = {}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text(encoding="ascii")
+        except OSError:
+            continue
+        parent = int(stat.rpartition(")")[2].split()[1])
+        children.setdefault(parent, []).append(int(entry.name))
+    return children
+
+
+def process_tree(pid: int) -> list[int]:
+    """`pid` and all its descendants."""
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return [pid] + [child.pid for child in process.children(recursive=True)]
+        except psutil.Error:
+            return []
+    children, tree = _children(), [pid]
+    for current in tree:
+        tree += children.get(current, [])
+    return tree
+
+
+def tree_usage(pid: int) -> dict:
+    """Resident memory, /dev/shm mappings and average cores used by a process
+    tree (e.g. a driver service and the browser it launched)."""
+    memory, cpu_seconds, age, shm = 0, 0.0, 0.0, {}
+    ticks = os.sysconf("SC_CLK_TCK")
+    try:
+        uptime = float(Path("/proc/uptime").read_text(encoding="ascii").split()[0])
+    except OSError:
+        return {}
+    for process in process_tree(pid):
+        proc = Path("/proc", str(process))
+        try:
+            fields = (proc / "stat").read_text(encoding="ascii").rpartition(")")[2].split()
+            maps = (proc / "maps").read_text(encoding="utf-8", errors="replace").splitlines()
+        except OSError:
+            continue
+        # fields start at the state, the third field of /proc/<pid>/stat
+        cpu_seconds += (int(fields[11]) + int(fields[12])) / ticks
+        age = max(age, uptime - int(fields[19]) / ticks)
+        memory += int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        for line in maps:
+            parts = line.split(None, 5)
+            if len(parts) == 6 and parts[5].startswith("/dev/shm/"):
+                start, _, end = parts[0].partition("-")
+                shm[parts[4]] = max(shm.get(parts[4], 0), int(end, 16) - int(start, 16))
+    if not memory:
+        return {}
+    return {"memory_mb": memory / MB, "shm_mb": sum(shm.values()) / MB,
+            "cpu": cpu_seconds / age if age > 0 else 0.0}
+
+
+@dataclass
+class FootprintStore:
+    """Measured footprint of one session per browser, shared by all xdist
+    workers and kept across runs."""
+
+    path: Path = STATE_DIR / "footprints.json"
+
+    def get(self, browser: str) -> dict:
+        """Footprint of a browser, the default until one was measured."""
+        try:
+            stored = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            stored = {}
+        return stored.get(browser) or DEFAULT_FOOTPRINTS.get(browser, DEFAULT_FOOTPRINTS["chrome"])
+
+    def update(self, browser: str, usage: dict) -> dict:
+        """Merges a measurement into the stored footprint."""
+        with file_lock(self.path.with_suffix(".lock")):
+            try:
+                stored = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                stored = {}
+            previous = stored.get(browser)
+            footprint = {name: round(value if previous is None else
+                                     previous[name] + SMOOTHING * (value - previous[name]), 1)
+                         for name, value in usage.items()}
+            stored[browser] = footprint
+            write_atomic(self.path, json.dumps(stored, indent=1))
+        return footprint
+
+
+_SAMPLES = Counter()
+
+
+def sample_footprint(driver: WebDriver, browser: str, store: FootprintStore = None) -> Optional[dict]:
+    """Measures the browser of a local session, for the first FOOTPRINT_SAMPLES
+    sessions per browser. Sessions on other hosts have no local process; they
+    are admitted with the footprint learned locally, or the defaults."""
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    if process is None or _SAMPLES[browser] >= FOOTPRINT_SAMPLES:
+        return None
+    usage = tree_usage(process.pid)
+    if not usage:
+        return None
+    _SAMPLES[browser] += 1
+    footprint = (store or FootprintStore()).update(browser, usage)
+    LOGGER.info("... %s session footprint %s, stored %s", browser, usage, footprint)
+    return footprint
+
+
+def is_local(config: RunConfig) -> bool:
+    """Whether the browsers of a run configuration use this machine's resources."""
+    return config.host == "localhost" or (
+        config.host == "docker" and parse.urlparse(config.hub_url).hostname in LOCAL_HUBS)
+
+
+def capacity(resources: SystemResources, footprint: dict, shm: bool = True) -> int:
+    """Sessions the machine can hold at once, limited by cores, memory and,
+    for browsers using the machine's /dev/shm, shared memory."""
+    limits = [
+        resources.cores / max(footprint["cpu"], 0.5),
+        (resources.memory_mb - MEMORY_RESERVE_MB) / footprint["memory_mb"],
+    ]
+    if shm and resources.shm_mb is not None and footprint["shm_mb"]:
+        limits.append(resources.shm_mb / footprint["shm_mb"])
+    return max(int(min(limits)), 1)
+
+
+def worker_count(config: RunConfig, store: FootprintStore = None) -> int:
+    """Number of xdist workers the machine can run browsers for. Docker nodes
+    bring their own /dev/shm, so only local browsers are limited by it."""
+    footprint = (store or FootprintStore()).get(config.browser)
+    return capacity(SystemResources.read(), footprint, shm=config.host == "localhost")
+
+
+@dataclass
+class AdmissionGate:
+    """Holds back new sessions while the machine is saturated.
+
+    A start is admitted when the available memory (and /dev/shm for local
+    browsers) fits one more footprint on top of the starts in flight, the load
+    is below LOAD_LIMIT per core, and fewer than half the cores' worth of
+    browsers are starting. Starts in flight are reservations in a file shared
+    by all xdist workers, dropped once the session exists or after
+    RESERVATION_TTL seconds.
+    """
+
+    browser: str
+    shm: bool = True
+    timeout: float = 600
+    poll_interval: float = 0.5
+    store: FootprintStore = None
+    state_dir: Path = STATE_DIR
+
+    def __post_init__(self):
+        self.store = self.store or FootprintStore(self.state_dir / "footprints.json")
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Waits until a session may start and holds the admission while it does."""
+        reservation = self._reserve()
+        try:
+            yield
+        finally:
+            self._update(lambda reservations: reservations.pop(reservation, None))
+
+    def saturated(self, resources: SystemResources, starting: int) -> Optional[str]:
+        """Why one more session does not fit, None if it does."""
+        footprint = self.store.get(self.browser)
+        if starting >= max(resources.cores // 2, 1):
+            return f"{starting} sessions starting"
+        if resources.memory_mb - MEMORY_RESERVE_MB < footprint["memory_mb"] * (starting + 1):
+            return f"{resources.memory_mb:.0f} MB memory available"
+        if self.shm and resources.shm_mb is not None and resources.shm_mb < footprint["shm_mb"] * (starting + 1):
+            return f"{resources.shm_mb:.0f} MB /dev/shm available"
+        if resources.load > LOAD_LIMIT * resources.cores:
+            return f"load {resources.load:.1f} on {resources.cores} cores"
+        return None
+
+    def _reserve(self) -> str:
+        """Blocks until the machine has room for a session and reserves it."""
+        reservation = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        interval = self.poll_interval
+        while True:
+            resources = SystemResources.read()
+            reason = []
+
+            def reserve(reservations: dict) -> bool:
+                reason[:] = [self.saturated(resources, len(reservations))]
+                if reason[0] is None:
+                    reservations[reservation] = time.time()
+                    return True
+                return False
+
+            if self._update(reserve):
+                return reservation
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Machine saturated for {self.timeout}s, not starting {self.browser}: {reason[0]}")
+            LOGGER.info("... waiting to start %s, machine saturated: %s", self.browser, reason[0])
+            time.sleep(interval)
+            interval = min(interval * 2, 5)
+
+    def _update(self, change):
+        """Applies `change` to the reservations under the cross-process lock."""
+        path = self.state_dir / "admissions.json"
+        with file_lock(path.with_suffix(".lock")):
+            try:
+                reservations = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                reservations = {}
+            now = time.time()
+            reservations = {key: started for key, started in reservations.items()
+                            if now - started < RESERVATION_TTL}
+            result = change(reservations)
+            write_atomic(path, json.dumps(reservations))
+        return result
+
+
+def admission(config: RunConfig) -> ContextManager:
+    """Admission of a new session of the run configuration; a no-op without
+    admission control or when the browser does not run on this machine."""
+    if not config.admission_control or not is_local(config):
+        return nullcontext()
+    return AdmissionGate(config.browser, shm=config.host == "localhost",
+                         timeout=config.admission_timeout).slot()
@@ -0,0 +1,108 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Hashable
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def reset_session(driver: WebDriver) -> None:
+    """Brings a browser session back to a clean state between tests.
+    Closes extra windows, clears cookies and web storage, then
+    navigates to about:blank."""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    # cookies and storage are scoped to the current origin, so they
+    # have to be cleared before leaving the page under test
+    driver.delete_all_cookies()
+    try:
+        driver.execute_script(
+            "window.localStorage.clear(); window.sessionStorage.clear();")
+    except WebDriverException:
+        # about:blank and data: urls have no storage to clear
+        pass
+    driver.get("about:blank")
+
+
+@dataclass
+class PooledSession:
+    """A browser session owned by the pool."""
+
+    driver: WebDriver
+    key: Hashable
+    uses: int = 0
+    failed: bool = False
+
+
+@dataclass
+class SessionPool:
+    """Hands out warm browser sessions to tests running in one worker.
+
+    Sessions are reset between tests and recycled once they have served
+    `max_uses` tests or after a test using them has failed. `retire` is
+    called with the driver and whether any of its tests failed right
+    before the session is quit, so results can be reported to the host.
+    """
+
+    max_uses: int = 10
+    reset: Callable[[WebDriver], None] = reset_session
+    retire: Callable[[WebDriver, bool], None] = lambda driver, failed: None
+    _idle: dict = field(default_factory=lambda: defaultdict(list), init=False)
+    _busy: dict = field(default_factory=dict, init=False)
+
+    def acquire(self, key: Hashable, factory: Callable[[], WebDriver]) -> WebDriver:
+        """Returns an idle session for `key` or starts a new one with `factory`."""
+        if self._idle[key]:
+            session = self._idle[key].pop()
+            LOGGER.info(">> Reusing browser session (%s previous tests)", session.uses)
+        else:
+            session = PooledSession(driver=factory(), key=key)
+        session.uses += 1
+        self._busy[id(session.driver)] = session
+        return session.driver
+
+    def release(self, driver: WebDriver, failed: bool = False) -> None:
+        """Gives a session back to the pool. Sessions that served a failed test,
+        reached `max_uses` or could not be reset are retired instead."""
+        session = self._busy.pop(id(driver))
+        session.failed = session.failed or failed
+
+        if failed or session.uses >= self.max_uses:
+            self._retire(session)
+            return
+        try:
+            self.reset(driver)
+        except WebDriverException as exception:
+            LOGGER.warning("Could not reset browser session, recycling it: %s", exception)
+            self._retire(session)
+            return
+        self._idle[session.key].append(session)
+
+    def close(self) -> None:
+        """Retires every session still held by the pool."""
+        for session in list(self._busy.values()):
+            self._retire(session)
+        self._busy.clear()
+        for sessions in self._idle.values():
+            for session in sessions:
+                self._retire(session)
+        self._idle.clear()
+
+    def _retire(self, session: PooledSession) -> None:
+        """Reports and quits a session."""
+        LOGGER.info(">> Retiring browser session after %s tests", session.uses)
+        try:
+            self.retire(session.driver, session.failed)
+        except WebDriverException as exception:
+            LOGGER.warning("Could not report session result: %s", exception)
+        try:
+            session.driver.quit()
+        except WebDriverException as exception:
+            LOGGER.warning("Could not quit browser session: %s", exception)
@@ -0,0 +1,126 @@
+import logging
+import threading
+from collections import defaultdict
+from urllib import parse
+import urllib3
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+from config import RunConfig
+
+
+LOGGER = logging.getLogger(__name__)
+# WebDriver itself answers 500 for ordinary command errors, so only
+# gateway failures of the hub or its load balancer are retried
+RETRY_STATUSES = (502, 503, 504)
+# a POST may have reached the browser before the gateway failed: repeating
+# newSession leaks a session, repeating a click or a submit runs it twice
+RETRY_METHODS = frozenset({"GET", "DELETE"})
+
+_MANAGERS = {}
+_LOCK = threading.Lock()
+_STATS = defaultdict(lambda: {"requests": 0, "connections": 0})
+_STATS_LOCK = threading.Lock()
+
+
+def _count(hub: str, counter: str) -> None:
+    """Increments a per-hub transport counter."""
+    with _STATS_LOCK:
+        _STATS[hub][counter] += 1
+
+
+def _hub(url: str) -> str:
+    """scheme://host:port of a hub url, without credentials or path."""
+    parsed = parse.urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    return f"{parsed.scheme}://{parsed.hostname}:{port}"
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+
+    def _new_conn(self):
+        _count(f"http://{self.host}:{self.port}", "connections")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+
+    def _new_conn(self):
+        _count(f"https://{self.host}:{self.port}", "connections")
+        return super()._new_conn()
+
+
+class PooledRemoteConnection(RemoteConnection):
+    """RemoteConnection sharing one keep-alive connection pool per hub between
+    every session of the process (one xdist worker), so TLS handshakes to
+    Sauce Labs, BrowserStack or the docker hub are paid once instead of per
+    session. Pool size, retries of GET/DELETE commands on gateway errors and gzip compression come
+    from the run configuration; the first session to reach a hub sizes its pool."""
+
+    def __init__(self, remote_server_addr: str, config: RunConfig = RunConfig(),
+                 ignore_proxy: bool = False):
+        self.config = config
+        super().__init__(remote_server_addr, keep_alive=True, ignore_proxy=ignore_proxy)
+
+    def _get_connection_manager(self):
+        """Returns the pool manager of this hub, creating it on first use."""
+        hub = _hub(self._url)
+        with _LOCK:
+            if hub not in _MANAGERS:
+                manager = super()._get_connection_manager()
+                manager.connection_pool_kw.update(
+                    maxsize=self.config.hub_pool_size,
+                    block=False,
+                    retries=Retry(
+                        total=self.config.hub_retries,
+                        read=0,
+                        status_forcelist=RETRY_STATUSES,
+                        allowed_methods=RETRY_METHODS,
+                        backoff_factor=0.5,
+                        raise_on_status=False,
+                    ),
+                )
+                if type(manager) is urllib3.PoolManager:  # pylint: disable=unidiomatic-typecheck
+                    manager.pool_classes_by_scheme = {
+                        "http": _CountingHTTPConnectionPool,
+                        "https": _CountingHTTPSConnectionPool,
+                    }
+                LOGGER.info(">> Opening connection pool to %s (size %s)", hub, self.config.hub_pool_size)
+                _MANAGERS[hub] = manager
+            return _MANAGERS[hub]
+
+    def get_remote_connection_headers(self, parsed_url, keep_alive=False):  # pylint: disable=arguments-differ
+        """Adds Accept-Encoding when compression is enabled; urllib3
+        decompresses the responses transparently."""
+        headers = RemoteConnection.get_remote_connection_headers(parsed_url, keep_alive)
+        if self.config.hub_compression:
+            headers["Accept-Encoding"] = "gzip, deflate"
+        return headers
+
+    def _request(self, method, url, body=None):
+        _count(_hub(url), "requests")
+        return super()._request(method, url, body=body)
+
+    def close(self):
+        """Keeps the shared pool open when a session quits."""
+
+
+def transport_stats() -> dict:
+    """Requests sent and connections opened per hub. A low connection count
+    relative to requests means handshakes are amortized."""
+    with _STATS_LOCK:
+        return {hub: dict(stats) for hub, stats in _STATS.items()}
+
+
+def reset_stats() -> None:
+    """Forgets the counted requests and connections."""
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+def close_pools() -> None:
+    """Closes every shared connection pool."""
+    with _LOCK:
+        for manager in _MANAGERS.values():
+            manager.clear()
+        _MANAGERS.clear()
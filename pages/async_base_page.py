@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from selenium.common.exceptions import (
+    StaleElementReferenceException, TimeoutException, UnknownMethodException, WebDriverException)
+from config import RunConfig
+from drivers.async_driver import AsyncWebDriver, AsyncWebElement
+from pages import scripts
+from pages.base_page import POLL_INTERVAL_MAX, POLL_INTERVAL_MIN, _same_page
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncBasePage:
+    """Async counterpart of BasePage for sessions driven by AsyncSessionRunner.
+    Waits never block the event loop: the "observer" strategy awaits a
+    MutationObserver in the page, every other strategy polls with back-off.
+    Like BasePage, the page is only loaded on the first interaction."""
+
+    _path: str = None
+    _ready_locator: dict = None
+    _ready_timeout: float = 10
+
+    def __init__(self, driver: AsyncWebDriver, config: RunConfig = None):
+        """Constructor method for the AsyncBasePage class. Takes the run
+        configuration the session was started with."""
+        self.driver = driver
+        self.config = config or RunConfig()
+        self._verified_url = None
+
+    @classmethod
+    async def open(cls, driver: AsyncWebDriver, config: RunConfig = None) -> "AsyncBasePage":
+        """Creates the page object and makes sure its page is ready."""
+        page = cls(driver, config)
+        await page._ensure_ready()
+        return page
+
+    async def _visit(self, url: str) -> None:
+        """Visit a url. Requires url to be a string."""
+        target_url = f"{self.config.base_url}/{url}"
+        LOGGER.info("Visiting %s", target_url)
+        await self.driver.get(target_url)
+
+    async def _ensure_ready(self) -> None:
+        """Navigates to the page of this page object if needed and verifies its
+        ready locator, once per page object."""
+        if self._verified_url or self._path is None:
+            return
+        target_url = f"{self.config.base_url}/{self._path}"
+        if _same_page(await self.driver.current_url(), target_url) and (
+                self._ready_locator is None or await self._check_displayed(self._ready_locator, timeout=0)):
+            LOGGER.info("Already on %s", target_url)
+        else:
+            await self._visit(self._path)
+            assert self._ready_locator is None or await self._check_displayed(
+                self._ready_locator, self._ready_timeout), \
+                f"{type(self).__name__} is not ready: {self._ready_locator} is not displayed"
+        self._verified_url = target_url
+
+    async def _find(self, locator: dict, timeout: int = 10) -> AsyncWebElement:
+        """Find an element and give a default wait of 10 seconds.
+        Takes in a dictionary with the "by" and "value" keys. Returns
+        an async webdriver element.
+        """
+        await self._ensure_ready()
+        try:
+            return await self._wait_for(locator, visible=False, timeout=timeout)
+        except TimeoutException as exception:
+            LOGGER.error("Could not find element %s. Stacktrace: %s", locator, exception)
+
+    async def _click(self, locator: dict) -> None:
+        """Clicks an element. Requires a dictionary with the "by" and "value" keys."""
+        await (await self._find(locator)).click()
+
+    async def _type(self, locator: dict, input_text: str) -> None:
+        """Clears text field then types into an element. Requires a dictionary with
+        the "by" and "value" keys and input text as string."""
+        element = await self._find(locator)
+        await element.clear()
+        await element.send_keys(input_text)
+
+    async def _is_displayed(self, locator: dict, timeout: int = 10) -> bool:
+        """Checks if an element is displayed. Requires a dictionary with the "by" and "value" keys.
+        Has default timeout of 10 seconds"""
+        await self._ensure_ready()
+        return await self._check_displayed(locator, timeout)
+
+    async def _check_displayed(self, locator: dict, timeout: float = 10) -> bool:
+        """Waits up to `timeout` seconds for an element to be displayed."""
+        try:
+            return await self._wait_for(locator, visible=True, timeout=timeout) is not None
+        except TimeoutException:
+            LOGGER.error("Element is currently not displayed in screen.")
+            return False
+
+    async def _wait_for(self, locator: dict, visible: bool, timeout: float) -> AsyncWebElement:
+        """Waits for an element to be present (or visible) and returns it. Raises
+        TimeoutException after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        if self.config.wait_strategy == "observer" and self.driver.async_script_state is not False:
+            try:
+                return await self._observe(locator, visible, timeout)
+            except UnknownMethodException:
+                LOGGER.warning("Driver does not support async scripts, falling back to polling")
+                self.driver.async_script_state = False
+            except TimeoutException:
+                raise
+            except WebDriverException as exception:
+                LOGGER.debug("Observer wait interrupted, polling instead: %s", exception)
+        return await self._poll(locator, visible, deadline)
+
+    async def _observe(self, locator: dict, visible: bool, timeout: float) -> AsyncWebElement:
+        """Waits through a MutationObserver injected with execute_async_script."""
+        script_timeout = timeout + 5
+        if self.driver.async_script_state != script_timeout:
+            await self.driver.set_script_timeout(script_timeout)
+            self.driver.async_script_state = script_timeout
+        element = await self.driver.execute_async_script(
+            scripts.WAIT_FOR, locator["by"], locator["value"], visible, int(timeout * 1000))
+        if element is None:
+            raise TimeoutException(f"Timed out after {timeout}s waiting for {locator}")
+        return element
+
+    async def _poll(self, locator: dict, visible: bool, deadline: float) -> AsyncWebElement:
+        """Polls for an element, doubling the interval after every miss."""
+        interval = POLL_INTERVAL_MIN
+        while True:
+            try:
+                for element in await self.driver.find_elements(locator["by"], locator["value"]):
+                    if not visible or await element.is_displayed():
+                        return element
+            except StaleElementReferenceException:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(f"Timed out waiting for {locator}")
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, POLL_INTERVAL_MAX)
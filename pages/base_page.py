@@ -1,33 +1,116 @@
 import logging
+import time
+import warnings
+import weakref
 from selenium import webdriver
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-import config as setting
+from selenium.common.exceptions import (
+    StaleElementReferenceException, TimeoutException, UnknownMethodException, WebDriverException)
+from config import RunConfig
+from drivers.instrumentation import record_page_load, record_page_metrics, track_action
+from pages import scripts
+from reporting.web_vitals import PerformanceBudgetWarning, check_budgets
 
 
 LOGGER = logging.getLogger(__name__)
+POLL_INTERVAL_MIN = 0.05
+POLL_INTERVAL_MAX = 1.0
+
+# per driver: script timeout last set, False once async scripts proved unsupported
+_ASYNC_SCRIPT_STATE = weakref.WeakKeyDictionary()
+
+
+def _same_page(current_url: str, target_url: str) -> bool:
+    """Compares urls ignoring the fragment and a trailing slash."""
+    return (current_url or "").split("#")[0].rstrip("/") == target_url.rstrip("/")
 
 
 class BasePage:
+    """Page objects declare the path they live at and the locator that shows
+    they are ready. Nothing happens on construction: the first interaction
+    navigates to the page, unless the browser already shows it in the ready
+    state, and the readiness is verified once per page object.
+
+    With performance metrics enabled, every page load is measured once the page
+    is ready and checked against the page's `_budgets`, upper bounds keyed by
+    metric name (navigation_ms, ttfb_ms, dom_content_loaded_ms, load_ms,
+    lcp_ms, cls, resources, resource_bytes)."""
+
+    _path: str = None
+    _ready_locator: dict = None
+    _ready_timeout: float = 10
+    _budgets: dict = {}
 
-    def __init__(self, driver: webdriver):
-        """Constructor method for the BasePage class."""
+    def __init__(self, driver: webdriver, config: RunConfig = None):
+        """Constructor method for the BasePage class. Takes the run
+        configuration the session was started with."""
         self.driver = driver
+        self.config = config or RunConfig()
+        self._verified_url = None
+        self._navigation_seconds = None
 
+    @track_action
     def _visit(self, url: str) -> None:
         """Visit a url. Requires url to be a string."""
-        target_url = f"{setting.BASE_URL}/{url}"
-        LOGGER.info(f"Visiting {target_url}")
+        target_url = f"{self.config.base_url}/{url}"
+        LOGGER.info("Visiting %s", target_url)
+        start = time.perf_counter()
         self.driver.get(f"{target_url}")
+        self._navigation_seconds = time.perf_counter() - start
+        record_page_load(self.driver, self._navigation_seconds)
 
+    @track_action
+    def _ensure_ready(self) -> None:
+        """Navigates to the page of this page object if needed and verifies its
+        ready locator. Skips the page load when the browser is already on the
+        page and the ready locator is displayed."""
+        if self._verified_url or self._path is None:
+            return
+        target_url = f"{self.config.base_url}/{self._path}"
+        if _same_page(self.driver.current_url, target_url) and (
+                self._ready_locator is None or self._check_displayed(self._ready_locator, timeout=0)):
+            LOGGER.info("Already on %s", target_url)
+        else:
+            self._visit(self._path)
+            assert self._ready_locator is None or self._check_displayed(
+                self._ready_locator, self._ready_timeout), \
+                f"{type(self).__name__} is not ready: {self._ready_locator} is not displayed"
+            if self.config.perf_metrics:
+                self._measure_page(target_url)
+        self._verified_url = target_url
+
+    @track_action
+    def _measure_page(self, url: str) -> None:
+        """Collects Navigation Timing, resource timing and web vitals of the page
+        just loaded and checks them against the budgets. Violations warn, or
+        fail the test when the run configuration asks for it."""
+        try:
+            metrics = self.driver.execute_async_script(scripts.PAGE_METRICS) or {}
+        except WebDriverException as exception:
+            LOGGER.warning("Could not collect page metrics: %s", exception)
+            metrics = {}
+        metrics["navigation_ms"] = round(self._navigation_seconds * 1000, 1)
+        violations = check_budgets(metrics, self._budgets)
+        record_page_metrics(self.driver, {
+            "page": type(self).__name__, "url": url, "metrics": metrics, "violations": violations})
+        if violations:
+            message = f"{type(self).__name__} exceeded its performance budgets: {', '.join(violations)}"
+            assert self.config.perf_budgets != "fail", message
+            LOGGER.warning(message)
+            warnings.warn(message, PerformanceBudgetWarning)
+
+    @track_action
     def _find(self, locator: dict, timeout: int = 10) -> WebElement:
         """Find an element and give a default wait of 10 seconds.
         Takes in a dictionary with the "by" and "value" keys. Returns
         a webdriver element.
         """
+        self._ensure_ready()
         try:
+            if self.config.wait_strategy != "webdriverwait":
+                return self._wait_for(locator, visible=False, timeout=timeout)
             element = WebDriverWait(self.driver, timeout).until(
                 EC.presence_of_element_located(
                     (locator["by"], locator["value"])
@@ -35,22 +118,32 @@ class BasePage:
             )
             return element
         except TimeoutException as exception:
-            LOGGER.error(f"Could not find element {locator}. Stacktrace: {exception}")
+            LOGGER.error("Could not find element %s. Stacktrace: %s", locator, exception)
 
+    @track_action
     def _click(self, locator: dict) -> None:
         """Clicks an element. Requires a dictionary with the "by" and "value" keys."""
         self._find(locator).click()
 
+    @track_action
     def _type(self, locator: dict, input_text: str) -> None:
         """Clears text field then types into an element. Requires a dictionary with
         the "by" and "value" keys and input text as string."""
         self._find(locator).clear()
         self._find(locator).send_keys(input_text)
 
+    @track_action
     def _is_displayed(self, locator: dict, timeout: int = 10) -> bool:
         """Checks if an element is displayed. Requires a dictionary with the "by" and "value" keys.
         Has default timeout of 10 seconds"""
+        self._ensure_ready()
+        return self._check_displayed(locator, timeout)
+
+    def _check_displayed(self, locator: dict, timeout: float = 10) -> bool:
+        """Waits up to `timeout` seconds for an element to be displayed."""
         try:
+            if self.config.wait_strategy != "webdriverwait":
+                return self._wait_for(locator, visible=True, timeout=timeout) is not None
             element = WebDriverWait(self.driver, timeout).until(
                 EC.visibility_of_element_located(
                     (locator["by"], locator["value"])
@@ -61,3 +154,91 @@ class BasePage:
         except TimeoutException:
             LOGGER.error("Element is currently not displayed in screen.")
             return False
+
+    def _wait_for(self, locator: dict, visible: bool, timeout: float) -> WebElement:
+        """Waits for an element to be present (or visible) and returns it. Raises
+        TimeoutException after `timeout` seconds. The "observer" wait strategy
+        resolves from a MutationObserver in the page; the "poll" strategy and
+        drivers without async script support use exponential back-off polling."""
+        deadline = time.monotonic() + timeout
+        if self.config.wait_strategy == "observer" and _ASYNC_SCRIPT_STATE.get(self.driver) is not False:
+            try:
+                return self._observe(locator, visible, timeout)
+            except UnknownMethodException:
+                LOGGER.warning("Driver does not support async scripts, falling back to polling")
+                _ASYNC_SCRIPT_STATE[self.driver] = False
+            except TimeoutException:
+                raise
+            except WebDriverException as exception:
+                # e.g. the page navigated while the observer was waiting
+                LOGGER.debug("Observer wait interrupted, polling instead: %s", exception)
+        return self._poll(locator, visible, deadline)
+
+    def _observe(self, locator: dict, visible: bool, timeout: float) -> WebElement:
+        """Waits through a MutationObserver injected with execute_async_script."""
+        script_timeout = timeout + 5
+        if _ASYNC_SCRIPT_STATE.get(self.driver) != script_timeout:
+            self.driver.set_script_timeout(script_timeout)
+            _ASYNC_SCRIPT_STATE[self.driver] = script_timeout
+        element = self.driver.execute_async_script(
+            scripts.WAIT_FOR, locator["by"], locator["value"], visible, int(timeout * 1000))
+        if element is None:
+            raise TimeoutException(f"Timed out after {timeout}s waiting for {locator}")
+        return element
+
+    def _poll(self, locator: dict, visible: bool, deadline: float) -> WebElement:
+        """Polls for an element, doubling the interval after every miss."""
+        interval = POLL_INTERVAL_MIN
+        while True:
+            try:
+                for element in self.driver.find_elements(locator["by"], locator["value"]):
+                    if not visible or element.is_displayed():
+                        return element
+            except StaleElementReferenceException:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(f"Timed out waiting for {locator}")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, POLL_INTERVAL_MAX)
+
+    @track_action
+    def _locate_many(self, locators: dict, timeout: int = 10,
+                     visible: bool = False) -> dict:
+        """Resolves several locators in a single script round trip. Takes a
+        dictionary of name to locator dict and returns a dictionary of name to
+        (element or None, is visible). Waits up to `timeout` seconds until every
+        element is present (and visible if `visible` is set)."""
+        self._ensure_ready()
+        names = list(locators)
+        pairs = [[locators[name]["by"], locators[name]["value"]] for name in names]
+        results = [[None, False]] * len(names)
+
+        def resolved(driver) -> bool:
+            nonlocal results
+            results = driver.execute_script(scripts.LOCATE_MANY, pairs)
+            return all(element is not None and (is_visible or not visible)
+                       for element, is_visible in results)
+
+        try:
+            WebDriverWait(self.driver, timeout).until(resolved)
+        except TimeoutException:
+            missing = [name for name, (element, _) in zip(names, results) if element is None]
+            LOGGER.error("Could not resolve all locators, missing: %s", missing)
+        return {name: (element, is_visible)
+                for name, (element, is_visible) in zip(names, results)}
+
+    @track_action
+    def _fill_form(self, fields: list, submit: dict = None, timeout: int = 10) -> None:
+        """Fills a form in a single script round trip. Takes a list of
+        (locator dict, input text) tuples and optionally the locator of the
+        button to click afterwards. Fires input and change events like typing
+        would, but replaces the value instead of sending key strokes."""
+        self._ensure_ready()
+        values = [[locator["by"], locator["value"], text] for locator, text in fields]
+        button = [submit["by"], submit["value"]] if submit else None
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda driver: driver.execute_script(scripts.FILL_FORM, values, button))
+        except TimeoutException as exception:
+            LOGGER.error("Could not fill form %s. Stacktrace: %s", fields, exception)
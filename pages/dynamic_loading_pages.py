@@ -1,5 +1,5 @@
 from selenium.webdriver.common.by import By 
-from selenium.webdriver.remote.webdriver import WebDriver
+from pages.async_base_page import AsyncBasePage
 from pages.base_page import BasePage
 
 class DynamicLoadingPage(BasePage):
@@ -7,11 +7,8 @@ class DynamicLoadingPage(BasePage):
     _start_button = {"by": By.XPATH, "value": "//button[contains(text(), 'Start')]"}
     _loading_bar = {"by": By.ID, "value": "loading"}
     _hello_world_text = {"by": By.ID, "value": "finish"}
-
-    def __init__(self, driver: WebDriver):
-        self.driver = driver
-        self._visit("dynamic_loading/1")
-        assert self._is_displayed(self._start_button)
+    _path = "dynamic_loading/1"
+    _ready_locator = _start_button
 
     def click_start_button(self) -> None:
         """Clicks start button"""
@@ -23,4 +20,27 @@ class DynamicLoadingPage(BasePage):
 
     def is_hello_world_text_present(self) -> bool:
         """Checks if text hello world is present"""
-        return self._is_displayed(self._hello_world_text)
\ No newline at end of file
+        return self._is_displayed(self._hello_world_text)
+
+
+class AsyncDynamicLoadingPage(AsyncBasePage):
+    """Async counterpart of DynamicLoadingPage."""
+
+    _start_button = DynamicLoadingPage._start_button
+    _loading_bar = DynamicLoadingPage._loading_bar
+    _hello_world_text = DynamicLoadingPage._hello_world_text
+
+    _path = DynamicLoadingPage._path
+    _ready_locator = DynamicLoadingPage._ready_locator
+
+    async def click_start_button(self) -> None:
+        """Clicks start button"""
+        await self._click(self._start_button)
+
+    async def is_loading_bar_present(self) -> bool:
+        """Does a check if loading bar present"""
+        return await self._is_displayed(self._loading_bar)
+
+    async def is_hello_world_text_present(self) -> bool:
+        """Checks if text hello world is present"""
+        return await self._is_displayed(self._hello_world_text)
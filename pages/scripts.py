@@ -0,0 +1,145 @@
+"""JavaScript snippets run in the browser by the page objects.
+
+Locators are passed as ``[by, value]`` pairs using the selenium ``By``
+strategy names, so the same class-level locator dicts work for both
+``find_element`` and the scripts below.
+"""
+
+_HELPERS = """
+function locate(by, value) {
+    switch (by) {
+        case "id": return document.getElementById(value);
+        case "css selector": return document.querySelector(value);
+        case "xpath": return document.evaluate(
+            value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        case "name": return document.getElementsByName(value)[0] || null;
+        case "class name": return document.getElementsByClassName(value)[0] || null;
+        case "tag name": return document.getElementsByTagName(value)[0] || null;
+        case "link text": return Array.from(document.links).find(
+            (link) => link.textContent.trim() === value) || null;
+        case "partial link text": return Array.from(document.links).find(
+            (link) => link.textContent.includes(value)) || null;
+    }
+    throw new Error("Unsupported locator strategy: " + by);
+}
+function isVisible(element) {
+    if (!element || !element.isConnected) return false;
+    const style = window.getComputedStyle(element);
+    if (style.display === "none" || style.visibility === "hidden" || style.opacity === "0") {
+        return false;
+    }
+    const rect = element.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0;
+}
+"""
+
+# arguments[0]: list of [by, value]. Returns a list of [element or null, visible].
+LOCATE_MANY = _HELPERS + """
+return arguments[0].map(([by, value]) => {
+    const element = locate(by, value);
+    return [element, isVisible(element)];
+});
+"""
+
+# arguments[0]: list of [by, value, text], arguments[1]: [by, value] to click or null.
+# Nothing is touched unless every field is present; returns whether the form was filled.
+FILL_FORM = _HELPERS + """
+const fields = arguments[0].map(([by, value, text]) => [locate(by, value), text]);
+const submit = arguments[1] && locate(arguments[1][0], arguments[1][1]);
+if (fields.some(([element]) => !element) || (arguments[1] && !submit)) return false;
+for (const [element, text] of fields) {
+    element.focus();
+    element.value = text;
+    element.dispatchEvent(new Event("input", {bubbles: true}));
+    element.dispatchEvent(new Event("change", {bubbles: true}));
+}
+if (submit) submit.click();
+return true;
+"""
+
+# Async script. arguments: by, value, wait for visibility, timeout in ms.
+# Resolves with the element as soon as a DOM mutation makes the locator match
+# (and become visible if requested), or with null once the timeout expires.
+# Styles, transitions and layout change visibility without any mutation, so
+# the locator is also re-checked every 100 ms.
+WAIT_FOR = _HELPERS + """
+const [by, value, visible, timeout] = arguments;
+const done = arguments[arguments.length - 1];
+const match = () => {
+    const element = locate(by, value);
+    return element && (!visible || isVisible(element)) ? element : null;
+};
+const found = match();
+if (found) {
+    done(found);
+    return;
+}
+let timer = null;
+let poll = null;
+const check = () => {
+    const element = match();
+    if (element) finish(element);
+};
+const observer = new MutationObserver(check);
+function finish(result) {
+    observer.disconnect();
+    clearInterval(poll);
+    clearTimeout(timer);
+    done(result);
+}
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+poll = setInterval(check, 100);
+timer = setTimeout(() => finish(null), timeout);
+"""
+
+# Web storage of the current origin as [localStorage, sessionStorage]
+SNAPSHOT_STORAGE = """
+return [Object.assign({}, window.localStorage), Object.assign({}, window.sessionStorage)];
+"""
+
+# Restores a SNAPSHOT_STORAGE result into the current origin
+RESTORE_STORAGE = """
+const [local, session] = arguments;
+window.localStorage.clear();
+window.sessionStorage.clear();
+for (const [key, value] of Object.entries(local)) window.localStorage.setItem(key, value);
+for (const [key, value] of Object.entries(session)) window.sessionStorage.setItem(key, value);
+"""
+
+# Async script. Navigation Timing, resource timing and web vitals of the current
+# page, times in ms from the navigation start. LCP and CLS come from buffered
+# performance observers and are null where the browser does not support them.
+PAGE_METRICS = """
+const done = arguments[arguments.length - 1];
+const supported = PerformanceObserver.supportedEntryTypes || [];
+const metrics = {};
+const navigation = performance.getEntriesByType("navigation")[0];
+if (navigation) {
+    metrics.ttfb_ms = navigation.responseStart;
+    metrics.dom_content_loaded_ms = navigation.domContentLoadedEventEnd;
+    metrics.load_ms = navigation.loadEventEnd || null;
+    metrics.transfer_bytes = navigation.transferSize;
+}
+const resources = performance.getEntriesByType("resource");
+metrics.resources = resources.length;
+metrics.resource_bytes = resources.reduce((total, entry) => total + (entry.transferSize || 0), 0);
+metrics.slowest_resources = resources.sort((a, b) => b.duration - a.duration).slice(0, 3)
+    .map((entry) => ({url: entry.name, duration_ms: Math.round(entry.duration)}));
+const buffered = (type) => new Promise((resolve) => {
+    if (!supported.includes(type)) return resolve(null);
+    const entries = [];
+    const observer = new PerformanceObserver((list) => entries.push(...list.getEntries()));
+    observer.observe({type: type, buffered: true});
+    setTimeout(() => {
+        entries.push(...observer.takeRecords());
+        observer.disconnect();
+        resolve(entries);
+    }, 0);
+});
+Promise.all([buffered("largest-contentful-paint"), buffered("layout-shift")]).then(([paints, shifts]) => {
+    metrics.lcp_ms = paints && paints.length ? paints[paints.length - 1].startTime : null;
+    metrics.cls = shifts ? shifts.filter((shift) => !shift.hadRecentInput)
+        .reduce((total, shift) => total + shift.value, 0) : null;
+    done(metrics);
+});
+"""
@@ -0,0 +1,14 @@
+from selenium.webdriver.common.by import By
+from pages.base_page import BasePage
+
+
+class SecurePage(BasePage):
+
+    _logout_button = {"by": By.CSS_SELECTOR, "value": "a[href='/logout']"}
+    _success_message = {"by": By.CSS_SELECTOR, "value": ".flash.success"}
+    # logged out users are redirected to the login page, so there is no ready locator
+    _path = "secure"
+
+    def is_logged_in(self, timeout: int = 3) -> bool:
+        """Checks for the logout button. Logged out users are redirected to the login page."""
+        return self._is_displayed(self._logout_button, timeout)
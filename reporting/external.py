@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Union
+import pytest
+from py.xml import html
+from drivers.filelock import write_atomic
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class AssetStore:
+    """Stores report assets (log output) as files named after a hash
+    of their content, so identical assets are written only once. Files are
+    written on a background thread; `add` returns the path to use in the
+    report, relative to the report file."""
+
+    directory: Path
+    _known: set = field(default_factory=set, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _executor: ThreadPoolExecutor = field(init=False)
+
+    def __post_init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assets")
+
+    def add(self, data: Union[str, bytes], extension: str) -> str:
+        """Queues an asset for writing and returns its relative path."""
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        name = f"{hashlib.sha256(raw).hexdigest()[:24]}.{extension}"
+        with self._lock:
+            is_new = name not in self._known
+            self._known.add(name)
+        if is_new:
+            self._executor.submit(self._write, name, raw)
+        return f"{self.directory.name}/{name}"
+
+    def close(self) -> None:
+        """Waits until every queued asset is on disk."""
+        self._executor.shutdown(wait=True)
+
+    def _write(self, name: str, data: bytes) -> None:
+        """Writes an asset unless another xdist worker already did."""
+        path = self.directory / name
+        if not path.exists():
+            write_atomic(path, data)
+
+
+@dataclass
+class ResultStream:
+    """Appends one JSON line per test phase to a file as results come in,
+    instead of keeping them in memory until the session ends."""
+
+    path: Path
+    _file: object = field(init=False)
+
+    def __post_init__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8", buffering=1)  # pylint: disable=consider-using-with
+
+    def write(self, result: dict) -> None:
+        """Writes a result line, flushed right away."""
+        self._file.write(json.dumps(result) + "\n")
+
+    def close(self) -> None:
+        """Closes the stream."""
+        self._file.close()
+        LOGGER.info(">> Streamed results written to %s", self.path)
+
+
+class ExternalReport:
+    """pytest plugin for --report-assets=external. Log output is stored as
+    content-addressed assets next to the HTML report, which only links to them,
+    and every result is streamed to results.jsonl as it comes in. Screenshots
+    are written to the same assets folder by the screenshot pipeline. Results
+    are handled by the controller when running under xdist."""
+
+    def __init__(self, config: pytest.Config, directory: Path):
+        self.config = config
+        self.assets = AssetStore(directory=directory / "assets")
+        self.stream = None
+        self.directory = directory
+        self._log_assets = {}
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        """Writes the log output of a result as an asset and streams the result."""
+        if hasattr(self.config, "workerinput"):
+            return
+        log_text = "\n\n".join([report.longreprtext] + [
+            f"{header}\n{content}" for header, content in report.sections]).strip()
+        log_href = self.assets.add(log_text, "txt") if log_text else None
+        if log_href:
+            self._log_assets.setdefault(report.nodeid, []).append(log_href)
+
+        if self.stream is None:
+            self.stream = ResultStream(self.directory / "results.jsonl")
+        self.stream.write({
+            "nodeid": report.nodeid,
+            "when": report.when,
+            "outcome": report.outcome,
+            "duration": round(report.duration, 3),
+            "wasxfail": hasattr(report, "wasxfail"),
+            "log": log_href,
+        })
+
+    def pytest_html_results_table_html(self, report: pytest.TestReport, data: list) -> None:
+        """Replaces inlined log output with links to the log assets."""
+        hrefs = self._log_assets.pop(report.nodeid, None)
+        if hrefs:
+            data[:] = [element for element in data if getattr(element.attr, "class_", None) != "log"]
+            data.append(html.div(*[html.a(f"log {index + 1} ", href=href, target="_blank")
+                                   for index, href in enumerate(hrefs)], class_="log"))
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self) -> None:
+        """Flushes pending assets and closes the result stream."""
+        self.assets.close()
+        if self.stream:
+            self.stream.close()
@@ -0,0 +1,127 @@
+import json
+import logging
+import queue
+from collections import deque
+from logging.handlers import QueueListener
+from pathlib import Path
+import pytest
+
+
+LOGGER = logging.getLogger(__name__)
+# top level modules and packages of the framework
+PROJECT_LOGGERS = ("conftest", "config", "drivers", "pages", "reporting", "scheduling")
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` records of the running test as they are,
+    without formatting them. Outside of a test, records are handed on to the
+    root logger's handlers."""
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        self.active = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.active:
+            self.records.append(record)
+        else:
+            logging.getLogger().handle(record)
+
+    def take(self) -> list[logging.LogRecord]:
+        """Returns the buffered records and empties the buffer."""
+        records = list(self.records)
+        self.records.clear()
+        return records
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "test": getattr(record, "nodeid", None),
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "where": f"{record.filename}:{record.lineno}",
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class BufferedLogging:
+    """pytest plugin for --log-mode=buffered. The project loggers stop
+    propagating to pytest's live and captured logging; each test's records go
+    to a ring buffer instead. The buffer is only formatted for failed and
+    xfailed tests, where it becomes a report section and is written as JSON
+    lines by a background thread. Every xdist worker writes its own file."""
+
+    def __init__(self, config: pytest.Config, path: Path, capacity: int = 500,
+                 level: str = "INFO", loggers: tuple = PROJECT_LOGGERS):
+        self.config = config
+        self.buffer = RingBufferHandler(capacity)
+        self.loggers = [logging.getLogger(name) for name in loggers]
+        self._saved = [(logger.level, logger.propagate) for logger in self.loggers]
+        for logger in self.loggers:
+            logger.setLevel(level)
+            logger.propagate = False
+            logger.addHandler(self.buffer)
+
+        if hasattr(config, "workerinput"):
+            path = path.with_name(f"{path.stem}-{config.workerinput['workerid']}{path.suffix}")
+        self.path = path
+        self.formatter = logging.Formatter(
+            config.getini("log_cli_format") or logging.BASIC_FORMAT, config.getini("log_cli_date_format"))
+        self._queue = queue.SimpleQueue()
+        self._file_handler = None
+        self._listener = None
+
+    def _write(self, records: list[logging.LogRecord]) -> None:
+        """Queues records for the JSON lines file, started on first use."""
+        if self._listener is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file_handler = logging.FileHandler(self.path, encoding="utf-8")
+            self._file_handler.setFormatter(JsonFormatter())
+            self._listener = QueueListener(self._queue, self._file_handler)
+            self._listener.start()
+        for record in records:
+            self._queue.put_nowait(record)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item: pytest.Item) -> None:  # pylint: disable=unused-argument
+        """Buffers the records of one test."""
+        self.buffer.take()
+        self.buffer.active = True
+        yield
+        self.buffer.active = False
+        self.buffer.take()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item: pytest.Item) -> None:
+        """Flushes the buffer into the report of a failed or xfailed phase."""
+        outcome = yield
+        report = outcome.get_result()
+        if not (report.failed or (report.skipped and hasattr(report, "wasxfail"))):
+            return
+        records = self.buffer.take()
+        if not records:
+            return
+        for record in records:
+            record.nodeid = item.nodeid
+        self._write(records)
+        report.sections.append((f"Buffered log {report.when}",
+                                "\n".join(self.formatter.format(record) for record in records)))
+
+    def pytest_unconfigure(self) -> None:
+        """Restores the loggers and waits for pending records to be written."""
+        for logger, (level, propagate) in zip(self.loggers, self._saved):
+            logger.removeHandler(self.buffer)
+            logger.setLevel(level)
+            logger.propagate = propagate
+        if self._listener:
+            self._listener.stop()
+            self._file_handler.close()
+            LOGGER.info(">> Logs of failed tests written to %s", self.path)
@@ -0,0 +1,79 @@
+import json
+import logging
+from pathlib import Path
+import pytest
+from py.xml import html
+from drivers.fast_profile import CDP_VENDORS
+from drivers.filelock import write_atomic
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PageLoadReport:
+    """pytest plugin recording the page load time of every browser test in the
+    pytest cache, per host, browser and mode. Runs without --fast-mode are the
+    baseline; a fast mode run reports the time saved per test against it in
+    page_load_savings.json and the HTML summary, noting the browsers whose
+    savings come without url blocking. Results are collected by the
+    controller when running under xdist."""
+
+    def __init__(self, config: pytest.Config, directory: Path, fast_mode: bool):
+        self.config = config
+        self.directory = directory
+        self.fast_mode = fast_mode
+        self.savings = []
+        self._loads = {}
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        """Collects the page load time attached to the call phase report."""
+        if hasattr(self.config, "workerinput") or not hasattr(report, "page_load"):
+            return
+        self._loads.setdefault(report.page_load_key, {})[report.nodeid] = round(report.page_load, 3)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionfinish(self) -> None:
+        """Stores the page loads of this run and compares fast mode to the baseline.
+        Runs before pytest-html so the summary is part of the report."""
+        if hasattr(self.config, "workerinput"):
+            return
+        mode = "fast" if self.fast_mode else "full"
+        for key, loads in self._loads.items():
+            history = self.config.cache.get(f"page_loads/{key}-{mode}", {})
+            history.update(loads)
+            self.config.cache.set(f"page_loads/{key}-{mode}", history)
+            if self.fast_mode:
+                baseline = self.config.cache.get(f"page_loads/{key}-full", {})
+                self.savings += [{
+                    "nodeid": nodeid,
+                    "key": key,
+                    "full_s": baseline.get(nodeid),
+                    "fast_s": seconds,
+                    "saved_s": round(baseline[nodeid] - seconds, 3) if nodeid in baseline else None,
+                    # --block-urls goes through CDP, which only chromium browsers have
+                    "url_blocking": key.rpartition("-")[2] in CDP_VENDORS,
+                } for nodeid, seconds in sorted(loads.items())]
+
+        if self.fast_mode and self.savings:
+            path = self.directory / "page_load_savings.json"
+            write_atomic(path, json.dumps(self.savings, indent=2))
+            LOGGER.info(">> %s, details in %s", self.summary(), path)
+
+    def summary(self) -> str:
+        """One line total of the time saved by fast mode."""
+        compared = [row for row in self.savings if row["saved_s"] is not None]
+        full = sum(row["full_s"] for row in compared)
+        if not full:
+            return "Fast mode page loads: no baseline yet, run once without --fast-mode"
+        saved = sum(row["saved_s"] for row in compared)
+        summary = (f"Fast mode saved {saved:.2f}s of {full:.2f}s page load time "
+                   f"({saved / full:.0%}) over {len(compared)} tests")
+        unblocked = sorted({row["key"] for row in compared if not row["url_blocking"]})
+        if unblocked:
+            summary += f"; {', '.join(unblocked)} without url blocking (chrome and edge only)"
+        return summary
+
+    def pytest_html_results_summary(self, prefix: list) -> None:
+        """Adds the fast mode savings to the HTML report summary."""
+        if self.fast_mode and self.savings:
+            prefix.append(html.p(self.summary()))
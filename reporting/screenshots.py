@@ -0,0 +1,113 @@
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+from drivers.filelock import write_atomic
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+LOGGER = logging.getLogger(__name__)
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+PIL_FORMATS = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP"}
+
+
+def encode(png: bytes, image_format: str = "png", max_width: Optional[int] = None,
+           max_kb: Optional[int] = None) -> tuple[bytes, str]:
+    """Downscales and re-encodes a PNG screenshot. Returns the encoded bytes and
+    their format. Lossy formats lower their quality, then every format shrinks
+    the image until it fits `max_kb`. Without Pillow the PNG is returned as is."""
+    if image_format == "png" and not max_width and not max_kb:
+        return png, "png"
+    if Image is None:
+        LOGGER.warning("Pillow is not installed, keeping screenshots as PNG")
+        return png, "png"
+
+    image = Image.open(io.BytesIO(png))
+    if image_format == "jpeg":
+        image = image.convert("RGB")
+    if max_width and image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)))
+
+    quality = 85
+    while True:
+        buffer = io.BytesIO()
+        options = {"optimize": True} if image_format == "png" else {"quality": quality}
+        image.save(buffer, PIL_FORMATS[image_format], **options)
+        data = buffer.getvalue()
+        if not max_kb or len(data) <= max_kb * 1024 or image.width <= 320:
+            return data, image_format
+        if image_format != "png" and quality > 40:
+            quality -= 15
+        else:
+            image = image.resize((round(image.width * 0.75), round(image.height * 0.75)))
+
+
+@dataclass
+class ScreenshotPipeline:
+    """Encodes and writes failure screenshots on a thread pool, so a test's
+    teardown and the next test never wait for compression or disk I/O. With
+    `content_addressed`, files are named after a hash of the captured PNG and
+    an identical screen is written only once."""
+
+    directory: Path
+    image_format: str = "png"
+    max_width: Optional[int] = None
+    max_kb: Optional[int] = None
+    workers: int = 2
+    content_addressed: bool = False
+    _known: set = field(default_factory=set, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _executor: ThreadPoolExecutor = field(init=False)
+
+    def __post_init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="screenshots")
+
+    @property
+    def transforms(self) -> bool:
+        """Whether screenshots are changed before they are written."""
+        return self.image_format != "png" or bool(self.max_width or self.max_kb)
+
+    @property
+    def output_format(self) -> str:
+        """Format screenshots are written in, PNG when Pillow is missing."""
+        return self.image_format if Image is not None else "png"
+
+    def submit(self, png: bytes, name: str) -> Path:
+        """Queues a screenshot captured with get_screenshot_as_png and returns
+        the path it will be written to, known before it is encoded."""
+        if self.content_addressed:
+            name = hashlib.sha256(png).hexdigest()[:24]
+        path = self.directory / f"{name}.{self.output_format}"
+        if self.content_addressed:
+            with self._lock:
+                if name in self._known:
+                    return path
+                self._known.add(name)
+        self._executor.submit(self._process, png, path)
+        return path
+
+    def close(self) -> None:
+        """Waits for every queued screenshot to be written."""
+        self._executor.shutdown(wait=True)
+
+    def _process(self, png: bytes, path: Path) -> None:
+        """Encodes a screenshot and writes it to disk, unless another xdist
+        worker already wrote the same content-addressed file."""
+        if self.content_addressed and path.exists():
+            return
+        try:
+            data, _ = encode(png, self.output_format, self.max_width, self.max_kb)
+        except Exception as exception:  # pylint: disable=broad-except
+            LOGGER.error("Could not encode screenshot %s, writing the PNG: %s", path.name, exception)
+            data = png
+
+        write_atomic(path, data)
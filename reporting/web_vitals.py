@@ -0,0 +1,67 @@
+import json
+import logging
+import time
+from pathlib import Path
+import pytest
+from py.xml import html
+
+
+LOGGER = logging.getLogger(__name__)
+BUDGET_MODES = ("warn", "fail")
+
+
+class PerformanceBudgetWarning(UserWarning):
+    """A page exceeded one of its performance budgets."""
+
+
+def check_budgets(metrics: dict, budgets: dict) -> list[str]:
+    """Budgets of `budgets` (metric name to upper bound) the metrics exceed.
+    Metrics the browser did not report are not checked."""
+    return [
+        f"{name} {metrics[name]:g} > {limit:g}"
+        for name, limit in budgets.items()
+        if metrics.get(name) is not None and metrics[name] > limit
+    ]
+
+
+class PageMetricsReport:
+    """pytest plugin for --perf-metrics. Appends the metrics of every measured
+    page load, tagged with host, browser and platform, to a JSON lines time
+    series that is kept across runs, and sums up budget violations in the HTML
+    report. Results are collected by the controller when running under xdist."""
+
+    def __init__(self, config: pytest.Config, path: Path):
+        self.config = config
+        self.path = path
+        self.run = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.pages = 0
+        self.violations = 0
+        self._file = None
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        """Appends the page metrics attached to the call phase report."""
+        if hasattr(self.config, "workerinput") or not getattr(report, "page_metrics", None):
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)  # pylint: disable=consider-using-with
+        for entry in report.page_metrics:
+            self.pages += 1
+            self.violations += len(entry["violations"])
+            self._file.write(json.dumps({"run": self.run, "test": report.nodeid,
+                                         **report.page_metrics_tags, **entry}) + "\n")
+
+    def pytest_sessionfinish(self) -> None:
+        """Closes the time series."""
+        if self._file:
+            self._file.close()
+            LOGGER.info(">> %s, appended to %s", self.summary(), self.path)
+
+    def summary(self) -> str:
+        """One line count of the measured pages and budget violations."""
+        return f"{self.pages} page loads measured, {self.violations} performance budget violations"
+
+    def pytest_html_results_summary(self, prefix: list) -> None:
+        """Adds the budget violations to the HTML report summary."""
+        if self.pages:
+            prefix.append(html.p(self.summary()))
@@ -0,0 +1,108 @@
+import logging
+from collections import defaultdict
+from typing import Callable
+import pytest
+
+
+LOGGER = logging.getLogger(__name__)
+# weight of the latest run in the stored duration
+SMOOTHING = 0.5
+
+
+class DurationStore:
+    """Per-test durations and last outcome, kept in the pytest cache under one
+    entry per host and browser as {nodeid: [seconds, failed]}. Durations are
+    smoothed across runs so a single slow run does not reorder everything."""
+
+    def __init__(self, cache: pytest.Cache):
+        self.cache = cache
+
+    def load(self, key: str) -> dict:
+        """History of a host/browser combination."""
+        return self.cache.get(f"durations/{key}", {})
+
+    def update(self, key: str, results: dict) -> None:
+        """Merges {nodeid: (seconds, failed)} of a run into the history."""
+        history = self.load(key)
+        for nodeid, (duration, failed) in results.items():
+            previous = history.get(nodeid)
+            if previous:
+                duration = previous[0] + SMOOTHING * (duration - previous[0])
+            history[nodeid] = [round(duration, 3), int(failed)]
+        self.cache.set(f"durations/{key}", history)
+
+
+def lpt_order(items: list, history: Callable[[pytest.Item], list], failed_first: bool = False) -> list:
+    """Orders tests longest-first. xdist hands pending tests to whichever worker
+    is idle, so this is the longest-processing-time-first heuristic for the
+    makespan. Tests without history are assumed to take the mean known time.
+    With `failed_first`, tests that failed last time run before all others."""
+    known = [entry[0] for entry in map(history, items) if entry]
+    default = sum(known) / len(known) if known else 0
+
+    def key(indexed_item):
+        index, item = indexed_item
+        entry = history(item) or [default, 0]
+        return (-entry[1] if failed_first else 0, -entry[0], index)
+
+    return [item for _, item in sorted(enumerate(items), key=key)]
+
+
+class DurationScheduler:
+    """pytest plugin recording test durations per host and browser and, with
+    `reorder` (--schedule=lpt), running the slowest tests first. `key` names
+    the host/browser combination of a test. Histories are written by the
+    controller when running under xdist; every worker orders its collection
+    the same way."""
+
+    def __init__(self, config: pytest.Config, key: Callable[[pytest.Item], str],
+                 failed_first: bool = False, reorder: bool = True):
+        self.config = config
+        self.key = key
+        self.failed_first = failed_first
+        self.reorder = reorder
+        self.store = DurationStore(config.cache)
+        self._results = defaultdict(dict)
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, items: list) -> None:
+        """Reorders the collected tests after every other plugin did."""
+        if not self.reorder:
+            return
+        histories = {}
+
+        def history(item: pytest.Item) -> list:
+            key = self.key(item)
+            if key not in histories:
+                histories[key] = self.store.load(key)
+            return histories[key].get(item.nodeid)
+
+        items[:] = lpt_order(items, history, self.failed_first)
+        estimate = sum((history(item) or [0])[0] for item in items)
+        LOGGER.info(">> Longest tests first, %.1fs of known test time", estimate)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item: pytest.Item):
+        """Tags each report with the host/browser key of its test."""
+        outcome = yield
+        outcome.get_result().duration_key = self.key(item)
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        """Adds up setup, call and teardown time per test."""
+        if hasattr(self.config, "workerinput") or not hasattr(report, "duration_key"):
+            return
+        results = self._results[report.duration_key]
+        if report.skipped and report.when == "setup":
+            results[report.nodeid] = None
+            return
+        if report.nodeid in results and results[report.nodeid] is None:
+            return
+        duration, failed = results.get(report.nodeid, (0, False))
+        results[report.nodeid] = (duration + report.duration, failed or report.failed)
+
+    def pytest_sessionfinish(self) -> None:
+        """Persists the durations of this run."""
+        if hasattr(self.config, "workerinput"):
+            return
+        for key, results in self._results.items():
+            self.store.update(key, {nodeid: result for nodeid, result in results.items() if result})
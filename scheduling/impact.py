@@ -0,0 +1,560 @@
+import ast
+import logging
+import re
+import subprocess
+from pathlib import Path
+from typing import Optional
+import pytest
+
+
+LOGGER = logging.getLogger(__name__)
+INDEX_VERSION = 3
+# changes to these files run the whole suite, so does a change to any conftest.py
+FULL_SUITE_FILES = ("pages/base_page.py", "pytest.ini", "pyproject.toml", "requirements.txt")
+# "package.module:Name" strings, e.g. the runners of drivers.registry
+IMPORT_STRING = re.compile(r"^[A-Za-z_][\w.]*:[A-Za-z_][\w.]*$")
+# members called by pytest or Python itself rather than by project code
+DISPATCHED = re.compile(r"^(pytest_\w+|__\w+__)$")
+HUNK = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def module_name(path: str) -> str:
+    """Dotted module name of a repository relative path."""
+    parts = list(Path(path).with_suffix("").parts)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _dotted(node: ast.AST) -> Optional[str]:
+    """Name or dotted attribute chain of an expression, e.g. a type annotation."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f"{base}.{node.attr}" if base else None
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _is_fixture(decorator: ast.AST) -> tuple[bool, bool]:
+    """Whether a decorator is pytest.fixture, and whether it is autouse."""
+    call = decorator if isinstance(decorator, ast.Call) else None
+    name = _dotted(call.func if call else decorator)
+    if name not in ("pytest.fixture", "fixture"):
+        return False, False
+    autouse = any(keyword.arg == "autouse" and getattr(keyword.value, "value", False)
+                  for keyword in (call.keywords if call else []))
+    return True, autouse
+
+
+def _span(node: ast.AST) -> list[int]:
+    decorators = getattr(node, "decorator_list", [])
+    return [min([node.lineno] + [decorator.lineno for decorator in decorators]), node.end_lineno]
+
+
+def _root_name(node: ast.AST) -> Optional[str]:
+    """Name an attribute chain, call or subscript starts from, e.g. `a` in a.b().c[0]."""
+    while isinstance(node, (ast.Attribute, ast.Call, ast.Subscript)):
+        node = node.func if isinstance(node, ast.Call) else node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _function_refs(node: ast.AST, class_attrs: tuple = ()) -> tuple[list, dict]:
+    """Names a definition refers to, as unresolved references, and the classes
+    of its typed local variables. References are
+    ["name", n], ["attr", n, a] for n.a on a global name, ["self", a],
+    ["member", class, a] for a variable of a known class, ["var", n, a] for
+    untyped arguments (fixtures of tests), ["chain", n, a] for a.b.c chains
+    starting at a global name or typed variable, ["any", a] for attributes
+    of other expressions and ["import", "module:Name"] for import strings."""
+    arguments, local_names, types = set(), set(), {}
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        for argument in node.args.posonlyargs + node.args.args + node.args.kwonlyargs + [
+                node.args.vararg, node.args.kwarg]:
+            if argument is None:
+                continue
+            arguments.add(argument.arg)
+            if argument.annotation is not None and _dotted(argument.annotation):
+                types[argument.arg] = _dotted(argument.annotation)
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+            local_names.add(child.id)
+        elif isinstance(child, ast.Assign) and len(child.targets) == 1 and isinstance(child.targets[0], ast.Name):
+            value = child.value.value if isinstance(child.value, ast.Await) else child.value
+            if isinstance(value, ast.Call):
+                constructor = _dotted(value.func)
+                # x = Page(...) or x = Page.open(...)
+                if constructor and constructor.split(".")[0][:1].isupper():
+                    types[child.targets[0].id] = constructor.split(".")[0]
+    local_names |= arguments
+
+    refs = []
+    for child in ast.walk(node):
+        if isinstance(child, ast.Constant) and isinstance(child.value, str) and IMPORT_STRING.match(child.value):
+            refs.append(["import", child.value])
+        elif isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+            if child.id in class_attrs:
+                refs.append(["self", child.id])
+            elif child.id not in local_names:
+                refs.append(["name", child.id])
+        elif isinstance(child, ast.Attribute):
+            base = child.value
+            root = _root_name(base)
+            if isinstance(base, ast.Name) and base.id in ("self", "cls"):
+                refs.append(["self", child.attr])
+            elif isinstance(base, ast.Name) and base.id in types:
+                refs.append(["member", types[base.id], child.attr])
+            elif isinstance(base, ast.Name) and base.id in arguments:
+                refs.append(["var", base.id, child.attr])
+            elif isinstance(base, ast.Name) and base.id not in local_names:
+                refs.append(["attr", base.id, child.attr])
+            elif root in types:
+                refs.append(["chain", types[root], child.attr])
+            elif root and root not in local_names and root not in ("self", "cls"):
+                refs.append(["chain", root, child.attr])
+            else:
+                refs.append(["any", child.attr])
+    unique = []
+    for ref in refs:
+        if ref not in unique:
+            unique.append(ref)
+    return unique, types
+
+
+def _returned_class(node: ast.AST) -> Optional[str]:
+    """Class a function without return annotation returns or yields, from
+    `return Page(...)`, `yield Page(...)` or returning a variable set that way."""
+    _, types = _function_refs(node)
+    for child in ast.walk(node):
+        if isinstance(child, (ast.Return, ast.Yield)) and child.value is not None:
+            if isinstance(child.value, ast.Name) and child.value.id in types:
+                return types[child.value.id]
+            if isinstance(child.value, ast.Call) and _dotted(child.value.func):
+                constructor = _dotted(child.value.func).split(".")[0]
+                if constructor[:1].isupper():
+                    return constructor
+    return None
+
+
+def parse_module(source: str, package: str) -> dict:
+    """Definitions and imports of a module, in a JSON serializable form for the
+    cache. Definitions are functions, classes, class members and module level
+    constants, keyed by their name within the module."""
+    tree = ast.parse(source)
+    imports, defs = {}, {}
+    for statement in tree.body:
+        if isinstance(statement, ast.Import):
+            for alias in statement.names:
+                if alias.asname:
+                    imports[alias.asname] = alias.name
+                else:
+                    imports[alias.name.split(".")[0]] = alias.name.split(".")[0]
+        elif isinstance(statement, ast.ImportFrom):
+            source_module = statement.module or ""
+            if statement.level:
+                base = package.split(".")[:len(package.split(".")) - statement.level + 1] if package else []
+                source_module = ".".join(filter(None, base + [source_module]))
+            for alias in statement.names:
+                imports[alias.asname or alias.name] = f"{source_module}:{alias.name}"
+        elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            refs, types = _function_refs(statement)
+            fixture, autouse = False, False
+            for decorator in statement.decorator_list:
+                is_fixture, is_autouse = _is_fixture(decorator)
+                fixture, autouse = fixture or is_fixture, autouse or is_autouse
+            # pytest only resolves the arguments of fixtures and tests as fixtures
+            arguments = [argument.arg for argument in statement.args.args]
+            if not (fixture or statement.name.startswith("test")):
+                arguments = []
+            defs[statement.name] = {
+                "span": _span(statement), "refs": refs + [["fixture", name] for name in arguments],
+                "types": types, "fixture": fixture, "autouse": autouse,
+                "returns": _dotted(statement.returns) if statement.returns else _returned_class(statement),
+            }
+        elif isinstance(statement, ast.ClassDef):
+            header = ast.Module(body=[], type_ignores=[])
+            header.body = [ast.Expr(value=node) for node in statement.bases + statement.decorator_list]
+            refs, _ = _function_refs(header)
+            defs[statement.name] = {"span": _span(statement), "refs": refs, "class": True,
+                                    "bases": [_dotted(base) for base in statement.bases if _dotted(base)]}
+            class_attrs = []
+            for member in statement.body:
+                if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    refs, types = _function_refs(member)
+                    if member.name.startswith("test"):
+                        refs += [["fixture", argument.arg] for argument in member.args.args[1:]]
+                    defs[f"{statement.name}.{member.name}"] = {
+                        "span": _span(member), "refs": refs, "types": types, "method": True}
+                elif isinstance(member, (ast.Assign, ast.AnnAssign)):
+                    targets = member.targets if isinstance(member, ast.Assign) else [member.target]
+                    refs, _ = _function_refs(member, tuple(class_attrs))
+                    for target in targets:
+                        if isinstance(target, ast.Name):
+                            defs[f"{statement.name}.{target.id}"] = {"span": _span(member), "refs": refs}
+                            class_attrs.append(target.id)
+        elif isinstance(statement, (ast.Assign, ast.AnnAssign)):
+            targets = statement.targets if isinstance(statement, ast.Assign) else [statement.target]
+            refs, _ = _function_refs(statement)
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    defs[target.id] = {"span": _span(statement), "refs": refs}
+    return {"imports": imports, "defs": defs}
+
+
+class DependencyIndex:
+    """Static dependency graph of the repository's definitions. Attribute
+    accesses are resolved against the class they are made on: `self` within
+    the class a method runs for (so BasePage._ensure_ready reading
+    self._ready_locator depends on LoginPage._ready_locator only when run for
+    a LoginPage), annotated or constructed variables against their class and
+    fixtures against their return annotation. Classes named by import strings
+    ("module:Class") depend on all their members. Members nothing in the project
+    calls, pytest hooks, dunder methods and the overrides of classes extending
+    a class from outside the project (logging.Handler.emit), are dependencies
+    of whatever uses their class. Anything else is matched with the classes
+    visible in the module, which over-selects rather than misses."""
+
+    def __init__(self, modules: dict):
+        self.modules = modules
+        self._visible = {}
+        self._closures = {}
+
+    def resolve(self, module: str, name: str) -> Optional[str]:
+        """Definition id ("module:name") or module a name refers to in `module`."""
+        data = self.modules.get(module)
+        if data is None:
+            return None
+        if name in data["defs"]:
+            return f"{module}:{name}"
+        target = data["imports"].get(name)
+        if target is None:
+            return None
+        if ":" not in target:
+            return target if target in self.modules else None
+        source, symbol = target.split(":")
+        if f"{source}.{symbol}" in self.modules:
+            return f"{source}.{symbol}"
+        return self.resolve(source, symbol) if source != module else None
+
+    def definition(self, def_id: str) -> Optional[dict]:
+        module, _, name = def_id.partition(":")
+        return self.modules.get(module, {}).get("defs", {}).get(name)
+
+    def resolve_dotted(self, module: str, dotted: str) -> Optional[str]:
+        """Resolves a possibly dotted name such as `setting.BASE_URL`."""
+        first, *rest = dotted.split(".")
+        target = self.resolve(module, first)
+        for part in rest:
+            if target is None or ":" in target:
+                return None
+            target = self.resolve(target, part)
+        return target
+
+    def is_class(self, def_id: Optional[str]) -> bool:
+        return bool(def_id and ":" in def_id and (self.definition(def_id) or {}).get("class"))
+
+    def mro(self, class_id: str) -> list[str]:
+        """The class and its project base classes, depth first."""
+        order, pending = [], [class_id]
+        while pending:
+            current = pending.pop(0)
+            if current in order or not self.is_class(current):
+                continue
+            order.append(current)
+            module = current.partition(":")[0]
+            pending += [self.resolve_dotted(module, base) for base in self.definition(current)["bases"]]
+        return order
+
+    def member(self, class_id: str, attr: str) -> Optional[str]:
+        """Definition of `attr` as seen from `class_id`."""
+        for current in self.mro(class_id):
+            if self.definition(f"{current}.{attr}") is not None:
+                return f"{current}.{attr}"
+        return None
+
+    def members(self, class_id: str) -> list[str]:
+        """Every member definition of the class and its project base classes."""
+        return [f"{module}:{name}" for module, _, class_name in (current.partition(":") for current in self.mro(class_id))
+                for name in self.modules[module]["defs"] if name.startswith(f"{class_name}.")]
+
+    def dispatched(self, class_id: str) -> list[str]:
+        """Members of the class called through pytest's hooks, Python's protocols
+        or a base class from outside the project, never by name in the project."""
+        external = any(
+            base != "object" and not self.is_class(self.resolve_dotted(current.partition(":")[0], base))
+            for current in self.mro(class_id) for base in self.definition(current)["bases"])
+        return [member for member in self.members(class_id)
+                if DISPATCHED.match(member.rpartition(".")[2])
+                or (external and self.definition(member).get("method"))]
+
+    def conftest_imports(self) -> set:
+        """Modules imported by a conftest.py, which pytest loads for every test."""
+        imported = set()
+        for module, data in self.modules.items():
+            if module.split(".")[-1] != "conftest":
+                continue
+            for name, target in data["imports"].items():
+                resolved = self.resolve(module, name)
+                imported |= {target.partition(":")[0], resolved.partition(":")[0] if resolved else None}
+        return imported & self.modules.keys()
+
+    def visible_classes(self, module: str) -> list[str]:
+        """Classes defined in or imported into a module."""
+        if module not in self._visible:
+            data = self.modules[module]
+            names = [name for name in data["defs"] if "." not in name] + list(data["imports"])
+            self._visible[module] = sorted({
+                resolved for resolved in (self.resolve(module, name) for name in names) if self.is_class(resolved)})
+        return self._visible[module]
+
+    def fixture(self, module: str, name: str) -> Optional[str]:
+        """Fixture `name` as a test of `module` sees it: its own module first,
+        then the conftest.py files of its package and the packages above."""
+        candidates = [module] + sorted(
+            (other for other in self.modules
+             if other.split(".")[-1] == "conftest" and module.startswith(other[:-len("conftest")])),
+            key=len, reverse=True)
+        for candidate in candidates:
+            definition = self.definition(f"{candidate}:{name}")
+            if definition and definition.get("fixture"):
+                return f"{candidate}:{name}"
+        return None
+
+    def roots(self) -> list[str]:
+        """Definitions every test depends on: conftest hooks and autouse fixtures."""
+        return [f"{module}:{name}" for module, data in self.modules.items()
+                if module.split(".")[-1] == "conftest"
+                for name, definition in data["defs"].items()
+                if name.startswith("pytest_") or definition.get("autouse")]
+
+    def closure(self, def_id: str) -> set:
+        """Every definition `def_id` depends on, including itself."""
+        if def_id not in self._closures:
+            seen, found = set(), set()
+            self._visit(None, def_id, seen, found)
+            self._closures[def_id] = found
+        return self._closures[def_id]
+
+    def _visit(self, receiver: Optional[str], def_id: Optional[str], seen: set, found: set) -> None:
+        if def_id is None or (receiver, def_id) in seen or ":" not in def_id:
+            return
+        seen.add((receiver, def_id))
+        definition = self.definition(def_id)
+        if definition is None:
+            return
+        found.add(def_id)
+        module, _, name = def_id.partition(":")
+        owner = f"{module}:{name.rpartition('.')[0]}" if "." in name else None
+        receiver = receiver or owner
+
+        def visit_class(class_id: str, attr: str = None) -> None:
+            self._visit(None, class_id, seen, found)
+            self._visit(class_id, self.member(class_id, attr or "__init__"), seen, found)
+
+        def visit_symbol(target: Optional[str]) -> None:
+            if self.is_class(target):
+                visit_class(target)
+            elif target and ":" in target:
+                self._visit(None, target, seen, found)
+
+        def visit_any(attr: str, where: str = module) -> None:
+            for class_id in self.visible_classes(where):
+                self._visit(class_id, self.member(class_id, attr), seen, found)
+
+        if definition.get("class"):
+            for base in definition["bases"]:
+                self._visit(None, self.resolve_dotted(module, base), seen, found)
+            for member in self.dispatched(def_id):
+                self._visit(def_id, member, seen, found)
+        for kind, *args in definition["refs"]:
+            if kind == "name":
+                visit_symbol(self.resolve(module, args[0]))
+            elif kind == "self" and receiver:
+                self._visit(receiver, self.member(receiver, args[0]), seen, found)
+            elif kind == "member":
+                # variables typed with classes from outside the project are ignored
+                class_id = self.resolve_dotted(module, args[0])
+                if self.is_class(class_id):
+                    visit_class(class_id, args[1])
+            elif kind == "attr":
+                target = self.resolve(module, args[0])
+                if self.is_class(target):
+                    visit_class(target, args[1])
+                elif target and ":" not in target:
+                    visit_symbol(self.resolve(target, args[1]))
+                elif target:
+                    visit_any(args[1])
+            elif kind == "chain":
+                if self.resolve_dotted(module, args[0]):
+                    visit_any(args[1])
+            elif kind == "var":
+                fixture = self.fixture(module, args[0])
+                returns = self.definition(fixture).get("returns") if fixture else None
+                if returns:
+                    class_id = self.resolve_dotted(fixture.partition(":")[0], returns)
+                    if self.is_class(class_id):
+                        visit_class(class_id, args[1])
+                else:
+                    visit_any(args[1], fixture.partition(":")[0] if fixture else module)
+            elif kind == "any":
+                visit_any(args[0])
+            elif kind == "fixture":
+                self._visit(None, self.fixture(module, args[0]), seen, found)
+            elif kind == "import":
+                # loaded by name at run time, so any of a class's members may be used
+                source, _, symbol = args[0].partition(":")
+                target = self.resolve_dotted(source, symbol) if source in self.modules else None
+                if self.is_class(target):
+                    visit_class(target)
+                    for member in self.members(target):
+                        self._visit(target, member, seen, found)
+                else:
+                    visit_symbol(target)
+
+    def changed(self, module: str, lines: set) -> set:
+        """Definitions of `module` touched by changes on `lines`. A change
+        outside of any definition (imports, module code) touches them all."""
+        defs = self.modules.get(module, {}).get("defs", {})
+        touched = set()
+        for line in lines:
+            containing = [(span[1] - span[0], name) for name, span in
+                          ((name, definition["span"]) for name, definition in defs.items())
+                          if span[0] <= line <= span[1]]
+            if not containing:
+                return {f"{module}:{name}" for name in defs}
+            touched.add(f"{module}:{min(containing)[1]}")
+        return touched
+
+
+def load_index(root: Path, paths: list[str], cache: Optional[pytest.Cache]) -> DependencyIndex:
+    """Builds the index, re-parsing only the files whose size or modification
+    time changed since the cached index was written."""
+    cached = cache.get(f"impact/index-v{INDEX_VERSION}", {}) if cache else {}
+    files, updated = {}, False
+    for path in paths:
+        try:
+            stat = (root / path).stat()
+        except OSError:
+            continue
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        entry = cached.get(path)
+        if entry is None or entry["stamp"] != stamp:
+            module = module_name(path)
+            try:
+                data = parse_module((root / path).read_text(encoding="utf-8"), module.rpartition(".")[0])
+            except (SyntaxError, UnicodeDecodeError, ValueError):
+                data = None
+            entry = {"stamp": stamp, "module": module, "data": data}
+            updated = True
+        files[path] = entry
+    if cache and (updated or files.keys() != cached.keys()):
+        cache.set(f"impact/index-v{INDEX_VERSION}", files)
+    return DependencyIndex({entry["module"]: entry["data"] for entry in files.values() if entry["data"]})
+
+
+def _git(root: Path, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, check=True).stdout
+
+
+def git_changes(root: Path, base: str) -> dict:
+    """Changed lines per python file between `base` and the working tree,
+    including untracked files. None as the lines of a file means all of it
+    (new, deleted or renamed files and files that are not python)."""
+    changes = {}
+    for line in _git(root, "diff", "--name-status", "--no-renames", base).splitlines():
+        status, path = line.split("\t", 1)
+        changes[path] = None if status != "M" or not path.endswith(".py") else set()
+    for path in _git(root, "ls-files", "--others", "--exclude-standard").splitlines():
+        changes[path] = None
+    path = None
+    for line in _git(root, "diff", "-U0", "--no-color", "--no-ext-diff", "--no-renames", base,
+                     "--", "*.py").splitlines():
+        if line.startswith("+++ "):
+            path = line[6:] if line.startswith("+++ b/") else None
+        elif path and changes.get(path) is not None:
+            hunk = HUNK.match(line)
+            if hunk:
+                start, count = int(hunk.group(1)), int(hunk.group(2) or 1)
+                # a pure deletion sits between line `start` and the next one
+                changes[path].update(range(start, start + count) if count else (start, start + 1))
+    return changes
+
+
+class ImpactSelector:
+    """pytest plugin for --impact-base=<ref>: deselects the tests a git diff
+    against `ref` cannot affect. Tests are matched through the dependency
+    index: their fixtures, the page objects and locators they use, the driver
+    modules behind them. conftest.py, the modules it imports, BasePage and the
+    project files in FULL_SUITE_FILES run the whole suite, so does any error
+    reading the diff. Every xdist worker makes the same selection."""
+
+    def __init__(self, config: pytest.Config, base: str):
+        self.config = config
+        self.base = base
+        self.root = Path(str(config.rootpath))
+
+    def _full_suite_reason(self, changes: dict) -> Optional[str]:
+        for path, lines in changes.items():
+            if path in FULL_SUITE_FILES or Path(path).name == "conftest.py":
+                return f"{path} changed"
+            if lines is None and path.endswith(".py") and not (self.root / path).exists():
+                return f"{path} was removed"
+        return None
+
+    def selected(self, items: list) -> list:
+        """The items affected by the changes."""
+        try:
+            changes = git_changes(self.root, self.base)
+            paths = _git(self.root, "ls-files", "--cached", "--others", "--exclude-standard", "--", "*.py")
+        except (OSError, subprocess.CalledProcessError) as exception:
+            LOGGER.warning("Could not diff against %s, running every test: %s", self.base, exception)
+            return items
+        reason = self._full_suite_reason(changes)
+        if reason:
+            LOGGER.info(">> %s, running every test", reason)
+            return items
+
+        index = load_index(self.root, paths.splitlines(), getattr(self.config, "cache", None))
+        # plugins and helpers of conftest.py run for every test, often only through hooks
+        imported = index.conftest_imports()
+        for path in changes:
+            if path.endswith(".py") and module_name(path) in imported:
+                LOGGER.info(">> %s changed and is imported by conftest.py, running every test", path)
+                return items
+        changed = set()
+        for path, lines in changes.items():
+            if not path.endswith(".py"):
+                continue
+            module = module_name(path)
+            if lines is None:
+                changed |= {f"{module}:{name}" for name in index.modules.get(module, {}).get("defs", {})}
+                changed.add(module)
+            else:
+                changed |= index.changed(module, lines)
+        if any(index.closure(root) & changed for root in index.roots()):
+            LOGGER.info(">> A change reaches the conftest hooks, running every test")
+            return items
+
+        selected = []
+        for item in items:
+            path = Path(str(item.path)).relative_to(self.root).as_posix()
+            module = module_name(path)
+            name = ".".join(part for part in (item.cls.__name__ if item.cls else None,
+                                              getattr(item, "originalname", item.name)) if part)
+            test_id = f"{module}:{name}"
+            if index.definition(test_id) is None or module in changed or index.closure(test_id) & changed:
+                selected.append(item)
+        return selected
+
+    def pytest_collection_modifyitems(self, config: pytest.Config, items: list) -> None:
+        """Deselects the tests the changes cannot affect."""
+        selected = self.selected(items)
+        kept = {id(item) for item in selected}
+        deselected = [item for item in items if id(item) not in kept]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+        LOGGER.info(">> Change impact against %s: %s of %s tests selected",
+                    self.base, len(selected), len(selected) + len(deselected))
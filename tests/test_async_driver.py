@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+from config import RunConfig
+from drivers.async_driver import AsyncSessionRunner, AsyncTransport, AsyncWebDriver
+from drivers.transport import reset_stats
+from benchmarks.fake_webdriver import FakeWebDriver
+from benchmarks.site import LocalSite
+from pages.login_page import AsyncLoginPage
+
+
+@pytest.fixture(scope="module")
+def site():
+    local_site = LocalSite().start()
+    yield local_site
+    local_site.stop()
+
+
+@pytest.fixture
+def fake_driver():
+    fake = FakeWebDriver(latency=0.02).start()
+    yield fake
+    fake.stop()
+    reset_stats()
+
+
+def _runner(fake: FakeWebDriver, site: LocalSite, concurrency: int) -> AsyncSessionRunner:
+    config = RunConfig(host="docker", browser="chrome", hub_url=fake.url, base_url=site.url)
+    return AsyncSessionRunner(config, concurrency=concurrency)
+
+
+def test_login_page_flow(fake_driver, site):
+    """The async login page fills and submits the form and reads the result."""
+    async def flow(driver: AsyncWebDriver):
+        login = await AsyncLoginPage.open(driver, RunConfig(base_url=site.url))
+        await login.with_("tomsmith", "BadPassword!")
+        return await login.failure_message_present()
+
+    results = _runner(fake_driver, site, concurrency=1).run({"login": flow})
+    assert results == {"login": True}
+    assert fake_driver.commands["newSession"] == 1
+    assert fake_driver.commands["POST url"] == 1
+    assert fake_driver.commands["POST element/{id}/value"] == 2
+    assert fake_driver.commands["POST element/{id}/click"] == 1
+    assert fake_driver.commands["DELETE session"] == 1
+
+
+def test_concurrency_is_bounded_and_connections_reused(fake_driver, site):
+    """No more sessions than the concurrency limit exist at a time, and the
+    sessions share the transport's keep-alive connections."""
+    async def flow(driver: AsyncWebDriver):
+        await driver.get(f"{site.url}/login")
+        for _ in range(3):
+            await driver.find_element("css selector", '[id="login"]')
+        return driver.session_id
+
+    results = _runner(fake_driver, site, concurrency=3).run({f"flow{index}": flow for index in range(9)})
+    assert len(set(results.values())) == 9
+    assert fake_driver.peak_sessions == 3
+    assert fake_driver.connections <= 3
+
+
+def test_flow_errors_are_returned_as_selenium_exceptions(fake_driver, site):
+    """A W3C error response is raised as the matching selenium exception and
+    does not stop the other flows."""
+    async def missing(driver: AsyncWebDriver):
+        await driver.find_element("css selector", "#missing")
+
+    async def present(driver: AsyncWebDriver):
+        await driver.get(f"{site.url}/login")
+        return await (await driver.find_element("id", "login")).is_displayed()
+
+    results = _runner(fake_driver, site, concurrency=2).run({"missing": missing, "present": present})
+    assert isinstance(results["missing"], NoSuchElementException)
+    assert results["present"] is True
+    assert fake_driver.sessions == {}
+
+
+def test_hidden_element_times_out(fake_driver, site):
+    """Waiting for a hidden element gives up after the timeout without blocking."""
+    async def flow(driver: AsyncWebDriver):
+        login = await AsyncLoginPage.open(driver, RunConfig(base_url=site.url, wait_strategy="observer"))
+        return await login._is_displayed(login._success_message, timeout=0.2)
+
+    assert _runner(fake_driver, site, concurrency=1).run({"hidden": flow}) == {"hidden": False}
+
+
+def test_transport_retries_connection_closed_by_hub(fake_driver):
+    """An idle keep-alive connection the hub dropped is replaced transparently."""
+    async def requests():
+        transport = AsyncTransport(fake_driver.url, pool_size=1)
+        first = await transport.request("GET", "/status")
+        _, writer = transport._idle[0]
+        writer.transport.abort()
+        second = await transport.request("GET", "/status")
+        await transport.close()
+        return first[0], second[0], transport.connections
+
+    assert asyncio.run(requests()) == (200, 200, 2)
@@ -0,0 +1,29 @@
+from functools import partial
+from config import RunConfig
+from drivers.async_driver import AsyncSessionRunner, AsyncWebDriver
+from pages.login_page import AsyncLoginPage
+
+CREDENTIALS = [
+    ("tomsmith", "SuperSecretPassword!"),
+    ("timsmith", "SuperSecretPassword!"),
+    ("tomsmith", "BadPassword!"),
+    ("timsmith", "BadPassword!"),
+]
+
+
+async def login_flow(config: RunConfig, username: str, password: str, driver: AsyncWebDriver) -> bool:
+    """Logs in and returns whether the expected message is shown."""
+    login = await AsyncLoginPage.open(driver, config)
+    await login.with_(username, password)
+    if (username, password) == CREDENTIALS[0]:
+        return await login.success_message_present()
+    return await login.failure_message_present()
+
+
+def test_login_flows_concurrently(async_sessions: AsyncSessionRunner, run_config: RunConfig):
+    """Runs every login flow in its own session, concurrently from one event loop."""
+    results = async_sessions.run({
+        f"login_{username}_{password}": partial(login_flow, run_config, username, password)
+        for username, password in CREDENTIALS
+    })
+    assert all(result is True for result in results.values()), results
@@ -0,0 +1,81 @@
+import time
+from drivers.auth_cache import AuthStateCache, inject, snapshot
+from pages import scripts
+
+STATE = {"cookies": [{"name": "rack.session", "value": "abc"}], "local_storage": {}, "session_storage": {}}
+
+
+class FakeDriver:
+    """Keeps cookies and storage like a browser on a single origin."""
+
+    def __init__(self):
+        self.cookies = []
+        self.storage = [{"token": "1"}, {}]
+        self.visited = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def get_cookies(self):
+        return list(self.cookies)
+
+    def delete_all_cookies(self):
+        self.cookies = []
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+    def execute_script(self, script, *args):
+        if script == scripts.SNAPSHOT_STORAGE:
+            return self.storage
+        self.storage = list(args)
+        return None
+
+
+def test_snapshot_is_shared_between_caches(tmp_path):
+    """Another xdist worker reads the login stored by the first one."""
+    path = tmp_path / "state.json"
+    key = AuthStateCache.key("https://site", "tomsmith", "secret")
+    AuthStateCache(path=path).put(key, STATE)
+    assert AuthStateCache(path=path).get(key) == STATE
+    assert "secret" not in path.read_text()
+
+
+def test_expired_snapshots_are_dropped(tmp_path):
+    """A login older than the TTL is not reused."""
+    cache = AuthStateCache(path=tmp_path / "state.json", ttl=0.05)
+    cache.put("key", STATE)
+    time.sleep(0.1)
+    assert cache.get("key") is None
+
+
+def test_least_recently_used_snapshot_is_evicted(tmp_path):
+    """Only max_entries logins are kept, reads count as use."""
+    cache = AuthStateCache(path=tmp_path / "state.json", max_entries=2)
+    cache.put("first", STATE)
+    cache.put("second", STATE)
+    cache.get("first")
+    cache.put("third", STATE)
+    assert cache.get("second") is None
+    assert cache.get("first") == cache.get("third") == STATE
+
+
+def test_invalidated_snapshot_is_gone(tmp_path):
+    cache = AuthStateCache(path=tmp_path / "state.json")
+    cache.put("key", STATE)
+    cache.invalidate("key")
+    assert cache.get("key") is None
+
+
+def test_inject_restores_snapshot():
+    """Cookies and storage of one session are restored into another."""
+    source = FakeDriver()
+    source.cookies = [{"name": "rack.session", "value": "abc", "domain": ".site", "path": "/"}]
+    state = snapshot(source)
+
+    target = FakeDriver()
+    target.cookies = [{"name": "stale", "value": "x"}]
+    inject(target, "https://site", state)
+    assert target.visited == ["https://site/"]
+    assert target.cookies == [{"name": "rack.session", "value": "abc", "path": "/"}]
+    assert target.storage == [{"token": "1"}, {}]
@@ -0,0 +1,192 @@
+import json
+import shutil
+import subprocess
+import pytest
+from selenium.common.exceptions import UnknownMethodException
+from selenium.webdriver.common.by import By
+from config import RunConfig
+from pages import scripts
+from pages.base_page import BasePage
+
+
+class FakeDriver:
+    """Answers the batched page scripts and records every round trip."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append((script, args))
+        return self.results
+
+
+def test_locate_many_is_single_round_trip():
+    """All locators are resolved by one script call."""
+    driver = FakeDriver([["username", True], ["password", False]])
+    page = BasePage(driver)
+    found = page._locate_many({
+        "username": {"by": By.ID, "value": "username"},
+        "password": {"by": By.ID, "value": "password"},
+    })
+    assert found == {"username": ("username", True), "password": ("password", False)}
+    assert driver.calls == [(scripts.LOCATE_MANY, ([["id", "username"], ["id", "password"]],))]
+
+
+def test_locate_many_reports_missing_elements_on_timeout():
+    """Missing elements come back as None once the wait times out."""
+    driver = FakeDriver([["username", True], [None, False]])
+    page = BasePage(driver)
+    found = page._locate_many({
+        "username": {"by": By.ID, "value": "username"},
+        "password": {"by": By.ID, "value": "password"},
+    }, timeout=0)
+    assert found["password"] == (None, False)
+
+
+def test_fill_form_is_single_round_trip():
+    """Typing into every field and submitting takes one script call."""
+    driver = FakeDriver(True)
+    page = BasePage(driver)
+    page._fill_form([({"by": By.ID, "value": "username"}, "tomsmith")],
+                    submit={"by": By.CSS_SELECTOR, "value": "button"})
+    assert driver.calls == [
+        (scripts.FILL_FORM, ([["id", "username", "tomsmith"]], ["css selector", "button"]))]
+
+
+class AsyncFakeDriver:
+    """Answers the observer wait script, optionally without async script support."""
+
+    def __init__(self, element=None, supports_async=True):
+        self.element = element
+        self.supports_async = supports_async
+        self.async_calls = 0
+        self.find_calls = 0
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def execute_async_script(self, script, *args):
+        self.async_calls += 1
+        if not self.supports_async:
+            raise UnknownMethodException("unknown command")
+        return self.element
+
+    def find_elements(self, by, value):
+        self.find_calls += 1
+        return [self.element] if self.element else []
+
+
+def test_observer_wait_returns_element():
+    """The observer strategy resolves in a single async script call."""
+    driver = AsyncFakeDriver(element="finish")
+    page = BasePage(driver, RunConfig(wait_strategy="observer"))
+    assert page._find({"by": By.ID, "value": "finish"}) == "finish"
+    assert driver.async_calls == 1
+    assert driver.find_calls == 0
+
+
+def test_observer_wait_timeout_keeps_semantics():
+    """A timed out observer wait returns False like WebDriverWait does."""
+    page = BasePage(AsyncFakeDriver(element=None), RunConfig(wait_strategy="observer"))
+    assert page._is_displayed({"by": By.ID, "value": "finish"}, timeout=0) is False
+
+
+def test_observer_wait_falls_back_to_polling():
+    """Drivers without async scripts are polled, and only probed once."""
+    driver = AsyncFakeDriver(element="finish", supports_async=False)
+    page = BasePage(driver, RunConfig(wait_strategy="observer"))
+    assert page._find({"by": By.ID, "value": "finish"}) == "finish"
+    assert page._find({"by": By.ID, "value": "finish"}) == "finish"
+    assert driver.async_calls == 1
+    assert driver.find_calls == 2
+
+
+def test_poll_wait_gives_up_at_timeout():
+    """Polling returns None from _find once the timeout expires."""
+    driver = AsyncFakeDriver(element=None)
+    page = BasePage(driver, RunConfig(wait_strategy="poll"))
+    assert page._find({"by": By.ID, "value": "finish"}, timeout=0.2) is None
+    assert 1 < driver.find_calls < 10
+
+
+# a browser stand-in for node: the element is revealed by a style change that
+# no MutationObserver callback reports, like a CSS transition ending
+HIDDEN_UNTIL_STYLED = """
+const element = {isConnected: true, getBoundingClientRect: () => ({width: 100, height: 20})};
+let style = {display: "none", visibility: "visible", opacity: "1"};
+globalThis.window = {getComputedStyle: () => style};
+globalThis.document = {getElementById: (id) => (id === "finish" ? element : null)};
+globalThis.MutationObserver = class { observe() {} disconnect() {} };
+setTimeout(() => { style = {display: "block", visibility: "visible", opacity: "1"}; }, 150);
+const started = Date.now();
+const done = (result) => console.log(JSON.stringify({found: result === element, ms: Date.now() - started}));
+(function () { %s }).apply(null, ["id", "finish", true, 5000, done]);
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run the wait script")
+def test_observer_wait_sees_reveals_without_mutations():
+    """Visibility changed through styles alone is picked up well before the timeout."""
+    output = subprocess.run(["node", "-e", HIDDEN_UNTIL_STYLED % scripts.WAIT_FOR], capture_output=True,
+                            text=True, check=True, timeout=10).stdout
+    result = json.loads(output)
+    assert result["found"]
+    assert result["ms"] < 1000
+
+
+class FakeElement:
+
+    def is_displayed(self):
+        return True
+
+
+class NavigatingFakeDriver(AsyncFakeDriver):
+    """Tracks the current url and counts page loads."""
+
+    def __init__(self, current_url="about:blank", element=FakeElement()):
+        super().__init__(element=element)
+        self.current_url = current_url
+        self.loads = []
+
+    def get(self, url):
+        self.loads.append(url)
+        self.current_url = url
+
+
+class ReadyPage(BasePage):
+    _path = "form"
+    _ready_locator = {"by": By.ID, "value": "ready"}
+    _ready_timeout = 0.1
+
+
+def test_page_is_not_loaded_on_construction():
+    """Building a page object does not touch the browser."""
+    driver = NavigatingFakeDriver()
+    ReadyPage(driver, RunConfig(base_url="https://site", wait_strategy="poll"))
+    assert driver.loads == []
+
+
+def test_first_interaction_loads_page_once():
+    """The page is loaded and verified on the first interaction only."""
+    driver = NavigatingFakeDriver()
+    page = ReadyPage(driver, RunConfig(base_url="https://site", wait_strategy="poll"))
+    page._find({"by": By.ID, "value": "ready"})
+    page._is_displayed({"by": By.ID, "value": "ready"})
+    assert driver.loads == ["https://site/form"]
+
+
+def test_page_already_shown_is_not_reloaded():
+    """A browser already on the page in the ready state is not navigated."""
+    driver = NavigatingFakeDriver(current_url="https://site/form/")
+    page = ReadyPage(driver, RunConfig(base_url="https://site", wait_strategy="poll"))
+    assert page._is_displayed({"by": By.ID, "value": "ready"})
+    assert driver.loads == []
+
+
+def test_page_that_never_gets_ready_fails():
+    """A missing ready locator after the page load is an error."""
+    driver = NavigatingFakeDriver(element=None)
+    page = ReadyPage(driver, RunConfig(base_url="https://site", wait_strategy="poll"))
+    with pytest.raises(AssertionError, match="ReadyPage is not ready"):
+        page._is_displayed({"by": By.ID, "value": "other"}, timeout=0)
@@ -0,0 +1,58 @@
+import pytest
+from benchmarks.fake_webdriver import FakeWebDriver
+from benchmarks.site import PASSWORD, USERNAME, LocalSite
+from config import RunConfig
+from drivers.remote_driver import DockerRunner
+from pages.dynamic_loading_pages import DynamicLoadingPage
+from pages.login_page import LoginPage
+
+
+@pytest.fixture(scope="module")
+def offline_config():
+    site = LocalSite().start()
+    fake = FakeWebDriver().start()
+    yield RunConfig(host="docker", browser="chrome", hub_url=fake.url, base_url=site.url, wait_strategy="poll")
+    fake.stop()
+    site.stop()
+
+
+@pytest.fixture
+def offline_driver(offline_config: RunConfig):
+    driver = DockerRunner(offline_config, "offline").start_driver()
+    yield driver
+    driver.quit()
+
+
+def test_login_flow_runs_against_the_fakes(offline_driver, offline_config: RunConfig):
+    """Page objects log in and out through a DockerRunner session without a browser."""
+    login = LoginPage(offline_driver, offline_config)
+    login.with_(USERNAME, "wrong")
+    assert login.failure_message_present()
+
+    login = LoginPage(offline_driver, offline_config)
+    login.with_(USERNAME, PASSWORD)
+    assert login.success_message_present()
+    assert offline_driver.current_url == f"{offline_config.base_url}/secure"
+
+
+def test_scripted_login_for_setup(offline_driver, offline_config: RunConfig):
+    """The batched login of setup code lands on the secure page too."""
+    login = LoginPage(offline_driver, offline_config)
+    login.with_script(USERNAME, PASSWORD)
+    assert login.success_message_present()
+    assert offline_driver.current_url == f"{offline_config.base_url}/secure"
+
+
+@pytest.mark.parametrize("wait_strategy", ["webdriverwait", "poll", "observer"])
+def test_dynamic_loading_reveals_the_text_after_a_delay(offline_config: RunConfig, wait_strategy: str):
+    """Clicking start shows the hidden text only after the reveal delay."""
+    config = RunConfig(host="docker", browser="chrome", hub_url=offline_config.hub_url,
+                       base_url=offline_config.base_url, wait_strategy=wait_strategy)
+    driver = DockerRunner(config, "offline").start_driver()
+    try:
+        page = DynamicLoadingPage(driver, config)
+        page.click_start_button()
+        assert not page._is_displayed(page._hello_world_text, timeout=0)
+        assert page.is_hello_world_text_present()
+    finally:
+        driver.quit()
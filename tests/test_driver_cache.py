@@ -0,0 +1,63 @@
+import json
+from drivers.driver_cache import DriverResolver
+
+
+class FakeInstaller:
+    """Counts how often webdriver-manager would have been called."""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.path.write_text("driver")
+        return str(self.path)
+
+
+def test_install_runs_once_across_resolvers(tmp_path):
+    """A second resolver (e.g. another xdist worker) reuses the index entry."""
+    install = FakeInstaller(tmp_path / "chromedriver")
+    index = tmp_path / "index.json"
+    first = DriverResolver(index_path=index).resolve("chrome", install, "118")
+    second = DriverResolver(index_path=index).resolve("chrome", install, "118")
+    assert first == second == str(install.path)
+    assert install.calls == 1
+
+
+def test_index_is_keyed_by_browser_version(tmp_path):
+    """A browser upgrade resolves a new driver."""
+    install = FakeInstaller(tmp_path / "chromedriver")
+    resolver = DriverResolver(index_path=tmp_path / "index.json")
+    resolver.resolve("chrome", install, "118")
+    resolver.resolve("chrome", install, "119")
+    assert install.calls == 2
+    assert len(json.loads((tmp_path / "index.json").read_text())) == 2
+
+
+def test_expired_entry_is_resolved_again(tmp_path):
+    """Entries older than the TTL trigger a new install."""
+    install = FakeInstaller(tmp_path / "chromedriver")
+    index = tmp_path / "index.json"
+    DriverResolver(index_path=index, ttl=0).resolve("chrome", install, "118")
+    DriverResolver(index_path=index, ttl=0).resolve("chrome", install, "118")
+    assert install.calls == 2
+
+
+def test_offline_mode_ignores_ttl(tmp_path):
+    """Offline mode never re-installs once the index is populated."""
+    install = FakeInstaller(tmp_path / "chromedriver")
+    index = tmp_path / "index.json"
+    DriverResolver(index_path=index).resolve("chrome", install, "118")
+    DriverResolver(index_path=index, ttl=0, offline=True).resolve("chrome", install, "118")
+    assert install.calls == 1
+
+
+def test_missing_binary_is_installed_again(tmp_path):
+    """An index entry pointing at a deleted binary is not trusted."""
+    install = FakeInstaller(tmp_path / "chromedriver")
+    index = tmp_path / "index.json"
+    DriverResolver(index_path=index).resolve("chrome", install, "118")
+    install.path.unlink()
+    DriverResolver(index_path=index).resolve("chrome", install, "118")
+    assert install.calls == 2
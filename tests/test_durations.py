@@ -0,0 +1,96 @@
+import pytest
+from scheduling.durations import DurationStore, lpt_order
+
+pytest_plugins = ["pytester"]
+
+
+class FakeCache:
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+def test_longest_tests_run_first():
+    """Known durations are ordered descending, unknown tests get the mean."""
+    history = {"slow": [9.0, 0], "fast": [1.0, 0], "medium": [4.0, 0]}
+    order = lpt_order(["fast", "new", "slow", "medium"], history.get)
+    assert order == ["slow", "new", "medium", "fast"]
+
+
+def test_failed_tests_first():
+    """With failed_first, last run's failures lead, each group longest-first."""
+    history = {"slow": [9.0, 0], "fast": [1.0, 1], "medium": [4.0, 1]}
+    order = lpt_order(["fast", "slow", "medium"], history.get, failed_first=True)
+    assert order == ["medium", "fast", "slow"]
+
+
+def test_order_is_stable_without_history():
+    """Every xdist worker must end up with the same order."""
+    assert lpt_order(["b", "a", "c"], {}.get) == ["b", "a", "c"]
+
+
+def test_store_smooths_durations_per_key():
+    """Durations are a moving average kept per host/browser."""
+    store = DurationStore(FakeCache())
+    store.update("docker-chrome", {"t": (10.0, False)})
+    store.update("docker-chrome", {"t": (2.0, True)})
+    store.update("docker-firefox", {"t": (1.0, False)})
+    assert store.load("docker-chrome") == {"t": [6.0, 1]}
+    assert store.load("docker-firefox") == {"t": [1.0, 0]}
+
+
+def test_plugin_reorders_the_next_run(pytester: pytest.Pytester):
+    """Durations recorded in one run put the slow test first in the next."""
+    pytester.makeconftest("""
+        from scheduling.durations import DurationScheduler
+
+        def pytest_configure(config):
+            config.pluginmanager.register(
+                DurationScheduler(config, key=lambda item: "localhost-chrome"), "duration_scheduler")
+    """)
+    pytester.makepyfile("""
+        import time
+
+        def test_fast():
+            pass
+
+        def test_slow():
+            time.sleep(0.2)
+    """)
+    pytester.runpytest("-p", "no:randomly").assert_outcomes(passed=2)
+    result = pytester.runpytest("-p", "no:randomly", "-v")
+    result.assert_outcomes(passed=2)
+    lines = [line for line in result.outlines if "PASSED" in line]
+    assert "test_slow" in lines[0]
+
+
+def test_collection_order_still_records_durations(pytester: pytest.Pytester):
+    """Without --schedule=lpt the order is left alone, but history builds up for it."""
+    pytester.makeconftest("""
+        from scheduling.durations import DurationScheduler
+
+        def pytest_configure(config):
+            config.pluginmanager.register(DurationScheduler(
+                config, key=lambda item: "localhost-chrome", reorder=False), "duration_scheduler")
+    """)
+    pytester.makepyfile("""
+        import time
+
+        def test_fast():
+            pass
+
+        def test_slow():
+            time.sleep(0.2)
+    """)
+    pytester.runpytest("-p", "no:randomly").assert_outcomes(passed=2)
+    result = pytester.runpytest("-p", "no:randomly", "-v")
+    lines = [line for line in result.outlines if "PASSED" in line]
+    assert "test_fast" in lines[0]
+    history = pytester.runpytest("-p", "no:randomly", "--cache-show", "durations/*")
+    assert "test_slow" in history.stdout.str()
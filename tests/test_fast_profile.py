@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+from selenium import webdriver
+from config import RunConfig
+from drivers import fast_profile
+from reporting.page_loads import PageLoadReport
+
+
+class FakeCache:
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class FakeRemoteDriver:
+    """Remote session without execute_cdp_cmd, records executed commands."""
+
+    def __init__(self):
+        self.command_executor = SimpleNamespace(_commands={})
+        self.executed = []
+
+    def execute(self, command, params):
+        self.executed.append((command, params["cmd"]))
+
+
+def test_chrome_profile_loads_eagerly_without_images():
+    options = fast_profile.chrome_options(webdriver.ChromeOptions())
+    assert options.page_load_strategy == "eager"
+    assert "--blink-settings=imagesEnabled=false" in options.arguments
+    assert "--disable-background-networking" in options.arguments
+
+
+def test_firefox_profile_sets_preferences():
+    options = fast_profile.firefox_options(webdriver.FirefoxOptions())
+    assert options.page_load_strategy == "eager"
+    assert options.preferences["permissions.default.image"] == 2
+
+
+def test_remote_chrome_blocks_urls_through_grid_cdp_endpoint():
+    """Remote sessions get the vendor CDP route of the grid registered."""
+    driver = FakeRemoteDriver()
+    fast_profile.block_resources(driver, RunConfig(browser="edge", fast_mode=True))
+    assert driver.command_executor._commands["executeCdpCommand"] == (
+        "POST", "/session/$sessionId/ms/cdp/execute")
+    assert ("executeCdpCommand", "Network.setBlockedURLs") in driver.executed
+
+
+def test_firefox_is_not_sent_cdp_commands():
+    driver = FakeRemoteDriver()
+    fast_profile.block_resources(driver, RunConfig(browser="firefox", fast_mode=True))
+    assert driver.executed == []
+
+
+def _run(cache, fast_mode, loads, tmp_path, key="localhost-chrome"):
+    config = SimpleNamespace(cache=cache)
+    report = PageLoadReport(config, tmp_path, fast_mode=fast_mode)
+    for nodeid, seconds in loads.items():
+        report.pytest_runtest_logreport(SimpleNamespace(
+            nodeid=nodeid, page_load=seconds, page_load_key=key))
+    report.pytest_sessionfinish()
+    return report
+
+
+def test_fast_mode_savings_are_reported_against_full_baseline(tmp_path):
+    """A fast run is compared per test with the last full page load run."""
+    cache = FakeCache()
+    _run(cache, False, {"test_login": 2.0, "test_loading": 4.0}, tmp_path)
+    report = _run(cache, True, {"test_login": 0.5, "test_loading": 3.0, "test_new": 1.0}, tmp_path)
+    saved = {row["nodeid"]: row["saved_s"] for row in report.savings}
+    assert saved == {"test_login": 1.5, "test_loading": 1.0, "test_new": None}
+    assert report.summary() == "Fast mode saved 2.50s of 6.00s page load time (42%) over 2 tests"
+    assert (tmp_path / "page_load_savings.json").exists()
+
+
+def test_fast_mode_without_baseline(tmp_path):
+    report = _run(FakeCache(), True, {"test_login": 0.5}, tmp_path)
+    assert "no baseline" in report.summary()
+
+
+def test_firefox_savings_are_marked_without_url_blocking(tmp_path):
+    """Firefox has no CDP, the report says its savings exclude blocked urls."""
+    cache = FakeCache()
+    _run(cache, False, {"test_login": 2.0}, tmp_path, key="docker-firefox")
+    report = _run(cache, True, {"test_login": 1.5}, tmp_path, key="docker-firefox")
+    assert report.savings[0]["url_blocking"] is False
+    assert report.summary().endswith("; docker-firefox without url blocking (chrome and edge only)")
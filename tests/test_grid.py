@@ -0,0 +1,45 @@
+import threading
+import pytest
+from drivers.grid import CapacityGate, GridStatus, worker_count
+from benchmarks.fake_webdriver import FakeWebDriver
+
+
+@pytest.fixture
+def hub():
+    fake_hub = FakeWebDriver(slots=[("chrome", False), ("chrome", True), ("firefox", False),
+                                    ("MicrosoftEdge", False)]).start()
+    yield fake_hub
+    fake_hub.stop()
+
+
+def test_status_counts_slots_per_browser(hub):
+    """Free and total slots are read from the hub's /status."""
+    status = GridStatus.fetch(hub.url)
+    assert (status.total("chrome"), status.free("chrome")) == (2, 1)
+    assert status.free("edge") == 1
+
+
+def test_worker_count_matches_grid_slots(hub):
+    """-n auto starts one worker per slot of the browser."""
+    assert worker_count(hub.url, "chrome") == 2
+    assert worker_count(hub.url, "safari") == 1
+
+
+def test_gate_reserves_the_only_free_slot(hub, tmp_path):
+    """A second session waits while the only free slot is reserved."""
+    gate = CapacityGate(hub.url, "chrome", timeout=0.3, poll_interval=0.05, state_dir=tmp_path)
+    with gate.slot():
+        with pytest.raises(TimeoutError):
+            with gate.slot():
+                pass
+    with gate.slot():
+        pass
+
+
+def test_gate_waits_for_slot_to_free_up(hub, tmp_path):
+    """Sessions are requested as soon as the grid reports capacity again."""
+    hub.slots = [("chrome", True)]
+    gate = CapacityGate(hub.url, "chrome", timeout=5, poll_interval=0.05, state_dir=tmp_path)
+    threading.Timer(0.2, lambda: setattr(hub, "slots", [("chrome", False)])).start()
+    with gate.slot():
+        pass
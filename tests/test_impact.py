@@ -0,0 +1,205 @@
+import subprocess
+from pathlib import Path
+import pytest
+from scheduling.impact import DependencyIndex, git_changes, load_index, parse_module
+
+pytest_plugins = ["pytester"]
+
+SOURCES = {
+    "views.base": '''
+class Base:
+    _ready_locator = None
+
+    def _ensure_ready(self):
+        return self._ready_locator
+
+    def _click(self, locator):
+        self._ensure_ready()
+''',
+    "views.login": '''
+from views.base import Base
+
+
+class Login(Base):
+    _form = {"by": "id", "value": "login"}
+    _submit = {"by": "css selector", "value": "button"}
+    _ready_locator = _form
+
+    def submit(self):
+        self._click(self._submit)
+''',
+    "views.loading": '''
+from views.base import Base
+
+
+class Loading(Base):
+    _start = {"by": "id", "value": "start"}
+    _finish = {"by": "id", "value": "finish"}
+    _ready_locator = _start
+
+    def start(self):
+        self._click(self._start)
+
+    def finished(self):
+        return self._finish
+''',
+    "plugins.order": '''
+class ReverseOrder:
+    def pytest_collection_modifyitems(self, items):
+        items.reverse()
+''',
+    "plugins.logs": '''
+import logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+''',
+    "conftest": '''
+import pytest
+from views.login import Login
+
+
+@pytest.fixture
+def login():
+    return Login()
+
+
+def pytest_configure(config):
+    pass
+''',
+    "tests.test_login": '''
+def test_submit(login):
+    login.submit()
+''',
+    "tests.test_loading": '''
+import pytest
+from views.loading import Loading
+
+
+@pytest.fixture
+def loading() -> Loading:
+    return Loading()
+
+
+def test_start():
+    page = Loading()
+    page.start()
+
+
+def test_finished(loading: Loading):
+    assert loading.finished()
+''',
+    "tests.test_plugins": '''
+from plugins.logs import ListHandler
+from plugins.order import ReverseOrder
+
+
+def test_reverse_order():
+    assert ReverseOrder()
+
+
+def test_list_handler():
+    assert ListHandler().records == []
+''',
+}
+
+
+@pytest.fixture
+def index() -> DependencyIndex:
+    return DependencyIndex({name: parse_module(source, name.rpartition(".")[0])
+                            for name, source in SOURCES.items()})
+
+
+def _affected(index: DependencyIndex, changed: set) -> list:
+    tests = [f"{module}:{name}" for module, data in index.modules.items()
+             if module.startswith("tests.") for name in data["defs"]]
+    return sorted(test for test in tests if index.closure(test) & changed)
+
+
+def test_locator_change_selects_only_the_tests_using_it(index: DependencyIndex):
+    """A locator is a dependency of the tests calling methods that use it."""
+    assert _affected(index, {"views.loading:Loading._finish"}) == ["tests.test_loading:test_finished"]
+    assert _affected(index, {"views.login:Login._submit"}) == ["tests.test_login:test_submit"]
+
+
+def test_ready_locator_is_resolved_on_the_page_class(index: DependencyIndex):
+    """The base class reading self._ready_locator depends on the subclass the test uses."""
+    assert _affected(index, {"views.login:Login._form"}) == ["tests.test_login:test_submit"]
+    assert _affected(index, {"views.loading:Loading._start"}) == ["tests.test_loading:test_start"]
+
+
+def test_hooks_and_protocol_methods_depend_on_their_class(index: DependencyIndex):
+    """Methods only pytest or a stdlib base class calls are dependencies of the tests using the class."""
+    assert _affected(index, {"plugins.order:ReverseOrder.pytest_collection_modifyitems"}) == [
+        "tests.test_plugins:test_reverse_order"]
+    assert _affected(index, {"plugins.logs:ListHandler.emit"}) == ["tests.test_plugins:test_list_handler"]
+
+
+def test_changed_lines_map_to_the_innermost_definition(index: DependencyIndex):
+    """Lines of a method touch the method, lines outside of any definition the whole module."""
+    assert index.changed("views.loading", {11}) == {"views.loading:Loading.start"}
+    assert index.changed("views.loading", {2}) == {
+        "views.loading:" + name for name in index.modules["views.loading"]["defs"]}
+
+
+def _git(path, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+                   cwd=path, check=True, capture_output=True)
+
+
+def test_plugin_runs_only_the_affected_tests(pytester: pytest.Pytester):
+    """A page object change deselects the unrelated tests, a change to conftest.py
+    or a module it imports runs all."""
+    pytester.makeconftest("""
+        from scheduling.impact import ImpactSelector
+
+        def pytest_configure(config):
+            config.pluginmanager.register(ImpactSelector(config, "HEAD"), "impact_selector")
+    """)
+    pytester.mkpydir("views")
+    for module in ("views.base", "views.login", "views.loading", "tests.test_login", "tests.test_loading"):
+        path = pytester.path.joinpath(*module.split(".")).with_suffix(".py")
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(SOURCES[module])
+    pytester.path.joinpath("tests", "conftest.py").write_text(SOURCES["conftest"])
+    _git(pytester.path, "init", "-q")
+    _git(pytester.path, "add", ".")
+    _git(pytester.path, "commit", "-q", "-m", "baseline")
+
+    loading = pytester.path / "views" / "loading.py"
+    loading.write_text(loading.read_text().replace('"value": "finish"', '"value": "done"'))
+    assert git_changes(pytester.path, "HEAD") == {"views/loading.py": {7}}
+    result = pytester.runpytest("-p", "no:randomly", "-p", "no:cacheprovider", "tests")
+    result.assert_outcomes(passed=1, deselected=2)
+
+    login = pytester.path / "views" / "login.py"
+    login.write_text(login.read_text().replace('"value": "login"', '"value": "sign-in"'))
+    pytester.runpytest("-p", "no:randomly", "-p", "no:cacheprovider", "tests").assert_outcomes(passed=3)
+    _git(pytester.path, "checkout", "--", "views/login.py")
+
+    conftest = pytester.path / "tests" / "conftest.py"
+    conftest.write_text(conftest.read_text() + "\n")
+    pytester.runpytest("-p", "no:randomly", "tests").assert_outcomes(passed=3)
+
+
+@pytest.mark.parametrize("changed", [
+    "drivers.localrunner:ChromeRunner.capabilities",
+    "drivers.remote_driver:DockerRunner._browser_options",
+    "drivers.driver_cache:resolve_driver",
+    "drivers.fast_profile:chrome_options",
+])
+def test_runner_changes_select_the_browser_tests(changed: str):
+    """Runners are imported by name through drivers.registry, the index follows those names."""
+    root = Path(__file__).resolve().parent.parent
+    paths = subprocess.run(["git", "ls-files", "--cached", "--others", "--exclude-standard", "--", "*.py"],
+                           cwd=root, check=True, capture_output=True, text=True).stdout.splitlines()
+    index = load_index(root, paths, None)
+    for test in ("tests.test_login:test_valid_credentials", "tests.test_dynamic_loading:test_finish_loading_page",
+                 "tests.test_secure_page:test_secure_area_is_reachable"):
+        assert changed in index.closure(test), test
@@ -0,0 +1,51 @@
+from drivers.instrumentation import CommandRecorder, CommandStats, page_action, serialize
+
+
+class FakeExecutor:
+    """Command executor answering every command with a fixed value."""
+
+    def execute(self, command, params):
+        return {"value": "x" * 10}
+
+
+class FakeDriver:
+
+    def __init__(self):
+        self.command_executor = FakeExecutor()
+
+
+def test_commands_are_attributed_to_test_and_page_action():
+    """Every command is recorded under the running test and page action."""
+    recorder = CommandRecorder()
+    driver = recorder.instrument(FakeDriver())
+    recorder.current_test = "tests/test_login.py::test_valid_credentials"
+    with page_action("_find"):
+        driver.command_executor.execute("findElement", {"using": "css selector", "value": "#username"})
+    driver.command_executor.execute("get", {"url": "about:blank"})
+
+    records = recorder.take("tests/test_login.py::test_valid_credentials")
+    assert [(r.command, r.action, r.locator) for r in records] == [
+        ("findElement", "_find", "css selector=#username"),
+        ("get", "-", ""),
+    ]
+    assert records[0].response_bytes == 10
+    assert recorder.take("tests/test_login.py::test_valid_credentials") == []
+
+
+def test_instrument_is_idempotent():
+    """Instrumenting a pooled driver twice records each command once."""
+    recorder = CommandRecorder()
+    driver = recorder.instrument(recorder.instrument(FakeDriver()))
+    driver.command_executor.execute("get", {})
+    assert len(recorder.take("")) == 1
+
+
+def test_stats_percentiles_per_command():
+    """Run-wide stats report nearest-rank p50/p95 per command type."""
+    stats = CommandStats()
+    stats.add([{"command": "findElement", "duration_ms": float(duration),
+                "request_bytes": 1, "response_bytes": 1} for duration in range(1, 101)])
+    stats.add(serialize([]))
+    (row,) = stats.summary()
+    assert (row["count"], row["p50_ms"], row["p95_ms"], row["max_ms"]) == (100, 50.0, 95.0, 100.0)
+    assert row["bytes"] == 200
@@ -0,0 +1,73 @@
+import json
+import logging
+import pytest
+from reporting.log_buffer import RingBufferHandler
+
+pytest_plugins = ["pytester"]
+
+
+class CountingArg:
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "arg"
+
+
+def test_buffer_keeps_records_unformatted_and_bounded():
+    """Only the newest records are kept and none of them is formatted."""
+    handler = RingBufferHandler(capacity=2)
+    handler.active = True
+    logger = logging.getLogger("pages.buffer_test")
+    logger.addHandler(handler)
+    logger.propagate = False
+    arg = CountingArg()
+    try:
+        for index in range(3):
+            logger.warning("record %s %s", index, arg)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+    records = handler.take()
+    assert [record.args[0] for record in records] == [1, 2]
+    assert arg.formatted == 0
+    assert handler.take() == []
+
+
+def test_only_failed_and_xfailed_tests_are_written(pytester: pytest.Pytester):
+    """Passing tests leave no trace; failures get a report section and JSON lines."""
+    pytester.makeconftest("""
+        from pathlib import Path
+        from reporting.log_buffer import BufferedLogging
+
+        def pytest_configure(config):
+            config.pluginmanager.register(BufferedLogging(
+                config, Path("logs.jsonl"), loggers=("pages",)), "buffered_logging")
+    """)
+    pytester.makepyfile("""
+        import logging
+        import pytest
+
+        LOGGER = logging.getLogger("pages.example")
+
+        def test_passes():
+            LOGGER.info("quiet %s", "pass")
+
+        def test_fails():
+            LOGGER.info("loud %s", "fail")
+            assert False
+
+        @pytest.mark.xfail
+        def test_xfails():
+            LOGGER.warning("expected %s", "xfail")
+            assert False
+    """)
+    result = pytester.runpytest("-p", "no:randomly", "-o", "log_cli=true", "-o", "log_cli_level=INFO")
+    result.assert_outcomes(passed=1, failed=1, xfailed=1)
+    result.stdout.no_fnmatch_line("*quiet pass*")
+    result.stdout.fnmatch_lines(["*Buffered log call*", "*loud fail*"])
+    lines = [json.loads(line) for line in (pytester.path / "logs.jsonl").read_text().splitlines()]
+    assert [(line["test"].split("::")[-1], line["message"]) for line in lines] == [
+        ("test_fails", "loud fail"), ("test_xfails", "expected xfail")]
@@ -0,0 +1,115 @@
+import threading
+from benchmarks.fake_webdriver import FakeWebDriver
+from config import RunConfig
+from conftest import _record_startup, _start_driver
+from drivers.instrumentation import RECORDER
+from drivers.prefetch import SessionPrefetcher
+
+
+class FakeDriver:
+    """Stands in for a WebDriver session, only tracks quit calls."""
+
+    def __init__(self, testname: str):
+        self.testname = testname
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_take_uses_prefetched_session():
+    """A scheduled session is handed to the test it was provisioned for."""
+    started = []
+
+    def factory(testname):
+        started.append(testname)
+        return FakeDriver(testname)
+
+    prefetcher = SessionPrefetcher(factory=factory, depth=1)
+    prefetcher.schedule([("tests/a.py::test_b", "test_b")])
+    driver = prefetcher.take("tests/a.py::test_b", "test_b")
+    prefetcher.close()
+    assert driver.testname == "test_b"
+    assert started == ["test_b"]
+
+
+def test_take_without_prefetch_starts_session():
+    """Tests that were not prefetched start their session synchronously."""
+    prefetcher = SessionPrefetcher(factory=FakeDriver, depth=1)
+    driver = prefetcher.take("tests/a.py::test_a", "test_a")
+    prefetcher.close()
+    assert driver.testname == "test_a"
+
+
+def test_schedule_respects_depth():
+    """Only `depth` upcoming tests are provisioned."""
+    started = []
+    lock = threading.Lock()
+
+    def factory(testname):
+        with lock:
+            started.append(testname)
+        return FakeDriver(testname)
+
+    prefetcher = SessionPrefetcher(factory=factory, depth=2)
+    prefetcher.schedule([("a", "a"), ("b", "b"), ("c", "c")])
+    prefetcher.take("a", "a")
+    prefetcher.take("b", "b")
+    prefetcher.close()
+    assert sorted(started) == ["a", "b"]
+
+
+def test_unused_sessions_are_quit():
+    """Sessions that drop out of the look-ahead or are never used get quit."""
+    drivers = []
+
+    def factory(testname):
+        driver = FakeDriver(testname)
+        drivers.append(driver)
+        return driver
+
+    prefetcher = SessionPrefetcher(factory=factory, depth=1)
+    prefetcher.schedule([("a", "a")])
+    prefetcher.schedule([("b", "b")])
+    prefetcher.close()
+    assert drivers
+    assert all(driver.quit_called for driver in drivers)
+
+
+def test_failed_prefetch_falls_back_to_new_session():
+    """A speculative startup failure does not fail the test."""
+    calls = []
+
+    def factory(testname):
+        calls.append(testname)
+        if len(calls) == 1:
+            raise RuntimeError("hub unavailable")
+        return FakeDriver(testname)
+
+    prefetcher = SessionPrefetcher(factory=factory, depth=1)
+    prefetcher.schedule([("a", "a")])
+    driver = prefetcher.take("a", "a")
+    prefetcher.close()
+    assert driver.testname == "a"
+    assert calls == ["a", "a"]
+
+
+def test_prefetched_session_start_is_timed_for_its_own_test(monkeypatch):
+    """A session started during another test is recorded for the test that takes it."""
+    fake = FakeWebDriver().start()
+    monkeypatch.setattr(RECORDER, "current_test", "tests/a.py::test_running")
+    config = RunConfig(host="docker", browser="chrome", hub_url=fake.url, command_timings=True)
+    prefetcher = SessionPrefetcher(factory=lambda spec: _start_driver(*spec, record=False), depth=1)
+    try:
+        prefetcher.schedule([("tests/a.py::test_next", (config, "test_next"))])
+        driver = prefetcher.take("tests/a.py::test_next", (config, "test_next"))
+        assert RECORDER.take("tests/a.py::test_running") == []
+
+        monkeypatch.setattr(RECORDER, "current_test", "tests/a.py::test_next")
+        _record_startup(driver)
+        assert [record.command for record in RECORDER.take("tests/a.py::test_next")] == ["newSession"]
+        driver.quit()
+        RECORDER.take("tests/a.py::test_next")
+    finally:
+        prefetcher.close()
+        fake.stop()
@@ -0,0 +1,145 @@
+import socket
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import pytest
+import urllib3
+from drivers.proxy import CachingProxy, ResponseStore
+
+
+class Site:
+    """Upstream application counting its requests. Every page load of
+    /login answers a new body, like a page with a flash message would."""
+
+    def __init__(self):
+        self.hits = 0
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                site.hits += 1
+                body = f"{self.path} #{site.hits}".encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                site.hits += 1
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def site():
+    upstream = Site()
+    yield upstream
+    upstream.server.shutdown()
+
+
+def _proxy(tmp_path, mode, **kwargs) -> tuple[CachingProxy, urllib3.ProxyManager]:
+    proxy = CachingProxy(ResponseStore(tmp_path), mode=mode, **kwargs).start()
+    return proxy, urllib3.ProxyManager(f"http://127.0.0.1:{proxy.port}", retries=False)
+
+
+def test_replay_serves_recordings_without_network(site, tmp_path):
+    """A recorded test replays in the same order after the site is gone."""
+    recorder, client = _proxy(tmp_path, "record")
+    recorder.scope("test_login")
+    recorded = [client.request("GET", f"{site.url}/login").data for _ in range(2)]
+    recorder.stop()
+    site.server.shutdown()
+
+    replayer, client = _proxy(tmp_path, "replay")
+    replayer.scope("test_login")
+    replayed = [client.request("GET", f"{site.url}/login").data for _ in range(2)]
+    missing = client.request("GET", f"{site.url}/other")
+    replayer.stop()
+    assert replayed == recorded == [b"/login #1", b"/login #2"]
+    assert missing.status == 504
+
+
+def test_passthrough_caches_static_assets_only(site, tmp_path):
+    """Static assets are fetched once for all tests, pages every time."""
+    proxy, client = _proxy(tmp_path, "passthrough")
+    for test in ("test_one", "test_two"):
+        proxy.scope(test)
+        client.request("GET", f"{site.url}/css/app.css")
+        client.request("GET", f"{site.url}/login")
+    proxy.stop()
+    assert site.hits == 3
+    assert proxy.stats["hits"] == 1
+
+
+def test_upgraded_host_redirects_stay_on_http(tmp_path):
+    """Redirects of an upgraded host keep the browser on the proxied http url."""
+    proxy = CachingProxy(ResponseStore(tmp_path), upgrade_hosts=("the-internet.herokuapp.com",))
+    assert proxy.browser_url("https://the-internet.herokuapp.com/login") == \
+        "http://the-internet.herokuapp.com/login"
+    assert proxy.browser_url("https://example.com/") == "https://example.com/"
+    proxy.server.server_close()
+
+
+def test_chunked_request_bodies_are_decoded(site, tmp_path):
+    """A chunked body is forwarded whole and keyed like the same body sent with Content-Length."""
+    recorder = CachingProxy(ResponseStore(tmp_path), mode="record").start()
+    recorder.scope("test_login")
+    with socket.create_connection(("127.0.0.1", recorder.port), timeout=5) as sock:
+        sock.sendall(f"POST {site.url}/authenticate HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                     "Transfer-Encoding: chunked\r\n\r\n"
+                     "9\r\nusername=\r\n8\r\ntomsmith\r\n0\r\n\r\n".encode())
+        response = b""
+        while not response.endswith(b"tomsmith") and (data := sock.recv(1024)):
+            response += data
+    recorder.stop()
+    assert response.endswith(b"\r\n\r\nusername=tomsmith")
+
+    replayer, client = _proxy(tmp_path, "replay")
+    replayer.scope("test_login")
+    replayed = client.request("POST", f"{site.url}/authenticate", body=b"username=tomsmith")
+    replayer.stop()
+    assert replayed.data == b"username=tomsmith"
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        CachingProxy(ResponseStore(tmp_path), mode="offline")
+
+
+def _connect(proxy: CachingProxy, target: str) -> bytes:
+    with socket.create_connection(("127.0.0.1", proxy.port), timeout=5) as sock:
+        sock.sendall(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode())
+        return sock.recv(1024).split(b"\r\n")[0]
+
+
+def test_tunnels_only_to_the_application_hosts(site, tmp_path):
+    """The proxy listens on loopback and is no open relay for other hosts."""
+    proxy = CachingProxy(ResponseStore(tmp_path), tunnel_hosts=("127.0.0.1",)).start()
+    assert proxy.server.server_address[0] == "127.0.0.1"
+    port = site.url.rpartition(":")[2]
+    assert b" 403 " in _connect(proxy, f"example.com:{port}")
+    assert b" 200 " in _connect(proxy, f"127.0.0.1:{port}")
+    proxy.stop()
+
+
+def test_proxy_is_refused_for_cloud_hosts():
+    """Cloud browsers cannot reach the local proxy, so the run is not started."""
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "--co", "-q", "-p", "no:cacheprovider", "--host=saucelabs",
+         "--proxy-mode=replay", "tests/test_proxy.py"],
+        cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=False)
+    assert result.returncode == pytest.ExitCode.USAGE_ERROR
+    assert "cannot use the local proxy" in result.stderr
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+from importlib.metadata import EntryPoint
+from pathlib import Path
+import pytest
+from drivers import registry
+from drivers.base_driver import BaseRunner
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class SafariRunner(BaseRunner):
+    capabilities = {}
+
+    def start_driver(self):
+        return None
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(monkeypatch):
+    monkeypatch.setattr(registry, "_REGISTERED", {})
+    registry._load.cache_clear()
+    registry._entry_points.cache_clear()
+    yield
+    registry._load.cache_clear()
+    registry._entry_points.cache_clear()
+
+
+def test_conftest_imports_no_runner():
+    script = ("import sys, conftest; "
+              "print(sorted(m for m in sys.modules if m.startswith(('webdriver_manager', 'drivers.localrunner', "
+              "'drivers.remote_driver'))))")
+    imported = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    assert imported == "[]"
+
+
+def test_resolves_builtin_runners():
+    assert registry.runner_class("docker", "firefox").__name__ == "DockerRunner"
+    assert registry.runner_class("localhost", "chrome").__name__ == "ChromeRunner"
+    with pytest.raises(LookupError, match="edge on localhost"):
+        registry.runner_class("localhost", "edge")
+
+
+def test_registered_runner_wins():
+    registry.register("localhost", SafariRunner, browser="safari")
+    registry.register("docker", "tests.test_registry:SafariRunner")
+    assert registry.runner_class("localhost", "safari") is SafariRunner
+    assert registry.runner_class("docker", "chrome") is SafariRunner
+    assert registry.runner_class("localhost", "chrome").__name__ == "ChromeRunner"
+
+
+def test_runners_from_entry_points(monkeypatch):
+    declared = [EntryPoint("appium", "tests.test_registry:SafariRunner", registry.ENTRY_POINT_GROUP)]
+    monkeypatch.setattr(registry, "entry_points", lambda group: declared if group == registry.ENTRY_POINT_GROUP else [])
+    assert registry.supports("appium")
+    assert not registry.supports("selenoid")
+    assert registry.runner_class("appium", "chrome") is SafariRunner
+
+
+def test_builtin_runners_do_not_read_entry_points(monkeypatch):
+    """Package metadata is only scanned for hosts without a built-in runner."""
+    def fail(group):
+        raise AssertionError(f"entry points of {group} read")
+
+    monkeypatch.setattr(registry, "entry_points", fail)
+    assert registry.supports("docker")
+    assert registry.runner_class("localhost", "firefox").__name__ == "FirefoxRunner"
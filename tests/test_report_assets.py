@@ -0,0 +1,32 @@
+import json
+from reporting.external import AssetStore, ResultStream
+
+
+def test_identical_assets_are_stored_once(tmp_path):
+    """The same screenshot from several tests ends up in a single file."""
+    store = AssetStore(directory=tmp_path / "assets")
+    first = store.add(b"same error page", "png")
+    second = store.add(b"same error page", "png")
+    other = store.add(b"another page", "png")
+    store.close()
+    assert first == second != other
+    assert first.startswith("assets/")
+    assert sorted(path.name for path in (tmp_path / "assets").iterdir()) == sorted(
+        [first.split("/")[1], other.split("/")[1]])
+
+
+def test_text_assets_are_content_addressed(tmp_path):
+    """Logs are hashed by content like screenshots."""
+    store = AssetStore(directory=tmp_path / "assets")
+    href = store.add("captured log", "txt")
+    store.close()
+    assert (tmp_path / href).read_text() == "captured log"
+
+
+def test_results_are_streamed_line_by_line(tmp_path):
+    """Every result is on disk as soon as it is written."""
+    stream = ResultStream(tmp_path / "results.jsonl")
+    stream.write({"nodeid": "tests/test_login.py::test_valid_credentials", "outcome": "passed"})
+    lines = (tmp_path / "results.jsonl").read_text().splitlines()
+    stream.close()
+    assert json.loads(lines[0])["outcome"] == "passed"
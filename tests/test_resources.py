@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from config import RunConfig
+from drivers import resources
+from drivers.resources import AdmissionGate, FootprintStore, SystemResources, capacity, is_local
+
+FOOTPRINT = {"memory_mb": 500.0, "shm_mb": 100.0, "cpu": 1.0}
+
+
+def machine(cores=8, memory_mb=8192.0, shm_mb=2048.0, load=0.0) -> SystemResources:
+    return SystemResources(cores=cores, memory_mb=memory_mb, shm_mb=shm_mb, load=load)
+
+
+def test_reads_machine_resources():
+    current = SystemResources.read()
+    assert current.cores >= 1
+    assert current.memory_mb > 0
+
+
+def test_capacity_is_the_tightest_limit():
+    assert capacity(machine(), FOOTPRINT) == 8
+    assert capacity(machine(memory_mb=2524.0), FOOTPRINT) == 3
+    assert capacity(machine(shm_mb=250.0), FOOTPRINT) == 2
+    # docker nodes bring their own /dev/shm
+    assert capacity(machine(shm_mb=250.0), FOOTPRINT, shm=False) == 8
+    assert capacity(machine(memory_mb=512.0), FOOTPRINT) == 1
+
+
+def test_store_learns_footprint(tmp_path):
+    store = FootprintStore(tmp_path / "footprints.json")
+    assert store.get("firefox") == resources.DEFAULT_FOOTPRINTS["firefox"]
+    store.update("chrome", {"memory_mb": 400.0, "shm_mb": 50.0, "cpu": 0.5})
+    learned = store.update("chrome", {"memory_mb": 600.0, "shm_mb": 50.0, "cpu": 1.5})
+    assert learned == {"memory_mb": 500.0, "shm_mb": 50.0, "cpu": 1.0}
+    assert FootprintStore(tmp_path / "footprints.json").get("chrome") == learned
+
+
+def test_measures_process_tree():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        assert child.pid in resources.process_tree(os.getpid())
+        usage = resources.tree_usage(os.getpid())
+        assert usage["memory_mb"] > 0
+        assert usage["cpu"] >= 0
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_samples_only_the_first_local_sessions(tmp_path, monkeypatch):
+    driver = SimpleNamespace(service=SimpleNamespace(process=SimpleNamespace(pid=os.getpid())))
+    monkeypatch.setattr(resources, "_SAMPLES", resources.Counter())
+    store = FootprintStore(tmp_path / "footprints.json")
+    samples = [resources.sample_footprint(driver, "chrome", store)
+               for _ in range(resources.FOOTPRINT_SAMPLES + 1)]
+    assert all(samples[:-1]) and samples[-1] is None
+    # remote sessions have no local process to measure
+    assert resources.sample_footprint(object(), "chrome", store) is None
+
+
+def test_local_hosts():
+    assert is_local(RunConfig(host="localhost"))
+    assert is_local(RunConfig(host="docker", hub_url="http://127.0.0.1:4444/wd/hub"))
+    assert not is_local(RunConfig(host="docker", hub_url="http://grid.example:4444/wd/hub"))
+    assert not is_local(RunConfig(host="saucelabs"))
+
+
+def test_gate_reports_saturation(tmp_path):
+    gate = AdmissionGate("chrome", state_dir=tmp_path)
+    gate.store.update("chrome", FOOTPRINT)
+    assert gate.saturated(machine(), 0) is None
+    assert "memory" in gate.saturated(machine(memory_mb=1400.0), 0)
+    assert "memory" in gate.saturated(machine(memory_mb=2000.0), 2)
+    assert "shm" in gate.saturated(machine(shm_mb=50.0), 0)
+    assert "load" in gate.saturated(machine(load=20.0), 0)
+    assert "starting" in gate.saturated(machine(cores=2), 1)
+    assert AdmissionGate("chrome", shm=False, state_dir=tmp_path).saturated(machine(shm_mb=50.0), 0) is None
+
+
+def test_gate_waits_while_saturated(tmp_path, monkeypatch):
+    free = {"memory_mb": 1200.0}
+    monkeypatch.setattr(SystemResources, "read", classmethod(lambda cls: machine(**free)))
+    gate = AdmissionGate("chrome", state_dir=tmp_path, poll_interval=0.05)
+    gate.store.update("chrome", FOOTPRINT)
+    admitted = threading.Event()
+
+    def start():
+        with gate.slot():
+            admitted.set()
+
+    thread = threading.Thread(target=start)
+    thread.start()
+    time.sleep(0.2)
+    assert not admitted.is_set()
+    free["memory_mb"] = 4096.0
+    thread.join(5)
+    assert admitted.is_set()
+    assert (tmp_path / "admissions.json").read_text(encoding="utf-8") == "{}"
+
+
+def test_gate_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(SystemResources, "read", classmethod(lambda cls: machine(memory_mb=100.0)))
+    gate = AdmissionGate("chrome", state_dir=tmp_path, timeout=0.1, poll_interval=0.05)
+    with pytest.raises(TimeoutError, match="memory"):
+        with gate.slot():
+            pass
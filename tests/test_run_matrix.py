@@ -0,0 +1,49 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from conftest import _run_matrix
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class Options:
+    """The pytest config of this run with some options overridden."""
+
+    def __init__(self, config: pytest.Config, **overrides):
+        self.config = config
+        self.overrides = {f"--{name.replace('_', '-')}": value for name, value in overrides.items()}
+
+    def getoption(self, name: str):
+        return self.overrides.get(name, self.config.getoption(name))
+
+
+def test_every_browser_and_platform_combination(pytestconfig):
+    matrix = _run_matrix(Options(pytestconfig, host="docker", browser="Chrome, firefox", platform="Windows,Linux"))
+    assert [run_config.id for run_config in matrix] == [
+        "chrome-Windows", "chrome-Linux", "firefox-Windows", "firefox-Linux"]
+    assert {run_config.host for run_config in matrix} == {"docker"}
+
+
+@pytest.mark.parametrize("options, message", [
+    ({"browser": "opera"}, "unknown browser 'opera'"),
+    ({"host": "docker", "platform": "Amiga"}, "unknown platform 'Amiga'"),
+    ({"host": "localhost", "browser": "edge"}, "edge is not supported on localhost"),
+    ({"host": "selenoid"}, "no runner registered for 'selenoid'"),
+])
+def test_invalid_options_are_usage_errors(pytestconfig, options, message):
+    with pytest.raises(pytest.UsageError, match=message):
+        _run_matrix(Options(pytestconfig, **options))
+
+
+def test_browser_tests_fan_out_across_the_matrix():
+    """Tests using run_config are parametrized per combination, others are not."""
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "--co", "-q", "-o", "addopts=", "-p", "no:cacheprovider",
+         "--host=docker", "--browser=chrome,firefox", "tests/test_login.py::test_valid_credentials",
+         "tests/test_grid.py"],
+        cwd=ROOT, capture_output=True, text=True, check=False)
+    collected = [line for line in result.stdout.splitlines() if "::" in line]
+    assert "tests/test_login.py::test_valid_credentials[chrome-macOS]" in collected
+    assert "tests/test_login.py::test_valid_credentials[firefox-macOS]" in collected
+    assert "tests/test_grid.py::test_worker_count_matches_grid_slots" in collected
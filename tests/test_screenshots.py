@@ -0,0 +1,55 @@
+import io
+import pytest
+from reporting.screenshots import ScreenshotPipeline, encode
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(width: int = 1200, height: int = 800) -> bytes:
+    """A noisy PNG, hard enough to compress to exercise the size budget."""
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_png_without_options_is_untouched():
+    """The default pipeline writes the captured bytes as they are."""
+    png = _png(10, 10)
+    assert encode(png) == (png, "png")
+
+
+def test_downscale_to_max_width():
+    """Screenshots wider than max_width are scaled down proportionally."""
+    data, image_format = encode(_png(), "png", max_width=600)
+    assert image_format == "png"
+    assert Image.open(io.BytesIO(data)).size == (600, 400)
+
+
+def test_jpeg_fits_size_budget():
+    """Lossy screenshots are shrunk until they fit the budget."""
+    data, image_format = encode(_png(), "jpeg", max_kb=60)
+    assert image_format == "jpeg"
+    assert len(data) <= 60 * 1024
+
+
+def test_pipeline_writes_encoded_file(tmp_path):
+    """The path is known right away and the file is written in the background."""
+    pipeline = ScreenshotPipeline(directory=tmp_path, image_format="webp")
+    path = pipeline.submit(_png(100, 100), "test_login")
+    pipeline.close()
+    assert path == tmp_path / "test_login.webp"
+    assert Image.open(path).format == "WEBP"
+
+
+def test_content_addressed_screens_are_written_once(tmp_path):
+    """A screen captured again by another test reuses the first file."""
+    pipeline = ScreenshotPipeline(directory=tmp_path, content_addressed=True)
+    error_page = _png(50, 50)
+    first = pipeline.submit(error_page, "test_login")
+    second = pipeline.submit(error_page, "test_logout")
+    other = pipeline.submit(_png(60, 60), "test_login")
+    pipeline.close()
+    assert first == second != other
+    assert sorted(tmp_path.iterdir()) == sorted([first, other])
+    assert first.read_bytes() == error_page
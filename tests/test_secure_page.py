@@ -0,0 +1,6 @@
+from pages.secure_page import SecurePage
+
+
+def test_secure_area_is_reachable(logged_in: SecurePage):
+    """A logged in session, from the UI or the auth cache, can open the secure area."""
+    assert logged_in.is_logged_in()
@@ -0,0 +1,75 @@
+from selenium.common.exceptions import WebDriverException
+from drivers.session_pool import SessionPool
+
+
+class FakeDriver:
+    """Stands in for a WebDriver session, only tracks quit calls."""
+
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_session_is_reused_after_release():
+    """A released session is handed out again for the same key."""
+    pool = SessionPool(reset=lambda driver: None)
+    first = pool.acquire("chrome", FakeDriver)
+    pool.release(first)
+    assert pool.acquire("chrome", FakeDriver) is first
+
+
+def test_session_is_not_shared_between_keys():
+    """Sessions are only reused for the same host and browser."""
+    pool = SessionPool(reset=lambda driver: None)
+    chrome = pool.acquire("chrome", FakeDriver)
+    pool.release(chrome)
+    assert pool.acquire("firefox", FakeDriver) is not chrome
+
+
+def test_session_is_recycled_after_max_uses():
+    """Sessions are quit once they served max_uses tests."""
+    pool = SessionPool(max_uses=2, reset=lambda driver: None)
+    first = pool.acquire("chrome", FakeDriver)
+    pool.release(first)
+    assert pool.acquire("chrome", FakeDriver) is first
+    pool.release(first)
+    assert first.quit_called
+    assert pool.acquire("chrome", FakeDriver) is not first
+
+
+def test_session_is_recycled_after_failure():
+    """A failed test retires its session and reports the failure."""
+    retired = []
+    pool = SessionPool(reset=lambda driver: None,
+                       retire=lambda driver, failed: retired.append(failed))
+    first = pool.acquire("chrome", FakeDriver)
+    pool.release(first, failed=True)
+    assert first.quit_called
+    assert retired == [True]
+
+
+def test_session_is_recycled_when_reset_fails():
+    """Sessions that cannot be reset are not handed out again."""
+    def broken_reset(driver):
+        raise WebDriverException("session crashed")
+
+    pool = SessionPool(reset=broken_reset)
+    first = pool.acquire("chrome", FakeDriver)
+    pool.release(first)
+    assert first.quit_called
+    assert pool.acquire("chrome", FakeDriver) is not first
+
+
+def test_close_retires_idle_and_busy_sessions():
+    """Closing the pool quits every session and reports them as passed."""
+    retired = []
+    pool = SessionPool(reset=lambda driver: None,
+                       retire=lambda driver, failed: retired.append(failed))
+    idle = pool.acquire("chrome", FakeDriver)
+    busy = pool.acquire("chrome", FakeDriver)
+    pool.release(idle)
+    pool.close()
+    assert idle.quit_called and busy.quit_called
+    assert retired == [False, False]
@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from selenium.webdriver.remote.command import Command
+from drivers.transport import PooledRemoteConnection, close_pools, reset_stats, transport_stats
+
+
+class FakeHubHandler(BaseHTTPRequestHandler):
+    """Answers every WebDriver command with a null value over keep-alive
+    connections. Fails the first `failures` requests with 503."""
+
+    protocol_version = "HTTP/1.1"
+    failures = 0
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if FakeHubHandler.failures:
+            FakeHubHandler.failures -= 1
+            status, body = 503, b"busy"
+        else:
+            status, body = 200, json.dumps({"value": None}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_DELETE = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeHubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/wd/hub"
+    server.shutdown()
+    close_pools()
+    reset_stats()
+
+
+def test_sessions_share_keep_alive_connection(hub_url):
+    """Several sessions against one hub reuse a single connection."""
+    for _ in range(3):
+        connection = PooledRemoteConnection(hub_url)
+        connection.execute(Command.GET, {"sessionId": "abc", "url": "about:blank"})
+        connection.close()
+    stats = transport_stats()[hub_url.rsplit("/wd/hub", 1)[0]]
+    assert stats["requests"] >= 3
+    assert stats["connections"] == 1
+
+
+def test_gateway_errors_are_retried(hub_url):
+    """A 503 from the hub is retried instead of failing the command."""
+    FakeHubHandler.failures = 1
+    connection = PooledRemoteConnection(hub_url)
+    response = connection.execute(Command.GET_CURRENT_URL, {"sessionId": "abc"})
+    assert response["value"] is None
+    assert FakeHubHandler.failures == 0
+
+
+def test_post_commands_are_not_repeated(hub_url):
+    """A POST answered with 503 may have run already, so it is not sent again."""
+    FakeHubHandler.failures = 2
+    connection = PooledRemoteConnection(hub_url)
+    response = connection.execute(Command.CLICK_ELEMENT, {"sessionId": "abc", "id": "el"})
+    assert response["value"] == "busy"
+    assert FakeHubHandler.failures == 1
+    FakeHubHandler.failures = 0
@@ -0,0 +1,65 @@
+from dataclasses import replace
+import pytest
+from benchmarks.fake_webdriver import FakeWebDriver
+from benchmarks.site import LocalSite
+from config import RunConfig
+from drivers.instrumentation import take_page_metrics
+from drivers.remote_driver import DockerRunner
+from pages.login_page import LoginPage
+from reporting.web_vitals import PerformanceBudgetWarning, check_budgets
+
+
+class TinyBudgetLoginPage(LoginPage):
+    _budgets = {"navigation_ms": 0, "lcp_ms": 0}
+
+
+@pytest.fixture(scope="module")
+def endpoints():
+    site = LocalSite().start()
+    fake = FakeWebDriver().start()
+    yield site, fake
+    fake.stop()
+    site.stop()
+
+
+def _driver_and_config(endpoints, **options):
+    site, fake = endpoints
+    config = RunConfig(host="docker", browser="chrome", hub_url=fake.url, base_url=site.url,
+                       wait_strategy="poll", perf_metrics=True, **options)
+    return DockerRunner(config, "web-vitals").start_driver(), config
+
+
+def test_budgets_skip_metrics_the_browser_did_not_report():
+    """Only reported metrics above their bound are violations."""
+    metrics = {"load_ms": 950.0, "ttfb_ms": 120.0, "lcp_ms": None}
+    assert check_budgets(metrics, {"load_ms": 800, "ttfb_ms": 200, "lcp_ms": 1200, "cls": 0.1}) == [
+        "load_ms 950 > 800"]
+
+
+def test_page_loads_are_measured_once_ready(endpoints):
+    """Every visited page records its metrics once, within budget."""
+    driver, config = _driver_and_config(endpoints)
+    try:
+        login = LoginPage(driver, config)
+        login.with_("tomsmith", "SuperSecretPassword!")
+        login.success_message_present()
+        entries = take_page_metrics(driver)
+    finally:
+        driver.quit()
+    assert [(entry["page"], entry["violations"]) for entry in entries] == [("LoginPage", [])]
+    assert entries[0]["url"].endswith("/login")
+    assert entries[0]["metrics"]["navigation_ms"] > 0
+
+
+def test_budget_violations_warn_or_fail(endpoints):
+    """Warn mode keeps the test going, fail mode stops it."""
+    driver, config = _driver_and_config(endpoints, perf_budgets="warn")
+    try:
+        with pytest.warns(PerformanceBudgetWarning, match="navigation_ms"):
+            TinyBudgetLoginPage(driver, config)._ensure_ready()
+        driver.get("about:blank")
+        page = TinyBudgetLoginPage(driver, replace(config, perf_budgets="fail"))
+        with pytest.raises(AssertionError, match="exceeded its performance budgets"):
+            page._ensure_ready()
+    finally:
+        driver.quit()